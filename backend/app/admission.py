@@ -0,0 +1,212 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+import logging
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """The upstream queue is full (or the wait took too long); the client should retry later."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def seconds_until_token(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class AdmissionController:
+    """Global concurrency + rate limit in front of upstream generation.
+
+    Waiters queue per client and are served round-robin across clients, so one
+    noisy client cannot starve the rest. When the queue is full the caller is
+    rejected immediately instead of piling more work onto the provider.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        per_client_queue: int,
+        rate_per_second: float,
+        burst: int,
+        max_wait_seconds: float,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.per_client_queue = per_client_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.in_flight = 0
+        self.queued = 0
+        # client -> FIFO of waiters; OrderedDict order is the round-robin rotation
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        # Metrics
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    async def acquire(self, client_id: str):
+        """Wait for an upstream slot; raises AdmissionRejected when overloaded."""
+        if not self._waiters and self.in_flight < self.max_concurrent and self.bucket.try_take():
+            self.in_flight += 1
+            self._record_wait(0.0)
+            return
+
+        client_queue = self._waiters.get(client_id)
+        if self.queued >= self.max_queue or (client_queue and len(client_queue) >= self.per_client_queue):
+            self.rejected += 1
+            raise AdmissionRejected("Too many test generations in progress, please retry shortly", self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(client_id, deque()).append(waiter)
+        self.queued += 1
+        # Slots may be free while the bucket is empty; nothing else would wake us when a token refills
+        self._dispatch()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted at the last moment: keep the slot
+                self._record_wait(time.monotonic() - started)
+                return
+            waiter.cancel()
+            self._discard(client_id, waiter)
+            self.timed_out += 1
+            raise AdmissionRejected("Timed out waiting for a generation slot, please retry", self._retry_after())
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+                self._discard(client_id, waiter)
+            raise
+        # The slot was reserved for us in _dispatch
+        self._record_wait(time.monotonic() - started)
+
+    def try_acquire_idle(self) -> bool:
+        """Low-priority, non-queuing acquire for background work (e.g. prefill).
+
+        Succeeds only when nobody is waiting and, unless the upstream is idle,
+        at least one more slot stays free for clients; pair with release().
+        """
+        if self._waiters or (self.in_flight > 0 and self.in_flight + 1 >= self.max_concurrent):
+            return False
+        if self.in_flight >= self.max_concurrent or not self.bucket.try_take():
+            return False
+        self.in_flight += 1
+        self._record_wait(0.0)
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _record_wait(self, waited: float):
+        self.admitted += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def _dispatch(self):
+        """Hand free slots to waiting clients in round-robin order."""
+        while self._waiters and self.in_flight < self.max_concurrent:
+            if not self.bucket.try_take():
+                self._schedule_wakeup(self.bucket.seconds_until_token())
+                return
+            client_id, client_queue = next(iter(self._waiters.items()))
+            waiter = client_queue.popleft()
+            self.queued -= 1
+            if client_queue:
+                # Move this client to the back of the rotation
+                self._waiters.move_to_end(client_id)
+            else:
+                del self._waiters[client_id]
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def _schedule_wakeup(self, delay: float):
+        if self._wakeup is not None and not self._wakeup.cancelled():
+            return
+
+        def wake():
+            self._wakeup = None
+            self._dispatch()
+
+        self._wakeup = asyncio.get_running_loop().call_later(delay, wake)
+
+    def _discard(self, client_id: str, waiter: asyncio.Future):
+        client_queue = self._waiters.get(client_id)
+        if client_queue and waiter in client_queue:
+            client_queue.remove(waiter)
+            self.queued -= 1
+            if not client_queue:
+                del self._waiters[client_id]
+
+    def _retry_after(self) -> float:
+        # Rough time until the queue drains at the configured rate
+        if self.bucket.rate > 0:
+            return max(1.0, (self.queued + 1) / self.bucket.rate)
+        return 1.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "queued_clients": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+            "wait_seconds_max": round(self.wait_seconds_max, 3),
+        }
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+def client_key(headers, client_host: Optional[str]) -> str:
+    """Identify a client for fairness: configured header, then proxy chain, then socket address."""
+    if Config.ADMISSION_CLIENT_HEADER:
+        value = headers.get(Config.ADMISSION_CLIENT_HEADER)
+        if value:
+            return value
+    forwarded = headers.get("x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+    return client_host or "unknown"
@@ -1,90 +1,199 @@
+import asyncio
 import json
-import httpx
-from typing import List
+import random
+import re
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Tuple
 from app.config import Config
 from app.models import Question, TestConfig
+from app.upstream_policy import (
+    UpstreamPolicy, UpstreamError, RetryableUpstreamError, RETRYABLE_STATUSES, parse_retry_after
+)
+from app.dedup import DuplicateIndex
+from app.prompt_compiler import PromptCompiler
+from app.metrics import (
+    UpstreamTimer, UPSTREAM_TOKENS, UPSTREAM_STREAM_CUTOFFS, PARSE_SECONDS, QUESTIONS_ACCEPTED,
+    QUESTIONS_DISCARDED, timed
+)
 import logging
 
-logging.basicConfig(level=logging.INFO)
+if TYPE_CHECKING:
+    import httpx
+
 logger = logging.getLogger(__name__)
 
+def _log_payload(message: str, payload: Any):
+    """Verbose payload logging, sampled so it stays cheap at volume (off by default)."""
+    rate = Config.DEBUG_PAYLOAD_LOG_SAMPLE_RATE
+    if rate > 0 and random.random() < rate:
+        logger.info(f"{message}: {payload!r:.1000}")
+
+def _split_shards(total: int, shard_size: int) -> List[int]:
+    """Split total into near-equal shard sizes no larger than shard_size (e.g. 20 by 5 -> 4x5)."""
+    count = -(-total // shard_size)
+    base, extra = divmod(total, count)
+    return [base + 1 if i < extra else base for i in range(count)]
+
+# What is left of a JSON number after the decoder stopped at its cut-off end ("-", ".", "e+")
+_NUMBER_TAIL = re.compile(r"[-+.eE0-9]+")
+
+class QuestionStreamParser:
+    """Pulls complete question objects out of a (possibly streamed, truncated or dirty) JSON array.
+    
+    Built on JSONDecoder.raw_decode: each "{" is decoded on its own, so one bad
+    object or a cut-off tail only loses that object, not the whole response.
+    """
+    
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        # Salvage statistics
+        self.objects = 0
+        self.malformed = 0
+    
+    def feed(self, text: str) -> List[Any]:
+        self._buffer += text
+        objects = self._drain(lenient=False)
+        # Drop consumed text so the buffer only holds the object in progress
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        return objects
+    
+    def close(self) -> List[Any]:
+        """Final pass at end of stream: skip over anything that never became valid JSON."""
+        return self._drain(lenient=True)
+    
+    def _incomplete(self, error: json.JSONDecodeError) -> bool:
+        """True when decoding failed only because the text ends inside the object."""
+        if error.msg.startswith("Unterminated string"):
+            # Reported at the opening quote: no closing quote anywhere in the buffer
+            return True
+        tail = self._buffer[error.pos:].rstrip()
+        # Nothing left to decode, or a literal or number cut short ("tr" of "true", "." of "1.5")
+        return (
+            not tail
+            or any(literal.startswith(tail) for literal in ("true", "false", "null"))
+            or _NUMBER_TAIL.fullmatch(tail) is not None
+        )
+    
+    def _drain(self, lenient: bool) -> List[Any]:
+        objects = []
+        while True:
+            start = self._buffer.find("{", self._pos)
+            if start == -1:
+                self._pos = len(self._buffer)
+                break
+            try:
+                obj, end = self._decoder.raw_decode(self._buffer, start)
+            except json.JSONDecodeError as e:
+                if not lenient and self._incomplete(e):
+                    # Cut off by the end of the buffer: wait for more text
+                    self._pos = start
+                    break
+                # Broken mid-stream: skip it so later questions are not held back until close()
+                self.malformed += 1
+                self._pos = start + 1
+                continue
+            self._pos = end
+            # FIX: Handle both array and object-wrapped formats
+            if isinstance(obj, dict) and isinstance(obj.get("questions"), list):
+                objects.extend(obj["questions"])
+            else:
+                objects.append(obj)
+        self.objects += len(objects)
+        return objects
+
+class TokenUsage:
+    """Tokens reported for the upstream requests made on behalf of one caller."""
+    
+    def __init__(self):
+        self.total_tokens = 0
+        self.requests = 0
+    
+    def add(self, usage: Dict[str, Any]):
+        self.total_tokens += usage.get("total_tokens", 0)
+        self.requests += 1
+
 class AIGenerator:
     def __init__(self):
         self.api_key = Config.OPENROUTER_API_KEY
         self.base_url = Config.OPENROUTER_BASE_URL
         self.model = Config.OPENROUTER_MODEL
+        # Primary model first, then fallbacks in order
+        self.policy = UpstreamPolicy([self.model] + [m for m in Config.OPENROUTER_FALLBACK_MODELS if m != self.model])
         
-        # FIX: Log API key status for debugging (without exposing full key)
-        if self.api_key:
-            masked_key = self.api_key[:8] + "..." + self.api_key[-4:] if len(self.api_key) > 12 else "***"
-            logger.info(f"OpenRouter API key loaded: {masked_key}")
-            if self.api_key == "your_openrouter_api_key_here" or self.api_key.startswith("sk-or-"):
-                logger.warning("API key appears to be placeholder or invalid format")
-        else:
-            logger.error("OpenRouter API key is None/empty")
+        # Compact shared-prefix prompts, max_tokens sized per request
+        self.prompts = PromptCompiler()
+        
+        # Long-lived pooled client, opened by the app lifespan (or lazily on first use)
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._http2 = False
+        # Running total of upstream tokens reported in response "usage" blocks
+        self.tokens_used = 0
+        # Running totals of what the fault-tolerant parser recovered
+        self.salvage_stats = {"responses": 0, "objects": 0, "valid": 0, "malformed": 0, "truncated": 0}
     
-    def build_prompt(self, config: TestConfig) -> str:
-        if config.domain == "school":
-            prompt = f"""Generate {config.num_questions} multiple choice questions (MCQs) for a {config.class_level}th grade student.
-Subject: {config.subject}
-Topic: {config.topic}
-
-Requirements:
-1. Each question must have exactly 4 options (A, B, C, D)
-2. Questions should be appropriate for {config.class_level}th grade level
-3. Mix conceptual and application-based questions
-4. For each question, clearly indicate the correct answer
-
-Return ONLY a valid JSON array with this exact structure:
-[
-  {{
-    "question": "The question text here",
-    "options": ["Option A text", "Option B text", "Option C text", "Option D text"],
-    "correct_answer": "The exact text of the correct option"
-  }}
-]"""
-        
-        elif config.domain == "college":
-            prompt = f"""Generate {config.num_questions} multiple choice questions (MCQs) for {config.course} students in semester {config.semester}.
-Topic: {config.topic}
-
-Requirements:
-1. Each question must have exactly 4 options (A, B, C, D)
-2. Questions should be at appropriate college/semester level
-3. Include both theoretical and practical questions
-4. For each question, clearly indicate the correct answer
-
-Return ONLY a valid JSON array with this exact structure:
-[
-  {{
-    "question": "The question text here",
-    "options": ["Option A text", "Option B text", "Option C text", "Option D text"],
-    "correct_answer": "The exact text of the correct option"
-  }}
-]"""
-        
-        else:  # competitive
-            prompt = f"""Generate {config.num_questions} multiple choice questions (MCQs) for {config.exam} preparation.
-Topic: {config.topic}
-
-Requirements:
-1. Each question must have exactly 4 options (A, B, C, D)
-2. Questions should match the difficulty and pattern of {config.exam}
-3. Include previous year question patterns if applicable
-4. For each question, clearly indicate the correct answer
-
-Return ONLY a valid JSON array with this exact structure:
-[
-  {{
-    "question": "The question text here",
-    "options": ["Option A text", "Option B text", "Option C text", "Option D text"],
-    "correct_answer": "The exact text of the correct option"
-  }}
-]"""
-        
-        return prompt
-    
-    async def generate_questions(self, config: TestConfig) -> List[Question]:
+    def _http2_available(self) -> bool:
+        if not Config.HTTP2_ENABLED:
+            return False
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP2_ENABLED is set but the 'h2' package is not installed; falling back to HTTP/1.1")
+            return False
+        return True
+    
+    def _build_client(self) -> "httpx.AsyncClient":
+        # httpx is the heaviest import on the request path; load it with the client, not the module
+        import httpx
+        
+        limits = httpx.Limits(
+            max_connections=Config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        timeout = httpx.Timeout(Config.HTTP_TIMEOUT_SECONDS, connect=Config.HTTP_CONNECT_TIMEOUT_SECONDS)
+        self._http2 = self._http2_available()
+        return httpx.AsyncClient(
+            limits=limits,
+            timeout=timeout,
+            http2=self._http2,
+        )
+    
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+    
+    async def startup(self):
+        """Open the shared upstream client."""
+        self.client
+        logger.info(
+            f"OpenRouter client ready (max_connections={Config.HTTP_MAX_CONNECTIONS}, "
+            f"keepalive={Config.HTTP_MAX_KEEPALIVE_CONNECTIONS}, http2={self._http2})"
+        )
+    
+    async def prewarm(self):
+        """Open a pooled connection to OpenRouter (DNS, TCP, TLS) ahead of the first test."""
+        import httpx
+        
+        started = time.perf_counter()
+        try:
+            # Any response will do; what matters is the kept-alive connection left in the pool
+            await self.client.head(self.base_url, timeout=Config.HTTP_CONNECT_TIMEOUT_SECONDS)
+            logger.info(f"Upstream connection pre-warmed in {time.perf_counter() - started:.3f}s")
+        except httpx.HTTPError as e:
+            logger.warning(f"Upstream pre-warm failed: {e}")
+    
+    async def shutdown(self):
+        """Close the shared upstream client and release pooled connections."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+    
+    def _check_api_key(self):
         # FIX: Better API key validation with clear error messages
         if not self.api_key:
             logger.error("OpenRouter API key is None/empty")
@@ -96,8 +205,11 @@ Return ONLY a valid JSON array with this exact structure:
         
         if len(self.api_key) < 20:
             logger.warning(f"OpenRouter API key seems too short: {len(self.api_key)} characters")
-        
-        prompt = self.build_prompt(config)
+    
+    def _build_request(
+        self, config: TestConfig, stream: bool = False, shard: Optional[Tuple[int, int]] = None
+    ) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        messages, max_tokens = self.prompts.compile(config, shard)
         
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -107,133 +219,343 @@ Return ONLY a valid JSON array with this exact structure:
         
         data = {
             "model": self.model,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are an expert educational content creator. Generate accurate, well-structured MCQs. Return ONLY valid JSON."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
+            "messages": messages,
             "temperature": 0.7,
-            "max_tokens": 4000
+            "max_tokens": max_tokens
         }
+        if stream:
+            data["stream"] = True
+            # Ask for the usage block in the final chunk, as non-streamed responses always carry it
+            data["stream_options"] = {"include_usage": True}
+        return headers, data
+    
+    def _record_salvage(self, parser: QuestionStreamParser, valid: int, truncated: bool):
+        stats = self.salvage_stats
+        stats["responses"] += 1
+        stats["objects"] += parser.objects
+        stats["valid"] += valid
+        stats["malformed"] += parser.malformed
+        stats["truncated"] += truncated
+    
+    def _validate_question(self, i: int, q_data: Any) -> Optional[Question]:
+        rule = self._rejection_rule(q_data)
+        if rule is None:
+            try:
+                question = Question(**q_data)
+            except Exception as e:
+                logger.warning(f"Invalid question format at index {i}: {e}")
+                rule = "invalid_format"
+            else:
+                QUESTIONS_ACCEPTED.inc()
+                return question
+        else:
+            logger.warning(f"Question {i} rejected: {rule}")
+        QUESTIONS_DISCARDED.inc(rule=rule)
+        _log_payload(f"Rejected question {i} ({rule})", q_data)
+        return None
+    
+    def _rejection_rule(self, q_data: Any) -> Optional[str]:
+        # FIX: Validate required fields before creating Question
+        if not isinstance(q_data, dict) or not all(key in q_data for key in ["question", "options", "correct_answer"]):
+            return "missing_fields"
+        
+        # FIX: Ensure options is a list with 4 items
+        if not isinstance(q_data["options"], list) or len(q_data["options"]) != 4:
+            return "invalid_options"
+        
+        # FIX: Ensure correct_answer is in options
+        if q_data["correct_answer"] not in q_data["options"]:
+            return "answer_not_in_options"
+        return None
+    
+    async def generate_questions(self, config: TestConfig, usage: Optional[TokenUsage] = None) -> List[Question]:
+        """Generate config.num_questions questions; tokens of this call alone are added to usage."""
+        shard_size = Config.GENERATION_SHARD_SIZE
+        if shard_size <= 0 or shard_size > config.num_questions:
+            shard_size = config.num_questions
+        return await self._generate_sharded(config, shard_size, usage)
+    
+    async def _generate_sharded(
+        self, config: TestConfig, shard_size: int, usage: Optional[TokenUsage] = None
+    ) -> List[Question]:
+        """Generate in (possibly one) concurrent shards, merge, dedupe and top up only the shortfall."""
+        self._check_api_key()
+        semaphore = asyncio.Semaphore(Config.GENERATION_SHARD_CONCURRENCY)
+        # Shards, retries and top-up rounds all share one deadline
+        deadline = self.policy.deadline()
+        merged: List[Question] = []
+        # Shards (and top-up rounds) often reword each other's questions
+        index = DuplicateIndex()
+        
+        async def run_shard(size: int, shard: Optional[Tuple[int, int]]) -> List[Question]:
+            async with semaphore:
+                shard_config = config.model_copy(update={"num_questions": size})
+                return await self._generate_batch(
+                    shard_config, min_questions=1, shard=shard, deadline=deadline, usage=usage
+                )
+        
+        pending = _split_shards(config.num_questions, shard_size)
+        last_error: Optional[Exception] = None
+        for attempt in range(Config.GENERATION_SHARD_RETRIES + 1):
+            shards = [(size, (i + 1, len(pending)) if len(pending) > 1 else None) for i, size in enumerate(pending)]
+            outcomes = await asyncio.gather(
+                *(run_shard(size, shard) for size, shard in shards), return_exceptions=True
+            )
+            failed = 0
+            upstream_failed = False
+            for outcome in outcomes:
+                if isinstance(outcome, Exception):
+                    failed += 1
+                    last_error = outcome
+                    upstream_failed = upstream_failed or isinstance(outcome, UpstreamError)
+                    logger.warning(f"Question shard failed (attempt {attempt + 1}): {outcome}")
+                    continue
+                for question in outcome:
+                    kind = index.add(question)
+                    if kind is None:
+                        merged.append(question)
+                    else:
+                        QUESTIONS_DISCARDED.inc(rule="duplicate" if kind == "exact" else "near_duplicate")
+            
+            shortfall = config.num_questions - len(merged)
+            logger.info(
+                f"Shard round {attempt + 1}: {len(shards) - failed}/{len(shards)} succeeded, "
+                f"{len(merged)}/{config.num_questions} unique questions"
+            )
+            if shortfall <= 0:
+                break
+            if upstream_failed:
+                # Already retried, timed out or not retryable (e.g. 401): another round would not help
+                break
+            # Only re-request what is missing (failed shards, salvaged-short output or duplicates)
+            pending = _split_shards(shortfall, shard_size)
+        
+        if len(merged) >= config.num_questions:
+            return merged[:config.num_questions]
+        if not merged and last_error is not None:
+            # Surface the real upstream error (e.g. "AI service error: 401")
+            raise ValueError(str(last_error))
+        if len(merged) >= 5:
+            logger.info(f"AI generated {len(merged)} valid questions (requested {config.num_questions})")
+            return merged
+        logger.error(f"AI returned insufficient valid questions: {len(merged)}")
+        raise ValueError(f"AI generated only {len(merged)} valid questions, need at least 5")
+    
+    async def _generate_batch(
+        self,
+        config: TestConfig,
+        min_questions: int = 5,
+        shard: Optional[Tuple[int, int]] = None,
+        deadline: Optional[float] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> List[Question]:
+        self._check_api_key()
+        headers, data = self._build_request(config, shard=shard)
         
         try:
-            # FIX: Increased timeout and added connection error handling
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                logger.info(f"Sending request to OpenRouter with model: {self.model}")
-                response = await client.post(
+            result = await self._post_completion(headers, data, deadline)
+            self._record_usage(data, result.get("usage"), usage)
+            
+            # FIX: Added validation for response structure
+            if "choices" not in result or len(result["choices"]) == 0:
+                logger.error("Invalid OpenRouter response: missing choices")
+                raise ValueError("Invalid response from AI service")
+            
+            content = result["choices"][0]["message"]["content"]
+            _log_payload("Received AI response", content)
+            
+            # Recover every complete question object, even from truncated or dirty output
+            parser = QuestionStreamParser()
+            with timed(PARSE_SECONDS, stage="parse"):
+                questions_list = parser.feed(content) + parser.close()
+            truncated = result["choices"][0].get("finish_reason") == "length"
+            
+            # Validate and convert to Question objects
+            questions = []
+            with timed(PARSE_SECONDS, stage="validate"):
+                for i, q_data in enumerate(questions_list):
+                    question = self._validate_question(i, q_data)
+                    if question is not None:
+                        questions.append(question)
+            
+            self._record_salvage(parser, len(questions), truncated)
+            self.prompts.observe((result.get("usage") or {}).get("completion_tokens", 0), parser.objects, truncated)
+            if parser.malformed or truncated or len(questions) < len(questions_list):
+                logger.info(
+                    f"Salvaged {len(questions)} valid questions from {len(questions_list)} objects "
+                    f"({parser.malformed} malformed fragments, truncated={truncated})"
+                )
+            
+            if len(questions) >= config.num_questions:
+                return questions[:config.num_questions]
+            elif len(questions) >= min_questions:
+                logger.info(f"AI generated {len(questions)} valid questions (requested {config.num_questions})")
+                return questions
+            else:
+                logger.error(f"AI returned insufficient valid questions: {len(questions)}")
+                raise ValueError(f"AI generated only {len(questions)} valid questions, need at least {min_questions}")
+        
+        except ValueError as e:
+            # FIX: Re-raise validation errors
+            raise
+        except Exception as e:
+            # FIX: Catch-all for unexpected errors
+            logger.error(f"Unexpected error in generate_questions: {type(e).__name__}: {e}")
+            raise ValueError(f"Unexpected error: {str(e)}")
+    
+    def _record_usage(self, data: Dict[str, Any], usage: Optional[Dict[str, Any]], meter: Optional[TokenUsage] = None):
+        UPSTREAM_TOKENS.inc(data["max_tokens"], kind="max_requested")
+        usage = usage or {}
+        self.tokens_used += usage.get("total_tokens", 0)
+        if meter is not None:
+            meter.add(usage)
+        UPSTREAM_TOKENS.inc(usage.get("prompt_tokens", 0), kind="prompt")
+        UPSTREAM_TOKENS.inc(usage.get("completion_tokens", 0), kind="completion")
+    
+    async def _post_completion(
+        self, headers: Dict[str, str], data: Dict[str, Any], deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """One chat completion through the retry/hedge/fallback policy, within deadline."""
+        import httpx
+        
+        async def attempt(model: str) -> Dict[str, Any]:
+            timer = UpstreamTimer()
+            try:
+                # Reuse the pooled keep-alive client instead of a fresh handshake per test
+                logger.info(f"Sending request to OpenRouter with model: {model}")
+                response = await self.client.post(
                     f"{self.base_url}/chat/completions",
                     headers=headers,
-                    json=data
+                    json={**data, "model": model},
+                    extensions={"trace": timer.trace}
                 )
+            except httpx.RequestError as e:
+                # FIX: Handle network/connection errors
+                timer.observe(model, "network_error")
+                logger.error(f"Network error connecting to OpenRouter: {e}")
+                raise RetryableUpstreamError(f"Network error: {str(e)}")
+            
+            # FIX: Log response status for debugging
+            timer.observe(model, str(response.status_code))
+            logger.info(f"OpenRouter response status: {response.status_code}")
+            if response.status_code == 200:
+                return response.json()
+            
+            # FIX: Better error logging for API failures
+            error_msg = f"OpenRouter API error: {response.status_code}"
+            try:
+                error_msg += f" - {response.json()}"
+            except ValueError:
+                error_msg += f" - {response.text[:200]}"
+            logger.error(error_msg)
+            if response.status_code in RETRYABLE_STATUSES:
+                raise RetryableUpstreamError(
+                    f"AI service error: {response.status_code}",
+                    retry_after=parse_retry_after(response.headers.get("retry-after"))
+                )
+            raise UpstreamError(f"AI service error: {response.status_code}")
+        
+        return await self.policy.execute(attempt, deadline)
+
+    async def stream_questions(self, config: TestConfig, usage: Optional[TokenUsage] = None) -> AsyncIterator[Question]:
+        """Yield validated questions as soon as each one has fully arrived."""
+        import httpx
+        
+        self._check_api_key()
+        headers, data = self._build_request(config, stream=True)
+        # Streams are not retried or hedged, but they avoid models whose circuit is open
+        model = self.policy.pick_model()
+        # Streams feed the same breaker as retried calls, so its failures stay consecutive
+        breaker = self.policy.breakers[model]
+        if not breaker.acquire():
+            raise ValueError("AI service unavailable: all models are temporarily disabled after repeated failures")
+        data["model"] = model
+        parser = QuestionStreamParser()
+        # Reported in the final chunk (absent if the stream is cut off first)
+        reported: Optional[Dict[str, Any]] = None
+        index = 0
+        produced = 0
+        timer = UpstreamTimer()
+        outcome = "network_error"
+        
+        try:
+            logger.info(f"Streaming request to OpenRouter with model: {model}")
+            async with self.client.stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=data,
+                extensions={"trace": timer.trace}
+            ) as response:
+                outcome = str(response.status_code)
+                logger.info(f"OpenRouter stream status: {response.status_code}")
+                if response.status_code != 200:
+                    if response.status_code in RETRYABLE_STATUSES:
+                        breaker.record_failure()
+                    body = await response.aread()
+                    logger.error(f"OpenRouter API error: {response.status_code} - {body[:200]!r}")
+                    raise ValueError(f"AI service error: {response.status_code}")
                 
-                # FIX: Log response status for debugging
-                logger.info(f"OpenRouter response status: {response.status_code}")
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    
-                    # FIX: Added validation for response structure
-                    if "choices" not in result or len(result["choices"]) == 0:
-                        logger.error("Invalid OpenRouter response: missing choices")
-                        raise ValueError("Invalid response from AI service")
-                    
-                    content = result["choices"][0]["message"]["content"]
-                    logger.info(f"Received AI response (first 200 chars): {content[:200]}...")
-                    
-                    # Clean the response to extract JSON
-                    content = content.strip()
-                    
-                    # FIX: More robust JSON extraction
-                    import re
-                    json_match = re.search(r'\[.*\]', content, re.DOTALL)
-                    if not json_match:
-                        json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                    
-                    if json_match:
-                        content = json_match.group(0)
-                    else:
-                        # If no JSON found, try to parse the entire content
-                        logger.warning("No JSON pattern found in AI response, attempting to parse entire content")
-                    
-                    # FIX: Added try-catch for JSON parsing
+                done = False
+                finish_reason = None
+                async for line in response.aiter_lines():
+                    # SSE: "data: {...}" chunks, ":" keep-alive comments, "data: [DONE]" terminator
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        break
                     try:
-                        questions_data = json.loads(content)
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Failed to parse AI response as JSON: {e}")
-                        logger.error(f"Problematic content: {content[:500]}")
-                        raise ValueError(f"AI returned invalid JSON: {str(e)}")
-                    
-                    # FIX: Handle both array and object formats
-                    if isinstance(questions_data, list):
-                        questions_list = questions_data
-                    elif isinstance(questions_data, dict) and "questions" in questions_data:
-                        questions_list = questions_data["questions"]
-                    else:
-                        logger.error(f"Unexpected response format: {type(questions_data)}")
-                        raise ValueError("AI returned unexpected response format")
-                    
-                    # Validate and convert to Question objects
-                    questions = []
-                    for i, q_data in enumerate(questions_list[:config.num_questions]):
-                        try:
-                            # FIX: Validate required fields before creating Question
-                            if not all(key in q_data for key in ["question", "options", "correct_answer"]):
-                                logger.warning(f"Question {i} missing required fields: {q_data}")
-                                continue
-                            
-                            # FIX: Ensure options is a list with 4 items
-                            if not isinstance(q_data["options"], list) or len(q_data["options"]) != 4:
-                                logger.warning(f"Question {i} has invalid options format: {q_data['options']}")
-                                continue
-                            
-                            # FIX: Ensure correct_answer is in options
-                            if q_data["correct_answer"] not in q_data["options"]:
-                                logger.warning(f"Question {i}: correct_answer not in options")
-                                continue
-                            
-                            question = Question(**q_data)
-                            questions.append(question)
-                        except Exception as e:
-                            logger.warning(f"Invalid question format at index {i}: {e}, data: {q_data}")
-                            continue
+                        chunk = json.loads(payload)
+                        # The last chunk may carry usage instead of content
+                        reported = chunk.get("usage") or reported
+                        choice = chunk["choices"][0]
+                        finish_reason = choice.get("finish_reason") or finish_reason
+                        delta = choice.get("delta", {}).get("content") or ""
+                    except (json.JSONDecodeError, KeyError, IndexError, TypeError, AttributeError):
+                        continue
                     
-                    if len(questions) >= config.num_questions:
-                        return questions[:config.num_questions]
-                    elif len(questions) >= 5:
-                        logger.info(f"AI generated {len(questions)} valid questions (requested {config.num_questions})")
-                        return questions
-                    else:
-                        logger.error(f"AI returned insufficient valid questions: {len(questions)}")
-                        raise ValueError(f"AI generated only {len(questions)} valid questions, need at least 5")
+                    for q_data in parser.feed(delta):
+                        question = self._validate_question(index, q_data)
+                        index += 1
+                        if question is not None:
+                            produced += 1
+                            yield question
+                            if produced >= config.num_questions:
+                                done = True
+                                break
+                    if done:
+                        # Leaving the block closes the response, which aborts the
+                        # upstream generation instead of paying for unused tokens
+                        UPSTREAM_STREAM_CUTOFFS.inc()
+                        logger.info(f"Parsed {produced} questions; closing upstream stream early")
+                        break
                 
-                else:
-                    # FIX: Better error logging for API failures
-                    error_msg = f"OpenRouter API error: {response.status_code}"
-                    try:
-                        error_detail = response.json()
-                        error_msg += f" - {error_detail}"
-                        logger.error(error_msg)
-                    except:
-                        error_msg += f" - {response.text[:200]}"
-                        logger.error(error_msg)
-                    raise ValueError(f"AI service error: {response.status_code}")
+                if not done:
+                    completion_tokens = (reported or {}).get("completion_tokens", 0)
+                    self.prompts.observe(completion_tokens, parser.objects, finish_reason == "length")
+                    for q_data in parser.close():
+                        question = self._validate_question(index, q_data)
+                        index += 1
+                        if question is not None:
+                            produced += 1
+                            yield question
+                            if produced >= config.num_questions:
+                                break
+            breaker.record_success()
         
         except httpx.RequestError as e:
-            # FIX: Handle network/connection errors
-            logger.error(f"Network error connecting to OpenRouter: {e}")
+            outcome = "network_error"
+            breaker.record_failure()
+            logger.error(f"Network error streaming from OpenRouter: {e}")
             raise ValueError(f"Network error: {str(e)}")
-        except ValueError as e:
-            # FIX: Re-raise validation errors
-            raise
-        except Exception as e:
-            # FIX: Catch-all for unexpected errors
-            logger.error(f"Unexpected error in generate_questions: {type(e).__name__}: {e}")
-            raise ValueError(f"Unexpected error: {str(e)}")
+        finally:
+            breaker.release()
+            self._record_usage(data, reported, usage)
+            # Total covers the whole stream (or until enough questions arrived)
+            timer.observe(model, outcome)
+        
+        logger.info(f"Streamed {produced} valid questions (requested {config.num_questions})")
 
 # Global AI generator instance
 ai_generator = AIGenerator()
\ No newline at end of file
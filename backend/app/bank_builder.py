@@ -0,0 +1,237 @@
+"""Build a memory-mapped question bank offline from the subject/course/exam catalog.
+
+Run from the backend directory:
+
+    python -m app.bank_builder --topics topics.txt --out question_bank.smqb
+
+The topics file has one "<subject, course or exam>: <topic>" per line, e.g.
+"Physics: Electrostatics" or "NEET: Human Physiology"; blank lines and lines
+starting with "#" are ignored. School subjects expand to every class level
+that offers them, courses to every semester (narrow with --class-levels and
+--semesters).
+
+Each generated batch is appended to a progress file, so an interrupted run
+resumes where it stopped; the bank is written (atomically) at the end, or
+from the progress file alone with --compile-only. Serve it by pointing
+QUESTION_BANK_PATH at the output file.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import Config, log_config_status
+from app.dedup import build_index
+from app.models import Question, TestConfig
+from app.question_bank import write_bank
+from app.question_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+# Smallest test the API serves; pools below this are left out of the bank
+MIN_POOL_SIZE = 5
+
+
+def class_levels(group: str) -> List[int]:
+    """Class levels of a SCHOOL_SUBJECTS group name, e.g. "6-8" -> [6, 7, 8], "11-12_arts" -> [11, 12]."""
+    match = re.match(r"(\d+)-(\d+)", group)
+    if not match:
+        return []
+    return list(range(int(match.group(1)), int(match.group(2)) + 1))
+
+
+def parse_topics(lines: Iterable[str]) -> List[Tuple[str, str]]:
+    entries = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        scope, sep, topic = line.partition(":")
+        if not sep or not scope.strip() or not topic.strip():
+            raise ValueError(f"line {number}: expected '<subject, course or exam>: <topic>', got {line!r}")
+        entries.append((scope.strip(), topic.strip()))
+    return entries
+
+
+def expand_configs(
+    entries: List[Tuple[str, str]],
+    levels: Optional[List[int]] = None,
+    semesters: Optional[List[int]] = None,
+    domains: Optional[List[str]] = None,
+) -> List[TestConfig]:
+    """One TestConfig per catalog slot (class level, semester or exam) each topic applies to."""
+    school = defaultdict(list)
+    for group, subjects in Config.SCHOOL_SUBJECTS.items():
+        for subject in subjects:
+            school[subject.lower()].append((subject, class_levels(group)))
+    courses = {course.lower(): course for course in Config.COLLEGE_COURSES}
+    exams = {exam.lower(): exam for exam in Config.COMPETITIVE_EXAMS}
+    domains = domains or ["school", "college", "competitive"]
+    num_questions = Config.MAX_QUESTIONS
+
+    configs: Dict[str, TestConfig] = {}
+    for scope, topic in entries:
+        matched = []
+        name = scope.lower()
+        if "school" in domains:
+            for subject, group_levels in school.get(name, []):
+                for level in group_levels:
+                    if levels is None or level in levels:
+                        matched.append(TestConfig(
+                            domain="school", class_level=level, subject=subject, topic=topic, num_questions=num_questions
+                        ))
+        if "college" in domains and name in courses:
+            for semester in semesters or range(1, 9):
+                matched.append(TestConfig(
+                    domain="college", course=courses[name], semester=semester, topic=topic, num_questions=num_questions
+                ))
+        if "competitive" in domains and name in exams:
+            matched.append(TestConfig(domain="competitive", exam=exams[name], topic=topic, num_questions=num_questions))
+        if not matched:
+            logger.warning(f"'{scope}' is not in the catalog (or filtered out); skipping topic '{topic}'")
+        for config in matched:
+            configs.setdefault(cache_key(config), config)
+    return list(configs.values())
+
+
+def load_progress(path: str) -> Dict[str, List[Question]]:
+    """Questions generated by earlier runs, by cache key."""
+    pools: Dict[str, List[Question]] = defaultdict(list)
+    if not os.path.exists(path):
+        return pools
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                pools[record["key"]].extend(Question(**q) for q in record["questions"])
+            except (ValueError, KeyError, TypeError):
+                # A run killed mid-write leaves a partial last line
+                logger.warning(f"Skipping unreadable progress line in {path}")
+    return pools
+
+
+class BankBuilder:
+    """Fills each config's pool up to a target size with deduplicated, validated questions."""
+
+    def __init__(self, generator, progress_path: str, target: int, concurrency: int, max_calls: int):
+        self.generator = generator
+        self.progress_path = progress_path
+        self.target = target
+        self.max_calls = max_calls
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.pools = load_progress(progress_path)
+        self.calls = 0
+        self.failed_calls = 0
+
+    def _record(self, key: str, questions: List[Question]):
+        line = json.dumps({"key": key, "questions": [q.model_dump() for q in questions]})
+        with open(self.progress_path, "a") as f:
+            f.write(line + "\n")
+
+    async def fill(self, config: TestConfig):
+        key = cache_key(config)
+        pool = self.pools[key]
+        index = build_index(pool)
+        if len(pool) >= self.target:
+            return
+        # Each call yields at most MAX_QUESTIONS; allow slack for duplicates and failures
+        calls_left = self.max_calls or 2 * math.ceil((self.target - len(pool)) / config.num_questions) + 1
+        while len(pool) < self.target and calls_left > 0:
+            calls_left -= 1
+            async with self._semaphore:
+                self.calls += 1
+                try:
+                    generated = await self.generator.generate_questions(config)
+                except ValueError as e:
+                    self.failed_calls += 1
+                    logger.error(f"Generation failed for {key}: {e}")
+                    continue
+            fresh, dropped = index.filter(generated)
+            if fresh:
+                pool.extend(fresh)
+                self._record(key, fresh)
+            logger.info(
+                f"{key}: {len(pool)}/{self.target} questions "
+                f"(+{len(fresh)}, {dropped['exact'] + dropped['near']} duplicates)"
+            )
+        if len(pool) < self.target:
+            logger.warning(f"{key}: stopped at {len(pool)}/{self.target} questions")
+
+    async def run(self, configs: List[TestConfig]):
+        await asyncio.gather(*(self.fill(config) for config in configs))
+
+    def bank_pools(self, configs: Optional[List[TestConfig]] = None) -> Dict[str, List[Question]]:
+        keys = None if configs is None else {cache_key(config) for config in configs}
+        return {
+            key: pool[:self.target] for key, pool in self.pools.items()
+            if len(pool) >= MIN_POOL_SIZE and (keys is None or key in keys)
+        }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+async def build(args: argparse.Namespace) -> int:
+    from app.ai_generator import ai_generator
+
+    with open(args.topics) as f:
+        entries = parse_topics(f)
+    configs = expand_configs(
+        entries,
+        levels=_int_list(args.class_levels) if args.class_levels else None,
+        semesters=_int_list(args.semesters) if args.semesters else None,
+        domains=args.domains.split(",") if args.domains else None,
+    )
+    progress_path = args.progress or f"{args.out}.progress.jsonl"
+    builder = BankBuilder(ai_generator, progress_path, args.questions_per_topic, args.concurrency, args.max_calls)
+    pending = [c for c in configs if len(builder.pools.get(cache_key(c), [])) < args.questions_per_topic]
+    logger.info(f"{len(configs)} catalog topics, {len(pending)} still below {args.questions_per_topic} questions")
+
+    if args.dry_run:
+        for config in pending:
+            print(cache_key(config))
+        return 0
+    if pending and not args.compile_only:
+        log_config_status()
+        await ai_generator.startup()
+        try:
+            await builder.run(pending)
+        finally:
+            await ai_generator.shutdown()
+
+    pools = builder.bank_pools(configs)
+    write_bank(args.out, pools)
+    logger.info(
+        f"Wrote {args.out}: {len(pools)} topics, {sum(len(p) for p in pools.values())} questions "
+        f"({builder.calls} upstream calls, {builder.failed_calls} failed)"
+    )
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", required=True, help="file of '<subject, course or exam>: <topic>' lines")
+    parser.add_argument("--out", default="question_bank.smqb", help="bank file to write")
+    parser.add_argument("--progress", help="resume file (default: <out>.progress.jsonl)")
+    parser.add_argument("--questions-per-topic", type=int, default=Config.QUESTION_CACHE_MAX_POOL_SIZE // 2)
+    parser.add_argument("--concurrency", type=int, default=4, help="upstream calls in flight")
+    parser.add_argument("--max-calls", type=int, default=0, help="upstream calls per topic (0: derive from the target)")
+    parser.add_argument("--domains", help="comma-separated subset of school,college,competitive")
+    parser.add_argument("--class-levels", help="comma-separated class levels for school subjects")
+    parser.add_argument("--semesters", help="comma-separated semesters for college courses (default 1-8)")
+    parser.add_argument("--dry-run", action="store_true", help="list the topics that still need questions")
+    parser.add_argument("--compile-only", action="store_true", help="write the bank from the progress file only")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    raise SystemExit(asyncio.run(build(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from app.config import Config
+from app.compact_session import QuestionRecord, compact_config, record_from_question
+from app.models import Question, TestConfig
+
+logger = logging.getLogger(__name__)
+
+# Room codes are read aloud and typed by students: no 0/O or 1/I
+_CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+_CODE_LENGTH = 6
+
+
+class Leaderboard:
+    """Submitted scores with O(log n) inserts and rank queries.
+
+    Scores are integers from 0 to the number of questions, so a Fenwick tree
+    over score values counts the students at or below any score; a rank is
+    one plus the number of students strictly above. Each score keeps its
+    entries in submission order, which breaks ties when listing.
+    """
+
+    def __init__(self, max_score: int):
+        self.max_score = max_score
+        # 1-based Fenwick tree over scores 0..max_score
+        self._tree = [0] * (max_score + 2)
+        self._by_score: List[List[str]] = [[] for _ in range(max_score + 1)]
+        self.size = 0
+
+    def _count_at_most(self, score: int) -> int:
+        total = 0
+        i = score + 1
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def add(self, entry: str, score: int) -> int:
+        """Record a score; returns its rank (ties share a rank)."""
+        score = max(0, min(score, self.max_score))
+        i = score + 1
+        while i < len(self._tree):
+            self._tree[i] += 1
+            i += i & -i
+        self._by_score[score].append(entry)
+        self.size += 1
+        return self.rank(score)
+
+    def rank(self, score: int) -> int:
+        return self.size - self._count_at_most(score) + 1
+
+    def top(self, limit: int) -> List[Tuple[int, int, str]]:
+        """(rank, score, entry) for the best `limit` entries, earliest submission first within a score."""
+        result = []
+        for score in range(self.max_score, -1, -1):
+            entries = self._by_score[score]
+            if not entries:
+                continue
+            rank = self.rank(score)
+            for entry in entries[:limit - len(result)]:
+                result.append((rank, score, entry))
+            if len(result) >= limit:
+                break
+        return result
+
+
+class Room:
+    """One generated test shared by a class; students reference its question tuple."""
+
+    __slots__ = (
+        "code", "config", "config_values", "questions", "created_at", "students", "names", "joining", "scores",
+        "leaderboard", "version",
+    )
+
+    def __init__(self, code: str, config: TestConfig, questions: List[Question]):
+        self.code = code
+        # The config as the API returns it, and in the compact form sessions store
+        self.config = config.model_dump()
+        self.config_values = compact_config(config)
+        self.questions: Tuple[QuestionRecord, ...] = tuple(record_from_question(q) for q in questions)
+        self.created_at = time.time()
+        # session_id -> display name, and the names taken (case-insensitive)
+        self.students: Dict[str, str] = {}
+        self.names = set()
+        # Seats reserved by joins whose session is still being created
+        self.joining = 0
+        # session_id -> submitted score
+        self.scores: Dict[str, int] = {}
+        self.leaderboard = Leaderboard(len(self.questions))
+        # Bumped on every join and submission; used as the leaderboard ETag
+        self.version = 0
+
+
+class RoomManager:
+    """In-process classrooms with a fixed lifetime, oldest evicted first.
+
+    Rooms live in the worker that created them (like admission and
+    single-flight state), so multi-worker deployments need sticky routing
+    by room code for classroom mode.
+    """
+
+    def __init__(self, ttl_seconds: float, max_rooms: int, max_students: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_rooms = max_rooms
+        self.max_students = max_students
+        # Creation order == expiry order, as in InMemorySessionStore
+        self._rooms: "OrderedDict[str, Room]" = OrderedDict()
+        self.rooms_created = 0
+        self.students_joined = 0
+        self.results_recorded = 0
+
+    def _new_code(self) -> str:
+        while True:
+            code = "".join(secrets.choice(_CODE_ALPHABET) for _ in range(_CODE_LENGTH))
+            if code not in self._rooms:
+                return code
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        while self._rooms:
+            room = next(iter(self._rooms.values()))
+            if room.created_at >= cutoff and len(self._rooms) <= self.max_rooms:
+                break
+            self._rooms.popitem(last=False)
+
+    def create(self, config: TestConfig, questions: List[Question]) -> Room:
+        room = Room(self._new_code(), config, questions)
+        self._rooms[room.code] = room
+        self.rooms_created += 1
+        self._expire()
+        return room
+
+    def get(self, code: str) -> Optional[Room]:
+        room = self._rooms.get(code.upper())
+        if room is not None and time.time() - room.created_at > self.ttl_seconds:
+            del self._rooms[room.code]
+            return None
+        return room
+
+    def reserve(self, room: Room, name: str):
+        """Claim a seat and the name (case-insensitively) before the student's session exists.
+
+        Raises ValueError if the room is full or the name is taken. Follow with
+        add_student() once the session is created, or release() if that fails.
+        """
+        if len(room.students) + room.joining >= self.max_students:
+            raise ValueError(f"Room {room.code} is full ({self.max_students} students)")
+        if name.casefold() in room.names:
+            raise ValueError(f"The name '{name}' is already taken in room {room.code}")
+        room.names.add(name.casefold())
+        room.joining += 1
+
+    def release(self, room: Room, name: str):
+        room.names.discard(name.casefold())
+        room.joining -= 1
+
+    def add_student(self, room: Room, session_id: str, name: str):
+        """Seat a student whose name was reserved."""
+        room.joining -= 1
+        room.students[session_id] = name
+        room.version += 1
+        self.students_joined += 1
+
+    def record_result(self, code: str, session_id: str, score: int) -> Optional[int]:
+        """Add a submitted score to the room's leaderboard; returns the student's rank."""
+        room = self.get(code)
+        if room is None or session_id not in room.students or session_id in room.scores:
+            return None
+        room.scores[session_id] = score
+        room.version += 1
+        self.results_recorded += 1
+        return room.leaderboard.add(session_id, score)
+
+    def leaderboard(self, room: Room, limit: int, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Top `limit` entries, plus the caller's own standing when their session has submitted."""
+        total = len(room.questions)
+        result = {
+            "room_code": room.code,
+            "joined": len(room.students),
+            "submitted": room.leaderboard.size,
+            "total": total,
+            "entries": [
+                {
+                    "rank": rank,
+                    "name": room.students[entry],
+                    "score": score,
+                    "percentage": round(score / total * 100, 2) if total else 0.0,
+                }
+                for rank, score, entry in room.leaderboard.top(limit)
+            ],
+        }
+        if session_id in room.scores:
+            score = room.scores[session_id]
+            result["you"] = {"rank": room.leaderboard.rank(score), "name": room.students[session_id], "score": score}
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "rooms": len(self._rooms),
+            "rooms_created": self.rooms_created,
+            "students_joined": self.students_joined,
+            "results_recorded": self.results_recorded,
+        }
+
+
+# Global classroom registry
+room_manager = RoomManager(
+    ttl_seconds=Config.CLASSROOM_TTL_MINUTES * 60,
+    max_rooms=Config.CLASSROOM_MAX_ROOMS,
+    max_students=Config.CLASSROOM_MAX_STUDENTS,
+)
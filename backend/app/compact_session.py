@@ -0,0 +1,243 @@
+import hashlib
+import sys
+import weakref
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.models import Question, TestConfig, TestSession
+from app.serialization import dumps
+
+# Answer slot value for "not answered yet"
+UNANSWERED = -1
+
+_CONFIG_FIELDS = ("domain", "class_level", "subject", "course", "semester", "exam", "topic", "num_questions")
+
+
+class QuestionRecord:
+    """Immutable question with the correct answer stored as an option index.
+
+    Records are interned, so sessions served from the same generated pool
+    point at the same objects and strings instead of holding copies. The
+    static part of the question's API payload is serialized once here.
+    """
+
+    __slots__ = ("question", "options", "correct_index", "payload_tail", "__weakref__")
+
+    def __init__(self, question: str, options: Tuple[str, ...], correct_index: int):
+        object.__setattr__(self, "question", question)
+        object.__setattr__(self, "options", options)
+        object.__setattr__(self, "correct_index", correct_index)
+        # '"question":...,"options":[...],"correct_answer":...}' to append after the per-request fields
+        object.__setattr__(self, "payload_tail", dumps({
+            "question": question, "options": options, "correct_answer": options[correct_index]
+        })[1:])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("QuestionRecord is immutable")
+
+    @property
+    def correct_answer(self) -> str:
+        return self.options[self.correct_index]
+
+    def to_model(self) -> Question:
+        return Question.model_construct(
+            question=self.question, options=list(self.options), correct_answer=self.correct_answer
+        )
+
+
+_records: "weakref.WeakValueDictionary[Tuple[str, Tuple[str, ...], int], QuestionRecord]" = weakref.WeakValueDictionary()
+
+
+def intern_question(question: str, options: Sequence[str], correct_index: int) -> QuestionRecord:
+    key = (sys.intern(question), tuple(sys.intern(o) for o in options), correct_index)
+    record = _records.get(key)
+    if record is None:
+        record = QuestionRecord(*key)
+        _records[key] = record
+    return record
+
+
+def record_from_question(question: Question) -> QuestionRecord:
+    return intern_question(question.question, question.options, question.options.index(question.correct_answer))
+
+
+class CompactSession:
+    """Internal session representation; pydantic models are only built at the API boundary."""
+
+    __slots__ = (
+        "session_id", "config_values", "questions", "answers", "created_at", "submitted", "generating", "room_code"
+    )
+
+    def __init__(
+        self,
+        session_id: str,
+        config_values: Tuple[Any, ...],
+        questions: List[QuestionRecord],
+        answers: array,
+        created_at: float,
+        submitted: bool = False,
+        generating: bool = False,
+        room_code: Optional[str] = None,
+    ):
+        self.session_id = session_id
+        self.config_values = config_values
+        self.questions = questions
+        self.answers = answers
+        self.created_at = created_at
+        self.submitted = submitted
+        self.generating = generating
+        # Classroom the session belongs to; its questions are the room's shared tuple
+        self.room_code = room_code
+
+    @classmethod
+    def create(
+        cls, session_id: str, config: TestConfig, questions: List[Question], generating: bool = False
+    ) -> "CompactSession":
+        return cls(
+            session_id=session_id,
+            config_values=compact_config(config),
+            questions=[record_from_question(q) for q in questions],
+            answers=array("b", [UNANSWERED] * len(questions)),
+            created_at=datetime.now().timestamp(),
+            generating=generating,
+        )
+
+    @classmethod
+    def shared(
+        cls, session_id: str, config_values: Tuple[Any, ...], questions: Tuple[QuestionRecord, ...], room_code: str
+    ) -> "CompactSession":
+        """A session over an existing immutable question set, referenced rather than copied."""
+        return cls(
+            session_id=session_id,
+            config_values=config_values,
+            questions=questions,
+            answers=array("b", [UNANSWERED] * len(questions)),
+            created_at=datetime.now().timestamp(),
+            room_code=room_code,
+        )
+    
+    @property
+    def config(self) -> TestConfig:
+        return TestConfig.model_construct(**dict(zip(_CONFIG_FIELDS, self.config_values)))
+
+    def config_dict(self) -> Dict[str, Any]:
+        """The config as the API returns it, without building a TestConfig."""
+        return dict(zip(_CONFIG_FIELDS, self.config_values))
+
+    def question_json(self, question_index: int, total_questions: int) -> bytes:
+        """Serialized question payload: per-request fields spliced onto the precomputed tail."""
+        head = dumps({
+            "question_index": question_index,
+            "total_questions": total_questions,
+            "user_answer": self.answer_text(question_index),
+        })
+        return head[:-1] + b"," + self.questions[question_index].payload_tail
+
+    @property
+    def num_questions_requested(self) -> int:
+        return self.config_values[-1]
+
+    def add_questions(self, questions: List[Question]):
+        self.questions.extend(record_from_question(q) for q in questions)
+        self.answers.extend([UNANSWERED] * len(questions))
+
+    def set_answer(self, question_index: int, answer: str) -> bool:
+        try:
+            self.answers[question_index] = self.questions[question_index].options.index(answer)
+        except ValueError:
+            return False
+        return True
+
+    def set_answers(self, answers: Dict[int, str]):
+        """Validate every answer first, then apply them all; raises ValueError listing bad indices."""
+        choices = {}
+        invalid = []
+        for question_index, answer in answers.items():
+            if 0 <= question_index < len(self.questions) and answer in self.questions[question_index].options:
+                choices[question_index] = self.questions[question_index].options.index(answer)
+            else:
+                invalid.append(question_index)
+        if invalid:
+            raise ValueError(f"Invalid answer or question index: {sorted(invalid)}")
+        for question_index, choice in choices.items():
+            self.answers[question_index] = choice
+
+    def grade(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """Score and per-question results in a single pass over the answer indices."""
+        score = 0
+        results = []
+        for i, (question, choice) in enumerate(zip(self.questions, self.answers)):
+            is_correct = choice == question.correct_index
+            score += is_correct
+            results.append({
+                "question_index": i,
+                "question": question.question,
+                "options": list(question.options),
+                "user_answer": None if choice == UNANSWERED else question.options[choice],
+                "correct_answer": question.correct_answer,
+                "is_correct": is_correct,
+            })
+        return score, results
+
+    def answer_text(self, question_index: int) -> Optional[str]:
+        choice = self.answers[question_index]
+        return None if choice == UNANSWERED else self.questions[question_index].options[choice]
+
+    @property
+    def user_answers(self) -> List[Optional[str]]:
+        return [self.answer_text(i) for i in range(len(self.answers))]
+
+    def num_answered(self) -> int:
+        return len(self.answers) - self.answers.count(UNANSWERED)
+
+    def etag(self) -> str:
+        """Changes whenever anything visible to the client (questions, answers, state) changes."""
+        digest = hashlib.blake2b(digest_size=12)
+        digest.update(self.session_id.encode())
+        digest.update(f"{len(self.questions)}|{self.submitted:d}|{self.generating:d}|".encode())
+        digest.update(self.answers.tobytes())
+        return f'"{digest.hexdigest()}"'
+
+    def to_model(self) -> TestSession:
+        return TestSession.model_construct(
+            session_id=self.session_id,
+            config=self.config,
+            questions=[q.to_model() for q in self.questions],
+            user_answers=self.user_answers,
+            created_at=datetime.fromtimestamp(self.created_at),
+            submitted=self.submitted,
+            generating=self.generating,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "config": list(self.config_values),
+            "questions": [[q.question, list(q.options), q.correct_index] for q in self.questions],
+            "answers": self.answers.tolist(),
+            "created_at": self.created_at,
+            "submitted": self.submitted,
+            "generating": self.generating,
+            "room_code": self.room_code,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompactSession":
+        return cls(
+            session_id=data["session_id"],
+            config_values=tuple(data["config"]),
+            questions=[intern_question(q, options, ci) for q, options, ci in data["questions"]],
+            answers=array("b", data["answers"]),
+            created_at=data["created_at"],
+            submitted=data["submitted"],
+            generating=data["generating"],
+            room_code=data.get("room_code"),
+        )
+
+
+def compact_config(config: TestConfig) -> Tuple[Any, ...]:
+    return tuple(
+        sys.intern(value) if isinstance(value, str) else value
+        for value in (getattr(config, field) for field in _CONFIG_FIELDS)
+    )
@@ -0,0 +1,130 @@
+import gzip
+from typing import Dict, Set
+import logging
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip is always available
+    brotli = None
+
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """Content codings the client accepts (q > 0) from an Accept-Encoding header."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def gzip_bytes(body: bytes, level: int = 9) -> bytes:
+    # mtime=0 keeps the output (and its ETag) identical across restarts
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def compressed_variants(body: bytes) -> Dict[str, bytes]:
+    """Best-effort br/gzip encodings of a static body, keeping only those that are smaller."""
+    variants = {"gzip": gzip_bytes(body)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    return {coding: data for coding, data in variants.items() if len(data) < len(body)}
+
+
+def gzip_etag(etag: str) -> str:
+    """The validator of the gzip representation: '"abc"' -> '"abc-gzip"' (weak tags stay weak)."""
+    return f'{etag[:-1]}-gzip"' if etag.endswith('"') else etag
+
+
+class GzipJSONMiddleware:
+    """Gzip application/json responses of at least minimum_size bytes for clients that accept it.
+
+    Unlike Starlette's GZipMiddleware every other response passes through
+    untouched, so server-sent event streams are not buffered and already
+    compressed static assets are not compressed again.
+
+    A compressed body gets its own ETag (suffixed "-gzip", as static assets
+    do). Endpoints only know their identity ETag, so If-None-Match also gets
+    the unsuffixed form of each gzip tag on the way in, and a 304 for one of
+    them is answered with the gzip tag on the way out.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or "gzip" not in accepted_encodings(Headers(scope=scope).get("accept-encoding", "")):
+            await self.app(scope, receive, send)
+            return
+
+        revalidated = self._add_identity_validators(scope)
+        start: Dict[str, Message] = {}
+        chunks = []
+
+        async def send_compressed(message: Message):
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                etag = headers.get("etag")
+                if message["status"] == 304 and etag and gzip_etag(etag) in revalidated:
+                    # The client revalidated the gzip representation; answer with its tag
+                    mutable = MutableHeaders(raw=message["headers"])
+                    mutable["ETag"] = gzip_etag(etag)
+                    mutable.add_vary_header("Accept-Encoding")
+                elif headers.get("content-type", "").startswith("application/json") and "content-encoding" not in headers:
+                    # Hold the start message until the body size is known
+                    start["message"] = message
+                    return
+            elif message["type"] == "http.response.body" and start:
+                chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                body = b"".join(chunks)
+                response_start = start["message"]
+                if len(body) >= self.minimum_size:
+                    body = gzip.compress(body, compresslevel=self.level, mtime=0)
+                    headers = MutableHeaders(raw=response_start["headers"])
+                    headers["Content-Encoding"] = "gzip"
+                    headers["Content-Length"] = str(len(body))
+                    if "etag" in headers:
+                        headers["ETag"] = gzip_etag(headers["etag"])
+                    headers.add_vary_header("Accept-Encoding")
+                await send(response_start)
+                await send({"type": "http.response.body", "body": body})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _add_identity_validators(scope: Scope) -> Set[str]:
+        """Add the identity form of each gzip tag to If-None-Match; returns those gzip tags.
+
+        The gzip tags are kept: static assets issue and compare them themselves.
+        The scope is changed in place, not copied, so what the router records
+        in it (scope["route"]) stays visible to outer middleware such as the
+        request latency metrics.
+        """
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if not if_none_match or '-gzip"' not in if_none_match:
+            return set()
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        revalidated = {tag for tag in tags if tag.endswith('-gzip"')}
+        extended = ", ".join(tags + [tag[:-len('-gzip"')] + '"' for tag in revalidated])
+        headers = [(name, value) for name, value in scope["headers"] if name != b"if-none-match"]
+        headers.append((b"if-none-match", extended.encode("latin-1")))
+        scope["headers"] = headers
+        return revalidated
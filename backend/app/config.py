@@ -1,36 +1,153 @@
 import os
 from dotenv import load_dotenv
+import logging
 
 # FIX: Load environment variables BEFORE defining Config class
 # Load .env file from current directory first, then parent directories
 env_loaded = load_dotenv(override=True)
 
-# Log environment loading status for debugging
-import logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-if env_loaded:
-    logger.info("Successfully loaded .env file")
-else:
-    logger.warning("No .env file found, using system environment variables")
-
-# Check if OpenRouter API key is available for debugging
-api_key = os.getenv("OPENROUTER_API_KEY")
-if api_key:
-    if api_key == "your_openrouter_api_key_here":
-        logger.error("OpenRouter API key is still set to placeholder value")
+def log_config_status():
+    """Report .env and API key status; called once from the app lifespan, not at import."""
+    if env_loaded:
+        logger.info("Successfully loaded .env file")
+    else:
+        logger.warning("No .env file found, using system environment variables")
+    
+    # Check if OpenRouter API key is available for debugging
+    api_key = Config.OPENROUTER_API_KEY
+    if api_key:
+        if api_key == "your_openrouter_api_key_here":
+            logger.error("OpenRouter API key is still set to placeholder value")
+        else:
+            masked_key = api_key[:8] + "..." + api_key[-4:] if len(api_key) > 12 else "***"
+            logger.info(f"OpenRouter API key is configured: {masked_key}")
     else:
-        logger.info("OpenRouter API key is configured")
-else:
-    logger.error("OPENROUTER_API_KEY environment variable not found")
+        logger.error("OPENROUTER_API_KEY environment variable not found")
 
 class Config:
     # FIX: Access environment variables AFTER load_dotenv() is called
     OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
     OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
     OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "deepseek/deepseek-chat")
+    # Comma-separated models tried (and hedged to) after OPENROUTER_MODEL
+    OPENROUTER_FALLBACK_MODELS = [m.strip() for m in os.getenv("OPENROUTER_FALLBACK_MODELS", "").split(",") if m.strip()]
     SESSION_EXPIRE_MINUTES = int(os.getenv("SESSION_EXPIRE_MINUTES", 30))
+    SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", 0))
+    SESSION_CLEANUP_INTERVAL_SECONDS = float(os.getenv("SESSION_CLEANUP_INTERVAL_SECONDS", 60.0))
+    # "memory" (single worker) or "sqlite" (shared by all workers on one host)
+    SESSION_STORE = os.getenv("SESSION_STORE", "memory").lower()
+    SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "sessions.sqlite3")
+    # How long a SQLite write waits for another worker's write lock before failing
+    SESSION_STORE_BUSY_TIMEOUT_SECONDS = float(os.getenv("SESSION_STORE_BUSY_TIMEOUT_SECONDS", 5.0))
+    
+    # Shared upstream HTTP client (connection pooling / keep-alive)
+    HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", 60.0))
+    HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", 10.0))
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", 30.0))
+    HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() in ("1", "true", "yes")
+    # Open a connection to OpenRouter in the background at startup so the first test skips DNS/TCP/TLS
+    UPSTREAM_PREWARM = os.getenv("UPSTREAM_PREWARM", "false").lower() in ("1", "true", "yes")
+    
+    # Upstream resilience: per-attempt deadline, jittered retries, hedging and circuit breaking
+    UPSTREAM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_ATTEMPT_TIMEOUT_SECONDS", 45.0))
+    # One deadline for a whole generation: every shard, retry, hedge and top-up round shares it
+    UPSTREAM_TOTAL_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_TOTAL_TIMEOUT_SECONDS", 60.0))
+    UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", 2))
+    UPSTREAM_BACKOFF_BASE_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_BASE_SECONDS", 0.5))
+    UPSTREAM_BACKOFF_MAX_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_MAX_SECONDS", 8.0))
+    UPSTREAM_HEDGE_ENABLED = os.getenv("UPSTREAM_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+    # Hedge after this percentile of recent latency, or the fixed delay until enough samples exist;
+    # the hedge goes to the next fallback model, or to the same model when none are configured
+    UPSTREAM_HEDGE_PERCENTILE = float(os.getenv("UPSTREAM_HEDGE_PERCENTILE", 95))
+    UPSTREAM_HEDGE_DELAY_SECONDS = float(os.getenv("UPSTREAM_HEDGE_DELAY_SECONDS", 15.0))
+    CIRCUIT_BREAKER_FAILURES = int(os.getenv("CIRCUIT_BREAKER_FAILURES", 5))
+    CIRCUIT_BREAKER_COOLDOWN_SECONDS = float(os.getenv("CIRCUIT_BREAKER_COOLDOWN_SECONDS", 30.0))
+    
+    # Observability: sampled verbose logging of raw AI payloads (0 = off, 1 = every payload)
+    DEBUG_PAYLOAD_LOG_SAMPLE_RATE = float(os.getenv("DEBUG_PAYLOAD_LOG_SAMPLE_RATE", 0.0))
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    
+    # Admission control for upstream generation (/generate-test cache misses)
+    ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", 16))
+    ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 100))
+    ADMISSION_PER_CLIENT_QUEUE = int(os.getenv("ADMISSION_PER_CLIENT_QUEUE", 3))
+    ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", 30.0))
+    # Upstream calls started per second (token bucket); 0 disables rate limiting
+    ADMISSION_RATE_PER_SECOND = float(os.getenv("ADMISSION_RATE_PER_SECOND", 5.0))
+    ADMISSION_BURST = int(os.getenv("ADMISSION_BURST", 10))
+    # Header identifying a client for fairness (falls back to X-Forwarded-For / peer address)
+    ADMISSION_CLIENT_HEADER = os.getenv("ADMISSION_CLIENT_HEADER", "")
+    
+    # Upper bound for TestConfig.num_questions
+    MAX_QUESTIONS = int(os.getenv("MAX_QUESTIONS", 20))
+    
+    # Parallel sharded generation (GENERATION_SHARD_SIZE=0 disables sharding)
+    GENERATION_SHARD_SIZE = int(os.getenv("GENERATION_SHARD_SIZE", 0))
+    GENERATION_SHARD_CONCURRENCY = int(os.getenv("GENERATION_SHARD_CONCURRENCY", 4))
+    # Extra rounds that request only the shortfall (failed shards, unusable or duplicate questions)
+    GENERATION_SHARD_RETRIES = int(os.getenv("GENERATION_SHARD_RETRIES", 1))
+    
+    # Prompt sizing: max_tokens = num_questions * estimate * headroom + overhead (capped);
+    # the estimate then follows the completion tokens OpenRouter reports
+    TOKENS_PER_QUESTION_ESTIMATE = int(os.getenv("TOKENS_PER_QUESTION_ESTIMATE", 100))
+    MAX_TOKENS_HEADROOM = float(os.getenv("MAX_TOKENS_HEADROOM", 1.3))
+    MAX_TOKENS_OVERHEAD = int(os.getenv("MAX_TOKENS_OVERHEAD", 64))
+    MAX_OUTPUT_TOKENS = int(os.getenv("MAX_OUTPUT_TOKENS", 4000))
+    
+    # Streaming generation: how long /question waits for a not-yet-generated question
+    STREAM_QUESTION_WAIT_SECONDS = float(os.getenv("STREAM_QUESTION_WAIT_SECONDS", 30.0))
+    
+    # Question bank cache ("memory", "sqlite" or "none")
+    QUESTION_CACHE_BACKEND = os.getenv("QUESTION_CACHE_BACKEND", "memory").lower()
+    QUESTION_CACHE_PATH = os.getenv("QUESTION_CACHE_PATH", "question_cache.sqlite3")
+    QUESTION_CACHE_TTL_SECONDS = float(os.getenv("QUESTION_CACHE_TTL_SECONDS", 24 * 60 * 60))
+    QUESTION_CACHE_MAX_ENTRIES = int(os.getenv("QUESTION_CACHE_MAX_ENTRIES", 1000))
+    QUESTION_CACHE_MAX_POOL_SIZE = int(os.getenv("QUESTION_CACHE_MAX_POOL_SIZE", 200))
+    # Serve from a pool only once it holds this many times the requested count (variety across visits)
+    QUESTION_CACHE_MIN_POOL_FACTOR = float(os.getenv("QUESTION_CACHE_MIN_POOL_FACTOR", 2.0))
+    # Pre-built, memory-mapped bank (python -m app.bank_builder); empty disables it
+    QUESTION_BANK_PATH = os.getenv("QUESTION_BANK_PATH", "")
+    
+    # Near-duplicate detection (MinHash/LSH) for generated batches and cached pools
+    DEDUP_SIMILARITY_THRESHOLD = float(os.getenv("DEDUP_SIMILARITY_THRESHOLD", 0.7))
+    DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", 64))
+    
+    # Topic canonicalization: variants of a known topic ("newtons law of motion" / "Laws of Motion (Newton)") share a cache key
+    TOPIC_CANONICALIZATION_ENABLED = os.getenv("TOPIC_CANONICALIZATION_ENABLED", "true").lower() in ("1", "true", "yes")
+    TOPIC_MATCH_THRESHOLD = float(os.getenv("TOPIC_MATCH_THRESHOLD", 0.6))
+    # Topics learned from successful generations, across all subjects; least recently used are dropped
+    TOPIC_INDEX_MAX_TOPICS = int(os.getenv("TOPIC_INDEX_MAX_TOPICS", 5000))
+    # Misspellings are only corrected towards topics generated at least this many times (or in the bank)
+    TOPIC_MIN_GENERATIONS = int(os.getenv("TOPIC_MIN_GENERATIONS", 3))
+    
+    # Classroom mode: one generated test shared by a room of students
+    CLASSROOM_TTL_MINUTES = int(os.getenv("CLASSROOM_TTL_MINUTES", 180))
+    CLASSROOM_MAX_ROOMS = int(os.getenv("CLASSROOM_MAX_ROOMS", 1000))
+    CLASSROOM_MAX_STUDENTS = int(os.getenv("CLASSROOM_MAX_STUDENTS", 5000))
+    
+    # Serve the docs/ frontend from this app (fingerprinted, precompressed assets); empty disables it
+    FRONTEND_DIR = os.getenv("FRONTEND_DIR", "")
+    # Gzip JSON API responses at least this large (streams and static assets are never recompressed)
+    GZIP_ENABLED = os.getenv("GZIP_ENABLED", "true").lower() in ("1", "true", "yes")
+    GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", 1024))
+    # Browsers may cache CORS preflight results this long
+    CORS_MAX_AGE_SECONDS = int(os.getenv("CORS_MAX_AGE_SECONDS", 600))
+    
+    # Background warm pool for popular (config, topic) pairs; needs the question cache
+    PREFILL_ENABLED = os.getenv("PREFILL_ENABLED", "false").lower() in ("1", "true", "yes")
+    PREFILL_TOP_K = int(os.getenv("PREFILL_TOP_K", 20))
+    PREFILL_LOW_WATER = int(os.getenv("PREFILL_LOW_WATER", 40))
+    PREFILL_INTERVAL_SECONDS = float(os.getenv("PREFILL_INTERVAL_SECONDS", 30.0))
+    PREFILL_MAX_CALLS_PER_MINUTE = int(os.getenv("PREFILL_MAX_CALLS_PER_MINUTE", 6))
+    PREFILL_TOKEN_BUDGET_PER_HOUR = int(os.getenv("PREFILL_TOKEN_BUDGET_PER_HOUR", 200000))
+    # Request counts are multiplied by this every interval so popularity tracks recent traffic
+    PREFILL_DECAY = float(os.getenv("PREFILL_DECAY", 0.95))
+    # Configs whose demand is tracked; the least requested is dropped to admit a new one
+    PREFILL_MAX_TRACKED_CONFIGS = int(os.getenv("PREFILL_MAX_TRACKED_CONFIGS", 500))
     
     # School subjects mapping
     SCHOOL_SUBJECTS = {
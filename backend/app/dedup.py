@@ -0,0 +1,156 @@
+import hashlib
+import random
+import re
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.config import Config
+from app.models import Question
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Mersenne prime for the universal hash family used by MinHash
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 61) - 1
+# Signature rows per LSH band; with 64 permutations that is 16 bands, which
+# surfaces pairs above ~0.6 similarity as candidates with near certainty
+_ROWS_PER_BAND = 4
+
+
+def normalize_text(text: str) -> str:
+    text = _PUNCTUATION_RE.sub(" ", text.lower())
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little") & _MAX_HASH
+
+
+# Question-phrasing words that carry no subject matter; rewordings mostly differ in these
+_STOPWORDS = frozenset(
+    "a an and are as at be by called correct does do following for from how in is it its known "
+    "not of on or statement the these this to true what when which who why with".split()
+)
+
+
+def shingles(question: Question) -> Set[str]:
+    """Content words of the stem plus one shingle for the whole option set.
+
+    The option set is a single element so that different questions over the
+    same options ("SI unit of force" / "of energy") stay distinct, while it
+    still separates generic stems ("Which of the following is true?") whose
+    options differ.
+    """
+    result = {f"q:{word}" for word in normalize_text(question.question).split() if word not in _STOPWORDS}
+    result.add(_option_shingle(question))
+    return result
+
+
+def _option_shingle(question: Question) -> str:
+    return "o:" + "|".join(sorted(normalize_text(option) for option in question.options))
+
+
+def _exact_key(question: Question) -> str:
+    # Stem alone is not enough: generic stems repeat across unrelated option sets
+    return f"{normalize_text(question.question)}\n{_option_shingle(question)}"
+
+
+class MinHasher:
+    """MinHash signatures over shingle sets; the seed is fixed so signatures are comparable across processes."""
+
+    def __init__(self, num_perm: int, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, items: Iterable[str]) -> Tuple[int, ...]:
+        hashes = [_hash64(item) for item in items] or [0]
+        return tuple(min([(a * h + b) % _PRIME for h in hashes]) for a, b in self._params)
+
+
+def jaccard(first: FrozenSet[str], second: FrozenSet[str]) -> float:
+    return len(first & second) / len(first | second) if first or second else 1.0
+
+
+class DuplicateIndex:
+    """Incremental exact + near-duplicate index for one question pool.
+
+    Exact duplicates are found by normalized stem and option set. Near-duplicate candidates
+    come from LSH over MinHash signatures, so a question is only compared with
+    the few entries sharing a band bucket, not the whole pool; candidates are
+    then confirmed with the exact Jaccard similarity of the shingle sets.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, hasher: Optional[MinHasher] = None):
+        self.threshold = Config.DEDUP_SIMILARITY_THRESHOLD if threshold is None else threshold
+        self.hasher = hasher or _default_hasher()
+        self.bands = max(1, self.hasher.num_perm // _ROWS_PER_BAND)
+        self._exact: Set[str] = set()
+        self._shingles: List[FrozenSet[str]] = []
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND]
+
+    def check(self, question: Question) -> Tuple[Optional[str], FrozenSet[str], Tuple[int, ...]]:
+        """("exact" | "near" | None, shingles, signature) without adding the question."""
+        items = frozenset(shingles(question))
+        signature = self.hasher.signature(items)
+        if _exact_key(question) in self._exact:
+            return "exact", items, signature
+        checked = set()
+        for band_key in self._band_keys(signature):
+            for candidate in self._buckets.get(band_key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if jaccard(items, self._shingles[candidate]) >= self.threshold:
+                    return "near", items, signature
+        return None, items, signature
+
+    def _insert(self, question: Question, items: FrozenSet[str], signature: Tuple[int, ...]):
+        position = len(self._shingles)
+        self._exact.add(_exact_key(question))
+        self._shingles.append(items)
+        for band_key in self._band_keys(signature):
+            self._buckets[band_key].append(position)
+
+    def add(self, question: Question) -> Optional[str]:
+        """Add the question unless it duplicates one already indexed; returns the duplicate kind."""
+        kind, items, signature = self.check(question)
+        if kind is None:
+            self._insert(question, items, signature)
+        return kind
+
+    def filter(self, questions: Iterable[Question]) -> Tuple[List[Question], Dict[str, int]]:
+        """Keep questions that are new relative to the index (and to each other), indexing them."""
+        kept = []
+        dropped = {"exact": 0, "near": 0}
+        for question in questions:
+            kind = self.add(question)
+            if kind is None:
+                kept.append(question)
+            else:
+                dropped[kind] += 1
+        return kept, dropped
+
+
+_hasher: Optional[MinHasher] = None
+
+
+def _default_hasher() -> MinHasher:
+    global _hasher
+    if _hasher is None:
+        _hasher = MinHasher(Config.DEDUP_NUM_PERM)
+    return _hasher
+
+
+def build_index(questions: Iterable[Question]) -> DuplicateIndex:
+    index = DuplicateIndex()
+    index.filter(questions)
+    return index
@@ -1,20 +1,147 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, StreamingResponse, Response, PlainTextResponse
 from pydantic import ValidationError
+import asyncio
+import json
 import logging
-from typing import Dict, Any
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Set, Tuple
 
-from app.models import TestConfig
+from app.models import TestConfig, Question, AnswerBatch, AnswerRequest, JoinRoomRequest
+from app.compact_session import CompactSession
 from app.ai_generator import ai_generator
 from app.session_manager import session_manager
-from app.config import Config
+from app.question_cache import question_cache, cache_key, shuffle_options, shuffle_questions
+from app.dedup import build_index
+from app.question_bank import question_bank
+from app.topics import topic_index
+from app.classroom import Room, room_manager
+from app.single_flight import SingleFlight
+from app.prefill import PrefillWorker
+from app.admission import AdmissionController, AdmissionRejected, client_key, retry_after_header
+from app.metrics import metrics, HTTP_REQUEST_SECONDS, RequestLatencyMiddleware
+from app.serialization import CachedJSON, FastJSONResponse, RawJSONResponse, dumps, etag_matches
+from app.compression import GzipJSONMiddleware
+from app.static_assets import StaticBundle
+from app.config import Config, log_config_status
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Exam Practice App", version="1.0.0")
+# Keeps background streaming tasks referenced until they finish
+_background_tasks: Set[asyncio.Task] = set()
+
+# Identical concurrent /generate-test requests share one upstream call
+generation_flight = SingleFlight()
+
+# Bounds concurrent/queued upstream generations, fair across clients
+admission = AdmissionController(
+    max_concurrent=Config.ADMISSION_MAX_CONCURRENT,
+    max_queue=Config.ADMISSION_MAX_QUEUE,
+    per_client_queue=Config.ADMISSION_PER_CLIENT_QUEUE,
+    rate_per_second=Config.ADMISSION_RATE_PER_SECOND,
+    burst=Config.ADMISSION_BURST,
+    max_wait_seconds=Config.ADMISSION_MAX_WAIT_SECONDS
+)
+
+# Warms question pools for popular configs in the background
+prefill_worker = PrefillWorker(ai_generator, question_cache, admission)
+
+# The docs/ frontend, served same-origin when FRONTEND_DIR is set
+frontend = StaticBundle(Config.FRONTEND_DIR) if Config.FRONTEND_DIR else None
+
+def _component_stats():
+    """Scrape-time snapshot of the counters each component already keeps."""
+    components = {
+        "admission": admission.stats(),
+        "question_cache": question_cache.stats(),
+        "question_bank": question_bank.stats(),
+        "topics": topic_index.stats(),
+        "classroom": room_manager.stats(),
+        "frontend": frontend.stats() if frontend is not None else {},
+        "prefill": prefill_worker.stats(),
+        "salvage": ai_generator.salvage_stats,
+        "prompts": ai_generator.prompts.stats(),
+        "single_flight": {
+            "started": generation_flight.started,
+            "coalesced": generation_flight.coalesced,
+            "in_flight": generation_flight.in_flight(),
+        },
+        "upstream": {
+            "hedges_fired": ai_generator.policy.hedges_fired,
+            "hedges_won": ai_generator.policy.hedges_won,
+            "tokens_used": ai_generator.tokens_used,
+        },
+    }
+    return {
+        (component, stat): value
+        for component, stats in components.items()
+        for stat, value in stats.items()
+    }
+
+# Refreshed by /metrics (and the cleanup loop) before rendering, so the scrape never blocks the loop
+metrics.gauge("studmaster_sessions_active", "Sessions currently stored", fn=lambda: session_manager.active)
+metrics.gauge(
+    "studmaster_component_stat", "Internal counters and gauges by component", ["component", "stat"], fn=_component_stats
+)
+metrics.gauge(
+    "studmaster_circuit_open", "1 while a model's circuit breaker is open", ["model"],
+    fn=lambda: {
+        (model,): int(breaker.state == "open") for model, breaker in ai_generator.policy.breakers.items()
+    }
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Import-time work is kept minimal; stores, clients and config checks come up here
+    started = time.perf_counter()
+    app.state.ready = False
+    log_config_status()
+    session_manager.open()
+    if question_bank.open() and Config.TOPIC_CANONICALIZATION_ENABLED:
+        # Bank topics are the canonical spelling for their variants
+        topic_index.seed(question_bank.keys())
+    if frontend is not None:
+        frontend.load()
+    await ai_generator.startup()
+    if Config.UPSTREAM_PREWARM:
+        prewarm_task = asyncio.create_task(ai_generator.prewarm())
+        _background_tasks.add(prewarm_task)
+        prewarm_task.add_done_callback(_background_tasks.discard)
+    cleanup_task = asyncio.create_task(
+        session_manager.run_cleanup_loop(Config.SESSION_CLEANUP_INTERVAL_SECONDS)
+    )
+    _background_tasks.add(cleanup_task)
+    cleanup_task.add_done_callback(_background_tasks.discard)
+    if Config.PREFILL_ENABLED:
+        if question_cache.enabled:
+            prefill_task = asyncio.create_task(prefill_worker.run())
+            _background_tasks.add(prefill_task)
+            prefill_task.add_done_callback(_background_tasks.discard)
+        else:
+            logger.warning("PREFILL_ENABLED is set but the question cache is disabled; prefill not started")
+    app.state.ready = True
+    logger.info(f"Startup complete in {time.perf_counter() - started:.3f}s")
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        for task in list(_background_tasks):
+            task.cancel()
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+        # Generations still running would otherwise outlive the HTTP client they use
+        await generation_flight.cancel_all()
+        await ai_generator.shutdown()
+        question_bank.close()
+
+app = FastAPI(
+    title="Exam Practice App",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
+)
 
 # CORS configuration
 app.add_middleware(
@@ -23,8 +150,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=Config.CORS_MAX_AGE_SECONDS,
 )
 
+if Config.GZIP_ENABLED:
+    app.add_middleware(GzipJSONMiddleware, minimum_size=Config.GZIP_MIN_BYTES)
+
+# Outermost, so the timing covers CORS and compression too
+app.add_middleware(RequestLatencyMiddleware, histogram=HTTP_REQUEST_SECONDS)
+
 @app.exception_handler(ValidationError)
 async def validation_exception_handler(request: Request, exc: ValidationError):
     return JSONResponse(
@@ -33,34 +167,228 @@ async def validation_exception_handler(request: Request, exc: ValidationError):
     )
 
 @app.get("/")
-async def root():
+async def root(request: Request):
+    if frontend is not None and frontend.enabled:
+        return _frontend_response("", request)
     return {"message": "Exam Practice API", "status": "running"}
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz(request: Request):
+    """Readiness: startup has finished and the session store answers."""
+    if not getattr(request.app.state, "ready", False):
+        return FastJSONResponse({"status": "starting"}, status_code=503)
+    try:
+        await session_manager.count()
+    except Exception as e:
+        logger.error(f"Readiness check failed: {type(e).__name__}: {e}")
+        return FastJSONResponse({"status": "unavailable"}, status_code=503)
+    return {"status": "ready"}
+
+@app.get("/metrics")
+async def get_metrics():
+    if not Config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    try:
+        await session_manager.count()
+    except Exception as e:
+        # Render the other metrics anyway; the gauge keeps its last value
+        logger.warning(f"Session count for metrics failed: {type(e).__name__}: {e}")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Static for the lifetime of the process: serialize once, revalidate by ETag
+_config_options = CachedJSON({
+    "school_subjects": Config.SCHOOL_SUBJECTS,
+    "college_courses": Config.COLLEGE_COURSES,
+    "competitive_exams": Config.COMPETITIVE_EXAMS,
+    "max_questions": Config.MAX_QUESTIONS
+})
+
 @app.get("/config/options")
-async def get_config_options():
-    return {
-        "school_subjects": Config.SCHOOL_SUBJECTS,
-        "college_courses": Config.COLLEGE_COURSES,
-        "competitive_exams": Config.COMPETITIVE_EXAMS
-    }
+async def get_config_options(request: Request):
+    return _config_options.response(request.headers.get("if-none-match"))
+
+async def _generate_shared(config: TestConfig, client_id: str) -> List[Question]:
+    """Generate once per identical in-flight config; every caller gets its own shuffled copy."""
+    async def generate() -> List[Question]:
+        # Only the leader of a coalesced group takes an upstream slot
+        await admission.acquire(client_id)
+        try:
+            generated = await ai_generator.generate_questions(config)
+        finally:
+            admission.release()
+        await question_cache.put(config, generated)
+        _learn_topic(config)
+        return generated
+    
+    key = f"{cache_key(config)}|{config.num_questions}"
+    return shuffle_questions(await generation_flight.do(key, generate))
+
+def _stream_shared(canonical: TestConfig, client_id: str) -> AsyncIterator[Question]:
+    """Stream questions for `canonical`, sharing one upstream stream among identical concurrent requests."""
+    async def generate():
+        # The upstream slot is held until the stream has been fully drained
+        await admission.acquire(client_id)
+        received = []
+        stream = ai_generator.stream_questions(canonical)
+        try:
+            async for question in stream:
+                received.append(question)
+                yield question
+        finally:
+            await stream.aclose()
+            admission.release()
+            if len(received) >= 5:
+                await question_cache.put(canonical, received)
+                _learn_topic(canonical)
+    
+    key = f"{cache_key(canonical)}|{canonical.num_questions}"
+    return generation_flight.stream(key, generate)
+
+async def _start_streaming_session(config: TestConfig, client_id: str, canonical: Optional[TestConfig] = None) -> str:
+    """Create the session as soon as the first question arrives; the rest stream in behind it.
+    
+    Questions are generated and cached for `canonical` (default: config); the session keeps config.
+    Every session attached to a shared stream gets its own option order.
+    """
+    canonical = canonical or config
+    stream = _stream_shared(canonical, client_id)
+    try:
+        first_question = await stream.__anext__()
+    except StopAsyncIteration:
+        raise ValueError("AI returned no valid questions")
+    
+    session_id = await session_manager.create_session(config, [shuffle_options(first_question)], generating=True)
+    task = asyncio.create_task(_drain_question_stream(session_id, stream, first_question, canonical, client_id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return session_id
+
+async def _drain_question_stream(
+    session_id: str, stream: AsyncIterator[Question], first_question: Question, canonical: TestConfig, client_id: str
+):
+    received = [first_question]
+    try:
+        session_open = True
+        try:
+            async for question in stream:
+                if not await session_manager.append_questions(session_id, [shuffle_options(question)]):
+                    session_open = False
+                    break
+                received.append(question)
+        except Exception as e:
+            logger.error(f"Streaming generation failed for session {session_id}: {e}")
+        finally:
+            await stream.aclose()
+        
+        if session_open and len(received) < canonical.num_questions:
+            # The stream ended or was cut off short: fill the rest like a non-streamed test would
+            received.extend(await _top_up_session(session_id, canonical, received, client_id))
+    finally:
+        await session_manager.finish_generation(session_id)
+    
+    logger.info(f"Session {session_id} finished streaming with {len(received)} questions")
+    if len(received) < canonical.num_questions:
+        logger.warning(
+            f"Streaming session {session_id} ended with {len(received)} of {canonical.num_questions} questions"
+        )
+
+async def _top_up_session(
+    session_id: str, canonical: TestConfig, received: List[Question], client_id: str
+) -> List[Question]:
+    """Generate the questions a stream fell short by and append them; returns those appended."""
+    missing = canonical.num_questions - len(received)
+    logger.info(f"Topping up session {session_id} with {missing} questions")
+    # Sessions sharing one short stream share this generation too (same key in _generate_shared)
+    request = canonical.model_copy(update={"num_questions": max(5, missing)})
+    try:
+        extra = await _generate_shared(request, client_id)
+    except (AdmissionRejected, ValueError) as e:
+        logger.warning(f"Top-up for session {session_id} failed: {e}")
+        return []
+    fresh, _ = build_index(received).filter(extra)
+    fresh = fresh[:missing]
+    if not fresh or not await session_manager.append_questions(session_id, [shuffle_options(q) for q in fresh]):
+        return []
+    return fresh
+
+def _question_payload(session: CompactSession, question_index: int) -> bytes:
+    # Includes correct_answer for frontend validation
+    return session.question_json(question_index, _expected_total(session))
+
+def _expected_total(session: CompactSession) -> int:
+    # While streaming, report the requested count; afterwards, what actually arrived
+    if session.generating:
+        return max(session.num_questions_requested, len(session.questions))
+    return len(session.questions)
+
+def _canonical_config(config: TestConfig) -> TestConfig:
+    """The config to look up, generate and cache under: same test, canonical spelling of the topic."""
+    if not Config.TOPIC_CANONICALIZATION_ENABLED:
+        return config
+    canonical = topic_index.canonicalize(config)
+    if canonical is not config:
+        logger.info(f"Topic '{config.topic}' matched canonical topic '{canonical.topic}'")
+    return canonical
+
+def _learn_topic(canonical: TestConfig):
+    # Only topics that produced a usable test are learned, never every typed string
+    if Config.TOPIC_CANONICALIZATION_ENABLED:
+        topic_index.learn(canonical)
+
+async def _stored_questions(canonical: TestConfig) -> Tuple[Optional[List[Question]], str]:
+    """Questions from the pre-built bank or the question cache (None if neither can serve), and the source."""
+    questions = question_bank.sample(canonical)
+    if questions is not None:
+        return questions, "question bank"
+    # Only topics the bank does not cover are worth warming
+    prefill_worker.record_request(canonical)
+    return await question_cache.get(canonical), "question cache"
 
 @app.post("/generate-test")
-async def generate_test(config_data: Dict[str, Any]):
+async def generate_test(config: TestConfig, request: Request, stream: bool = False):
     try:
-        # Validate input data
-        config = TestConfig(**config_data)
+        # The body was validated into TestConfig once, by FastAPI
         logger.info(f"Generating test for: {config.domain}, topic: {config.topic}")
         
-        # Generate questions using AI
-        try:
-            questions = await ai_generator.generate_questions(config)
-        except ValueError as e:
-            # FIX: Catch AI generation errors and provide user-friendly message
-            logger.error(f"AI generation failed: {e}")
-            raise HTTPException(
-                status_code=503,
-                detail=f"AI question generation failed: {str(e)}. Please check your API key and try again."
-            )
+        # The session itself keeps the topic as the student typed it
+        canonical = _canonical_config(config)
+        
+        # Serve from the pre-built bank or the question cache when possible, otherwise generate using AI
+        client_id = client_key(request.headers, request.client.host if request.client else None)
+        questions, source = await _stored_questions(canonical)
+        if questions is None and stream:
+            try:
+                session_id = await _start_streaming_session(config, client_id, canonical)
+            except ValueError as e:
+                logger.error(f"AI generation failed: {e}")
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"AI question generation failed: {str(e)}. Please check your API key and try again."
+                )
+            logger.info(f"Created streaming session: {session_id}")
+            return FastJSONResponse({
+                "session_id": session_id,
+                "num_questions": config.num_questions,
+                "streaming": True,
+                "config": config.model_dump()
+            })
+        if questions is None:
+            try:
+                questions = await _generate_shared(canonical, client_id)
+            except ValueError as e:
+                # FIX: Catch AI generation errors and provide user-friendly message
+                logger.error(f"AI generation failed: {e}")
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"AI question generation failed: {str(e)}. Please check your API key and try again."
+                )
+        else:
+            logger.info(f"Served {len(questions)} questions from {source}")
         
         if len(questions) < 5:
             # FIX: Ensure minimum questions requirement
@@ -73,18 +401,23 @@ async def generate_test(config_data: Dict[str, Any]):
             logger.info(f"Generated {len(questions)} questions (requested {config.num_questions})")
         
         # Create session
-        session_id = session_manager.create_session(config, questions)
+        session_id = await session_manager.create_session(config, questions)
         logger.info(f"Created session: {session_id} with {len(questions)} questions")
         
-        return {
+        return FastJSONResponse({
             "session_id": session_id,
             "num_questions": len(questions),
-            "config": config.dict()
-        }
+            "streaming": False,
+            "config": config.model_dump()
+        })
     
-    except ValidationError as e:
-        logger.error(f"Validation error: {e}")
-        raise HTTPException(status_code=422, detail=str(e))
+    except AdmissionRejected as e:
+        logger.warning(f"Rejected generate-test from {client_id}: {e}")
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": retry_after_header(e.retry_after)}
+        )
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
@@ -98,90 +431,273 @@ async def generate_test(config_data: Dict[str, Any]):
 
 @app.get("/question/{session_id}/{question_index}")
 async def get_question(session_id: str, question_index: int):
-    session = session_manager.get_session(session_id)
+    # Waits for questions that are still streaming in; returns immediately otherwise
+    session = await session_manager.wait_for_question(
+        session_id, question_index, Config.STREAM_QUESTION_WAIT_SECONDS
+    )
     if not session:
         raise HTTPException(status_code=404, detail="Session not found or expired")
     
     if question_index < 0 or question_index >= len(session.questions):
+        if session.generating:
+            raise HTTPException(status_code=504, detail="Question is still being generated, please retry")
         raise HTTPException(status_code=400, detail="Invalid question index")
     
-    question = session.questions[question_index]
-    return {
-        "question_index": question_index,
-        "total_questions": len(session.questions),
-        "question": question.question,
-        "options": question.options,
-        "user_answer": session.user_answers[question_index],
-        "correct_answer": question.correct_answer  # FIX: Added correct_answer for frontend validation
-    }
+    return RawJSONResponse(_question_payload(session, question_index))
+
+def _parse_range(range_spec: Optional[str]) -> Tuple[int, Optional[int]]:
+    """Parse an inclusive "start-end" (or open-ended "start-") question range into (start, stop or None)."""
+    if not range_spec:
+        return 0, None
+    start_text, sep, end_text = range_spec.partition("-")
+    try:
+        start = int(start_text)
+        stop = int(end_text) + 1 if end_text else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid range, expected 'start-end'")
+    if not sep or start < 0 or (stop is not None and stop <= start):
+        raise HTTPException(status_code=400, detail="Invalid range, expected 'start-end'")
+    return start, stop
+
+@app.get("/questions/{session_id}")
+async def get_questions(session_id: str, request: Request, question_range: Optional[str] = Query(None, alias="range")):
+    """All (or a range of) questions in one response, with ETag revalidation.
+    
+    Like /question, waits while the first requested question is still streaming in; a range
+    starting past what was generated is empty, with total_questions saying how many exist.
+    """
+    start, stop = _parse_range(question_range)
+    session = await session_manager.wait_for_question(session_id, start, Config.STREAM_QUESTION_WAIT_SECONDS)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    
+    # Content includes the student's answers, so only private caches, always revalidated
+    headers = {"ETag": session.etag(), "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    available = len(session.questions)
+    indices = range(start, available if stop is None else min(stop, available))
+    head = dumps({
+        "session_id": session_id,
+        "total_questions": _expected_total(session),
+        "generating": session.generating
+    })
+    questions = b",".join(_question_payload(session, i) for i in indices)
+    return RawJSONResponse(head[:-1] + b',"questions":[' + questions + b"]}", headers=headers)
+
+@app.get("/questions/{session_id}/stream")
+async def stream_session_questions(session_id: str):
+    """Server-sent events: one "question" event per question as it becomes available."""
+    if not await session_manager.get_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    
+    async def events():
+        index = 0
+        while True:
+            session = await session_manager.wait_for_question(
+                session_id, index, Config.STREAM_QUESTION_WAIT_SECONDS
+            )
+            if not session:
+                break
+            if index < len(session.questions):
+                yield f"event: question\ndata: {_question_payload(session, index).decode()}\n\n"
+                index += 1
+            elif not session.generating:
+                break
+            else:
+                yield ": waiting\n\n"
+        yield f"event: done\ndata: {json.dumps({'total_questions': index})}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.post("/answer/{session_id}/{question_index}")
-async def submit_answer(session_id: str, question_index: int, answer_data: Dict[str, str]):
-    session = session_manager.get_session(session_id)
+async def submit_answer(session_id: str, question_index: int, answer_data: AnswerRequest):
+    session = await session_manager.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found or expired")
     
     if session.submitted:
         raise HTTPException(status_code=400, detail="Test already submitted")
     
-    answer = answer_data.get("answer")
+    answer = answer_data.answer
     if not answer:
         raise HTTPException(status_code=400, detail="Answer is required")
     
-    success = session_manager.update_answer(session_id, question_index, answer)
+    success = await session_manager.update_answer(session_id, question_index, answer)
     if not success:
         raise HTTPException(status_code=400, detail="Invalid answer or question index")
     
     return {"success": True, "message": "Answer saved"}
 
+@app.post("/answers/{session_id}")
+async def submit_answers(session_id: str, answer_batch: AnswerBatch):
+    session = await session_manager.get_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    
+    if session.submitted:
+        raise HTTPException(status_code=400, detail="Test already submitted")
+    
+    answers = answer_batch.as_mapping()
+    try:
+        success = await session_manager.update_answers(session_id, answers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not success:
+        raise HTTPException(status_code=400, detail="Test already submitted")
+    
+    return {"success": True, "message": f"{len(answers)} answers saved"}
+
 @app.post("/submit/{session_id}")
-async def submit_test(session_id: str):
-    session = session_manager.submit_test(session_id)
+async def submit_test(session_id: str, answer_batch: Optional[AnswerBatch] = None):
+    # The final answer vector may come with the submit itself, saving one request per answer
+    answers = answer_batch.as_mapping() if answer_batch else None
+    try:
+        session = await session_manager.submit_test(session_id, answers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not session:
         raise HTTPException(status_code=404, detail="Session not found, expired, or already submitted")
     
     # Calculate score
-    score = 0
-    results = []
-    
-    for i, (question, user_answer) in enumerate(zip(session.questions, session.user_answers)):
-        is_correct = user_answer == question.correct_answer
-        if is_correct:
-            score += 1
-        
-        results.append({
-            "question_index": i,
-            "question": question.question,
-            "options": question.options,
-            "user_answer": user_answer,
-            "correct_answer": question.correct_answer,
-            "is_correct": is_correct
-        })
-    
+    score, results = session.grade()
     percentage = (score / len(session.questions)) * 100
     
-    return {
+    response = {
         "session_id": session_id,
         "score": score,
         "total": len(session.questions),
         "percentage": round(percentage, 2),
         "results": results,
-        "config": session.config.dict()
+        "config": session.config_dict()
     }
+    if session.room_code:
+        rank = room_manager.record_result(session.room_code, session_id, score)
+        if rank is not None:
+            response["room"] = {"room_code": session.room_code, "rank": rank}
+    return FastJSONResponse(response)
 
 @app.get("/test-summary/{session_id}")
 async def get_test_summary(session_id: str):
-    session = session_manager.get_session(session_id)
+    session = await session_manager.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found or expired")
     
-    return {
+    return FastJSONResponse({
         "session_id": session_id,
-        "num_questions": len(session.questions),
-        "num_answered": sum(1 for ans in session.user_answers if ans is not None),
+        "num_questions": _expected_total(session),
+        "num_answered": session.num_answered(),
         "submitted": session.submitted,
-        "config": session.config.dict()
-    }
+        "generating": session.generating,
+        "config": session.config_dict()
+    })
+
+def _get_room(room_code: str) -> Room:
+    room = room_manager.get(room_code)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found or expired")
+    return room
+
+@app.post("/rooms")
+async def create_room(config: TestConfig, request: Request):
+    """Generate one test for a whole class; students join it with the returned room code."""
+    client_id = client_key(request.headers, request.client.host if request.client else None)
+    canonical = _canonical_config(config)
+    try:
+        questions, source = await _stored_questions(canonical)
+        if questions is None:
+            questions = await _generate_shared(canonical, client_id)
+            source = "AI generation"
+    except AdmissionRejected as e:
+        logger.warning(f"Rejected room creation from {client_id}: {e}")
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": retry_after_header(e.retry_after)}
+        )
+    except ValueError as e:
+        logger.error(f"AI generation failed: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"AI question generation failed: {str(e)}. Please check your API key and try again."
+        )
+    if len(questions) < 5:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Could only generate {len(questions)} valid questions. Need at least 5. Please try again with a different topic."
+        )
+    
+    room = room_manager.create(config, questions)
+    logger.info(f"Created room {room.code} with {len(room.questions)} questions from {source}")
+    return FastJSONResponse({
+        "room_code": room.code,
+        "num_questions": len(room.questions),
+        "expires_in_seconds": int(room_manager.ttl_seconds),
+        "config": room.config
+    })
+
+@app.get("/rooms/{room_code}")
+async def get_room(room_code: str):
+    room = _get_room(room_code)
+    return FastJSONResponse({
+        "room_code": room.code,
+        "num_questions": len(room.questions),
+        "joined": len(room.students),
+        "submitted": room.leaderboard.size,
+        "config": room.config
+    })
+
+@app.post("/rooms/{room_code}/join")
+async def join_room(room_code: str, join: JoinRoomRequest):
+    """A per-student session over the room's shared questions; answer and submit it like any other."""
+    room = _get_room(room_code)
+    # Reserved before the first await, so concurrent joins cannot take the same name or last seat
+    try:
+        room_manager.reserve(room, join.name)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    try:
+        session_id = await session_manager.create_shared_session(room.config_values, room.questions, room.code)
+    except BaseException:
+        room_manager.release(room, join.name)
+        raise
+    room_manager.add_student(room, session_id, join.name)
+    return FastJSONResponse({
+        "session_id": session_id,
+        "room_code": room.code,
+        "name": join.name,
+        "num_questions": len(room.questions),
+        "streaming": False,
+        "config": room.config
+    })
+
+@app.get("/rooms/{room_code}/leaderboard")
+async def get_leaderboard(
+    room_code: str,
+    request: Request,
+    limit: int = Query(10, ge=1, le=100),
+    session_id: Optional[str] = None
+):
+    """Top scores (and the caller's own rank), with ETag revalidation for polling clients."""
+    room = _get_room(room_code)
+    headers = {"ETag": f'"{room.code}-{room.version}"', "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(room_manager.leaderboard(room, limit, session_id), headers=headers)
+
+def _frontend_response(path: str, request: Request) -> Response:
+    asset = frontend.get(path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return asset.response(request.headers.get("accept-encoding", ""), request.headers.get("if-none-match"))
+
+if frontend is not None:
+    # Registered last so it only sees paths no API route claimed
+    @app.get("/{asset_path:path}", include_in_schema=False)
+    async def get_frontend_asset(asset_path: str, request: Request):
+        return _frontend_response(asset_path, request)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,292 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; covers fast in-process work up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """A settable gauge, or one computed at scrape time from `fn`.
+
+    `fn` returns a number, or a dict mapping label-value tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        fn: Optional[Callable[[], Union[float, Dict[LabelValues, float]]]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str):
+        self._values[self._key(labels)] = value
+
+    def samples(self) -> List[str]:
+        values = self._values
+        if self.fn is not None:
+            current = self.fn()
+            values = current if isinstance(current, dict) else {(): current}
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (non-cumulative, last is +Inf), sum]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Minimal in-process registry rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), fn=None) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, fn))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """Observe the wall time of the block (also when it raises)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, **labels)
+
+
+class UpstreamTimer:
+    """Splits one upstream HTTP call into connect / time-to-first-byte / total.
+
+    Pass `timer.trace` as the httpx "trace" request extension; connect time is
+    only observed when a new connection was opened (not on keep-alive reuse).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.connect_seconds: Optional[float] = None
+        self.ttfb_seconds: Optional[float] = None
+        self._connect_started: Optional[float] = None
+
+    async def trace(self, event: str, info: dict):
+        now = time.perf_counter()
+        if event == "connection.connect_tcp.started":
+            self._connect_started = now
+        elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            if self._connect_started is not None:
+                self.connect_seconds = now - self._connect_started
+        elif event.endswith("receive_response_headers.complete") and self.ttfb_seconds is None:
+            self.ttfb_seconds = now - self.started
+
+    def observe(self, model: str, outcome: str):
+        if self.connect_seconds is not None:
+            UPSTREAM_SECONDS.observe(self.connect_seconds, model=model, phase="connect", outcome=outcome)
+        if self.ttfb_seconds is not None:
+            UPSTREAM_SECONDS.observe(self.ttfb_seconds, model=model, phase="ttfb", outcome=outcome)
+        UPSTREAM_SECONDS.observe(time.perf_counter() - self.started, model=model, phase="total", outcome=outcome)
+
+
+class RequestLatencyMiddleware:
+    """Observes each HTTP request, from arrival to its last body chunk, in `histogram`.
+
+    Plain ASGI, so streamed bodies pass straight through and streaming
+    responses are timed until they end, not just until their headers.
+    Requests are labelled by route template so per-session URLs do not
+    explode cardinality.
+    """
+
+    def __init__(self, app: ASGIApp, histogram: Histogram):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        observed = False
+
+        def observe():
+            nonlocal observed
+            observed = True
+            route = scope.get("route")
+            self.histogram.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status),
+            )
+
+        async def send_timed(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                observe()
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            # Failed before (or while) sending the body, or the client went away
+            if not observed:
+                observe()
+
+
+# Global registry and the application's metrics
+metrics = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "studmaster_http_request_duration_seconds", "API request latency by route", ["method", "route", "status"]
+)
+UPSTREAM_SECONDS = metrics.histogram(
+    "studmaster_upstream_duration_seconds",
+    "OpenRouter call latency split into connect, time to first byte and total",
+    ["model", "phase", "outcome"],
+)
+UPSTREAM_TOKENS = metrics.counter(
+    "studmaster_upstream_tokens_total", "Tokens requested (max_tokens) and reported by OpenRouter", ["kind"]
+)
+UPSTREAM_STREAM_CUTOFFS = metrics.counter(
+    "studmaster_upstream_stream_cutoffs_total", "Streams closed early once enough valid questions were parsed"
+)
+PARSE_SECONDS = metrics.histogram(
+    "studmaster_question_parse_duration_seconds", "Time spent parsing and validating AI output", ["stage"]
+)
+QUESTIONS_ACCEPTED = metrics.counter("studmaster_questions_accepted_total", "Generated questions that passed validation")
+QUESTIONS_DISCARDED = metrics.counter(
+    "studmaster_questions_discarded_total", "Generated questions dropped, by validation rule", ["rule"]
+)
+SESSION_CLEANUP_SECONDS = metrics.histogram(
+    "studmaster_session_cleanup_duration_seconds", "Duration of expired-session scans"
+)
+SESSIONS_EXPIRED = metrics.counter("studmaster_sessions_expired_total", "Sessions removed by expiry or the session cap")
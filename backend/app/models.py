@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Literal
+from typing import Dict, List, Optional, Literal, Union
 from datetime import datetime
+from app.config import Config
 
 class TestConfig(BaseModel):
     domain: Literal["school", "college", "competitive"]
@@ -18,7 +19,7 @@ class TestConfig(BaseModel):
     
     # Common fields
     topic: str = Field(..., min_length=1, max_length=100)
-    num_questions: int = Field(..., ge=5, le=20)
+    num_questions: int = Field(..., ge=5, le=Config.MAX_QUESTIONS)
     
     @validator('subject', always=True)
     def validate_subject(cls, v, values):
@@ -55,10 +56,36 @@ class Question(BaseModel):
             raise ValueError('Correct answer must be one of the options')
         return v
 
+class AnswerRequest(BaseModel):
+    # Optional so a missing answer keeps returning the endpoint's own 400
+    answer: Optional[str] = None
+
+class JoinRoomRequest(BaseModel):
+    name: str = Field(..., min_length=1, max_length=40)
+    
+    @validator('name')
+    def validate_name(cls, v):
+        v = " ".join(v.split())
+        if not v:
+            raise ValueError('Name must not be blank')
+        return v
+
+class AnswerBatch(BaseModel):
+    # Either a full vector aligned with question indices (null = unanswered)
+    # or a sparse {question_index: answer} mapping
+    answers: Union[List[Optional[str]], Dict[int, str]]
+    
+    def as_mapping(self) -> Dict[int, str]:
+        if isinstance(self.answers, dict):
+            return self.answers
+        return {i: answer for i, answer in enumerate(self.answers) if answer is not None}
+
 class TestSession(BaseModel):
     session_id: str
     config: TestConfig
     questions: List[Question]
     user_answers: List[Optional[str]] = []
     created_at: datetime
-    submitted: bool = False
\ No newline at end of file
+    submitted: bool = False
+    # True while questions are still streaming in from the AI
+    generating: bool = False
\ No newline at end of file
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+import logging
+
+from app.admission import AdmissionController
+from app.ai_generator import TokenUsage
+from app.config import Config
+from app.models import TestConfig
+from app.question_cache import QuestionCache, cache_key
+
+logger = logging.getLogger(__name__)
+
+_SCHOOL_SUBJECTS = {subject for subjects in Config.SCHOOL_SUBJECTS.values() for subject in subjects}
+
+
+def in_catalog(config: TestConfig) -> bool:
+    """Only configs from the known subject/course/exam catalogs are worth warming."""
+    if config.domain == "school":
+        return config.subject in _SCHOOL_SUBJECTS
+    if config.domain == "college":
+        return config.course in Config.COLLEGE_COURSES
+    return config.exam in Config.COMPETITIVE_EXAMS
+
+
+class PrefillWorker:
+    """Keeps question pools for the most requested configs above a low-water mark.
+
+    Generation happens in a background task, one upstream call at a time, within
+    a calls-per-minute limit and an hourly token budget, so LLM work moves from
+    request time to idle time. Each call takes an admission slot only when no
+    client is waiting for one, so warming never delays real requests.
+    """
+
+    def __init__(self, generator, cache: QuestionCache, admission: AdmissionController):
+        self.generator = generator
+        self.cache = cache
+        self.admission = admission
+        # cache key -> [decayed request count, most recent config for that key]
+        self._demand: Dict[str, list] = {}
+        self._calls: Deque[float] = deque()
+        self._tokens: Deque[Tuple[float, int]] = deque()
+        # Demand only decays while run() is looping, so it is only recorded then
+        self.running = False
+        self.generated_questions = 0
+        self.failed_calls = 0
+
+    def record_request(self, config: TestConfig):
+        if not self.running or not in_catalog(config):
+            return
+        key = cache_key(config)
+        entry = self._demand.get(key)
+        if entry is None:
+            if len(self._demand) >= Config.PREFILL_MAX_TRACKED_CONFIGS:
+                del self._demand[min(self._demand, key=lambda k: self._demand[k][0])]
+            self._demand[key] = [1.0, config]
+        else:
+            entry[0] += 1.0
+            entry[1] = config
+
+    def top_configs(self) -> List[TestConfig]:
+        ranked = sorted(self._demand.values(), key=lambda entry: entry[0], reverse=True)
+        return [config for _, config in ranked[:Config.PREFILL_TOP_K]]
+
+    async def run(self):
+        self.running = True
+        try:
+            while True:
+                await asyncio.sleep(Config.PREFILL_INTERVAL_SECONDS)
+                try:
+                    await self.refill_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Prefill pass failed: {type(e).__name__}: {e}")
+                self._decay()
+        finally:
+            self.running = False
+
+    async def refill_once(self) -> int:
+        """Top up every popular pool below the low-water mark; returns upstream calls made."""
+        calls = 0
+        for config in self.top_configs():
+            if await self.cache.pool_size(config) >= Config.PREFILL_LOW_WATER:
+                continue
+            if not self._within_limits():
+                logger.info("Prefill paused: upstream rate or token budget reached")
+                break
+            if not self.admission.try_acquire_idle():
+                logger.info("Prefill paused: upstream busy with client requests")
+                break
+            calls += 1
+            try:
+                await self._generate(config)
+            finally:
+                self.admission.release()
+        return calls
+
+    async def _generate(self, config: TestConfig):
+        batch = config.model_copy(update={"num_questions": Config.MAX_QUESTIONS})
+        # Only this call's tokens: the generator's running total also counts client traffic
+        usage = TokenUsage()
+        self._calls.append(time.monotonic())
+        try:
+            questions = await self.generator.generate_questions(batch, usage)
+        except ValueError as e:
+            self.failed_calls += 1
+            logger.warning(f"Prefill generation failed for {cache_key(config)}: {e}")
+            return
+        finally:
+            self._tokens.append((time.monotonic(), usage.total_tokens or self._assumed_tokens_per_call()))
+        await self.cache.put(config, questions)
+        self.generated_questions += len(questions)
+        logger.info(f"Prefilled {len(questions)} questions for {cache_key(config)}")
+
+    def _within_limits(self) -> bool:
+        now = time.monotonic()
+        while self._calls and now - self._calls[0] > 60:
+            self._calls.popleft()
+        while self._tokens and now - self._tokens[0][0] > 3600:
+            self._tokens.popleft()
+        if len(self._calls) >= Config.PREFILL_MAX_CALLS_PER_MINUTE:
+            return False
+        spent = sum(tokens for _, tokens in self._tokens)
+        per_call = spent / len(self._tokens) if self._tokens else self._assumed_tokens_per_call()
+        return spent + per_call <= Config.PREFILL_TOKEN_BUDGET_PER_HOUR
+
+    def _assumed_tokens_per_call(self) -> int:
+        # Until real usage has been observed, assume a full-size batch uses its whole max_tokens
+        return self.generator.prompts.max_tokens(Config.MAX_QUESTIONS)
+
+    def _decay(self):
+        for key in list(self._demand):
+            entry = self._demand[key]
+            entry[0] *= Config.PREFILL_DECAY
+            if entry[0] < 0.05:
+                del self._demand[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tracked_configs": len(self._demand),
+            "generated_questions": self.generated_questions,
+            "failed_calls": self.failed_calls,
+        }
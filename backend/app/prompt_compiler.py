@@ -0,0 +1,98 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from app.config import Config
+from app.models import TestConfig
+
+logger = logging.getLogger(__name__)
+
+# Identical for every request, so it forms a stable prefix that providers can cache.
+# Everything that varies per test goes in the (short) user message after it.
+SYSTEM_PROMPT = """You are an expert educational content creator writing accurate multiple choice questions (MCQs).
+Rules:
+- Each question has exactly 4 distinct options.
+- "correct_answer" is the exact text of one of the options.
+- Questions within one response must not repeat or paraphrase each other.
+Output ONLY a JSON array, no prose or code fences, in this format:
+[{"question":"...","options":["...","...","...","..."],"correct_answer":"..."}]"""
+
+
+def _audience(config: TestConfig) -> Tuple[str, str]:
+    """Who the questions are for, and how they should be pitched."""
+    if config.domain == "school":
+        return (
+            f"Grade {config.class_level} students, subject {config.subject}",
+            f"grade {config.class_level} level; mix conceptual and application-based questions",
+        )
+    if config.domain == "college":
+        return (
+            f"{config.course} students, semester {config.semester}",
+            "college/semester level; include both theoretical and practical questions",
+        )
+    return (
+        f"{config.exam} aspirants",
+        f"match the difficulty and pattern of {config.exam}, including previous year patterns where applicable",
+    )
+
+
+class PromptCompiler:
+    """Builds chat messages and sizes max_tokens from the number of questions requested.
+
+    The tokens-per-question estimate starts from configuration and follows the
+    completion token counts OpenRouter reports, so max_tokens tracks real output.
+    """
+
+    # Weight of each new observation in the moving average
+    SMOOTHING = 0.2
+
+    def __init__(self):
+        self.tokens_per_question = float(Config.TOKENS_PER_QUESTION_ESTIMATE)
+        self.observations = 0
+
+    def messages(self, config: TestConfig, shard: Optional[Tuple[int, int]] = None) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": self.user_prompt(config, shard)},
+        ]
+
+    def user_prompt(self, config: TestConfig, shard: Optional[Tuple[int, int]] = None) -> str:
+        audience, level = _audience(config)
+        prompt = f"""Generate {config.num_questions} multiple choice questions.
+Audience: {audience}
+Topic: {config.topic}
+Level: {level}"""
+        if shard is not None:
+            # Steer parallel shards towards different parts of the topic to limit duplicates
+            part, total = shard
+            prompt += f"\nBatch {part} of {total} for the same test: cover a different sub-area of the topic than the other batches."
+        return prompt
+
+    def max_tokens(self, num_questions: int) -> int:
+        estimate = num_questions * self.tokens_per_question * Config.MAX_TOKENS_HEADROOM + Config.MAX_TOKENS_OVERHEAD
+        return min(Config.MAX_OUTPUT_TOKENS, math.ceil(estimate))
+
+    def observe(self, completion_tokens: int, questions_parsed: int, truncated: bool):
+        """Update the estimate from a finished response."""
+        if truncated:
+            # Ran out of room: the estimate was too low, grow it quickly
+            self.tokens_per_question = min(self.tokens_per_question * 1.25, float(Config.MAX_OUTPUT_TOKENS))
+            logger.info(f"Response truncated; tokens-per-question estimate raised to {self.tokens_per_question:.0f}")
+            return
+        if completion_tokens <= 0 or questions_parsed <= 0:
+            return
+        measured = completion_tokens / questions_parsed
+        self.tokens_per_question += self.SMOOTHING * (measured - self.tokens_per_question)
+        self.observations += 1
+
+    def compile(
+        self, config: TestConfig, shard: Optional[Tuple[int, int]] = None
+    ) -> Tuple[List[Dict[str, str]], int]:
+        """(messages, max_tokens) for one completion request."""
+        return self.messages(config, shard), self.max_tokens(config.num_questions)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tokens_per_question": round(self.tokens_per_question, 1),
+            "observations": self.observations,
+        }
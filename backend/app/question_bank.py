@@ -0,0 +1,177 @@
+import mmap
+import os
+import random
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+
+from app.config import Config
+from app.models import Question, TestConfig
+from app.question_cache import cache_key
+from app.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Bank file layout (little-endian):
+#   header     magic, version, key count, question count, key directory offset, question index offset
+#   strings    UTF-8 keys and compact question JSON, back to back
+#   keys       fixed-width (string offset, length, first question, question count), sorted by key
+#   index      fixed-width (string offset, length) per question; a key's questions are contiguous
+MAGIC = b"SMQB"
+VERSION = 1
+HEADER = struct.Struct("<4sIIIQQ")
+KEY_ENTRY = struct.Struct("<QIII")
+INDEX_ENTRY = struct.Struct("<QI")
+
+
+def write_bank(path: str, pools: Dict[str, List[Question]]):
+    """Write pools (cache_key -> questions) as a bank file, replacing any existing one atomically."""
+    strings = bytearray()
+    keys = []
+    index = []
+    for key in sorted(pools):
+        questions = pools[key]
+        if not questions:
+            continue
+        encoded = key.encode("utf-8")
+        keys.append((HEADER.size + len(strings), len(encoded), len(index), len(questions)))
+        strings += encoded
+        for question in questions:
+            blob = dumps(question.model_dump())
+            index.append((HEADER.size + len(strings), len(blob)))
+            strings += blob
+
+    keys_offset = HEADER.size + len(strings)
+    index_offset = keys_offset + len(keys) * KEY_ENTRY.size
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(keys), len(index), keys_offset, index_offset))
+        f.write(strings)
+        f.write(b"".join(KEY_ENTRY.pack(*entry) for entry in keys))
+        f.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in index))
+        f.flush()
+        os.fsync(f.fileno())
+    # Servers keep their mapping of the old file until they reopen it
+    os.replace(tmp_path, path)
+
+
+class QuestionBank:
+    """Read-only, memory-mapped pools of pre-generated questions.
+
+    Only the key directory is decoded on open; questions are read from the
+    mapping on demand, so every worker shares the same page-cached file.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._mmap: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self._index_offset = 0
+        self.question_count = 0
+        # cache key -> (first question position, question count)
+        self._keys: Dict[str, Tuple[int, int]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._mmap is not None
+
+    def open(self) -> bool:
+        """Map the bank file; a missing or invalid file leaves the bank disabled."""
+        if self.enabled or not self.path:
+            return self.enabled
+        try:
+            with open(self.path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Question bank {self.path} not loaded: {e}")
+            return False
+        try:
+            self._load(mapped)
+        except ValueError as e:
+            mapped.close()
+            logger.error(f"Question bank {self.path} is invalid: {e}")
+            return False
+        logger.info(f"Question bank {self.path}: {len(self._keys)} topics, {self.question_count} questions")
+        return True
+
+    def _load(self, mapped: mmap.mmap):
+        if len(mapped) < HEADER.size:
+            raise ValueError("file too small")
+        magic, version, key_count, question_count, keys_offset, index_offset = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"unsupported format {magic!r} v{version}")
+        if keys_offset + key_count * KEY_ENTRY.size > index_offset or (
+            index_offset + question_count * INDEX_ENTRY.size > len(mapped)
+        ):
+            raise ValueError("truncated key directory or index")
+        keys = {}
+        for i in range(key_count):
+            offset, length, first, count = KEY_ENTRY.unpack_from(mapped, keys_offset + i * KEY_ENTRY.size)
+            if first + count > question_count:
+                raise ValueError("key directory points past the question index")
+            keys[mapped[offset:offset + length].decode("utf-8")] = (first, count)
+        self._mmap = mapped
+        self._view = memoryview(mapped)
+        self._index_offset = index_offset
+        self.question_count = question_count
+        self._keys = keys
+
+    def close(self):
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._keys = {}
+        self.question_count = 0
+
+    def _question(self, position: int, shuffle: bool = False) -> Question:
+        offset, length = INDEX_ENTRY.unpack_from(self._mmap, self._index_offset + position * INDEX_ENTRY.size)
+        data = loads(self._view[offset:offset + length])
+        if shuffle:
+            random.shuffle(data["options"])
+        # Validated when the bank was built
+        return Question.model_construct(**data)
+
+    def coverage(self, config: TestConfig) -> int:
+        """Questions available for this config (0 when the bank does not cover it)."""
+        if not self.enabled:
+            return 0
+        return self._keys.get(cache_key(config), (0, 0))[1]
+
+    def sample(self, config: TestConfig) -> Optional[List[Question]]:
+        """A random sample of num_questions with shuffled options, or None if the bank cannot serve it."""
+        if not self.enabled:
+            return None
+        first, count = self._keys.get(cache_key(config), (0, 0))
+        if count < config.num_questions:
+            self.misses += 1
+            return None
+        self.hits += 1
+        positions = random.sample(range(first, first + count), config.num_questions)
+        return [self._question(position, shuffle=True) for position in positions]
+
+    def keys(self) -> List[str]:
+        return list(self._keys)
+
+    def pools(self) -> Iterator[Tuple[str, List[Question]]]:
+        """Every (cache key, questions) pool in the bank, in key order."""
+        if not self.enabled:
+            return
+        for key, (first, count) in sorted(self._keys.items()):
+            yield key, [self._question(position) for position in range(first, first + count)]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "topics": len(self._keys),
+            "questions": self.question_count,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Global question bank, mapped by the app lifespan
+question_bank = QuestionBank(Config.QUESTION_BANK_PATH)
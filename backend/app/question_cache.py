@@ -0,0 +1,303 @@
+import json
+import math
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import Config
+from app.models import Question, TestConfig
+from app.dedup import DuplicateIndex, build_index, normalize_text
+from app.metrics import QUESTIONS_DISCARDED
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def normalize_topic(topic: str) -> str:
+    return normalize_text(topic)
+
+
+def cache_key(config: TestConfig) -> str:
+    """Content address of a test config, ignoring num_questions."""
+    if config.domain == "school":
+        scope = f"{config.class_level}|{(config.subject or '').lower()}"
+    elif config.domain == "college":
+        scope = f"{(config.course or '').lower()}|{config.semester}"
+    else:
+        scope = (config.exam or "").lower()
+    return f"{config.domain}|{scope}|{normalize_topic(config.topic)}"
+
+
+def topic_scope(config: TestConfig) -> str:
+    """The subject, course or exam a topic belongs to, across class levels and semesters."""
+    if config.domain == "school":
+        return f"school|{(config.subject or '').lower()}"
+    if config.domain == "college":
+        return f"college|{(config.course or '').lower()}"
+    return f"competitive|{(config.exam or '').lower()}"
+
+
+def split_cache_key(key: str) -> Tuple[str, str]:
+    """(topic_scope, normalized topic) of a cache_key() string."""
+    parts = key.split("|")
+    # school|<class>|<subject>|topic, college|<course>|<semester>|topic, competitive|<exam>|topic
+    name = parts[2] if parts[0] == "school" else parts[1]
+    return f"{parts[0]}|{name}", parts[-1]
+
+
+class QuestionCacheBackend:
+    """Storage for question pools keyed by cache_key()."""
+
+    # True if calls can block (file I/O, locks held by other processes); such calls run in the threadpool
+    blocking = False
+
+    def get(self, key: str) -> Optional[List[Question]]:
+        raise NotImplementedError
+
+    def put(self, key: str, questions: List[Question]):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class InMemoryQuestionCache(QuestionCacheBackend):
+    """Per-process LRU with TTL expiry."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, List[Question]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[Question]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, questions = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return questions
+
+    def put(self, key: str, questions: List[Question]):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), questions)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteQuestionCache(QuestionCacheBackend):
+    """File-backed pools that survive restarts and can be shared between workers.
+
+    Reads never write: access times of hits are kept in memory and written
+    with the next put(), which is the only place that evicts by them.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # key -> last hit, not yet written to accessed_at
+        self._accessed: Dict[str, float] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS question_pools ("
+            "key TEXT PRIMARY KEY, stored_at REAL NOT NULL, accessed_at REAL NOT NULL, questions TEXT NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[List[Question]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stored_at, questions FROM question_pools WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[0] > self.ttl_seconds:
+                # Expired rows are replaced by the next put() of this key or evicted by others
+                return None
+            self._accessed[key] = now
+        return [Question(**q) for q in json.loads(row[1])]
+
+    def put(self, key: str, questions: List[Question]):
+        now = time.time()
+        payload = json.dumps([q.model_dump() for q in questions])
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+            self._conn.executemany(
+                "UPDATE question_pools SET accessed_at = ? WHERE key = ?",
+                [(at, hit_key) for hit_key, at in accessed.items()],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO question_pools (key, stored_at, accessed_at, questions) VALUES (?, ?, ?, ?)",
+                (key, now, now, payload),
+            )
+            self._conn.execute(
+                "DELETE FROM question_pools WHERE key IN ("
+                "SELECT key FROM question_pools ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM question_pools WHERE key = ?", (key,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM question_pools").fetchone()[0]
+
+
+class QuestionCache:
+    """Serves tests by sampling from cached pools of validated questions.
+
+    A pool is only served once it holds min_pool_factor times the requested
+    count, so repeat visitors get a different selection, not the same test
+    reordered; until then misses keep generating and growing it.
+    """
+
+    def __init__(
+        self, backend: Optional[QuestionCacheBackend], max_pool_size: int = 200, min_pool_factor: float = 2.0
+    ):
+        self.backend = backend
+        self.max_pool_size = max_pool_size
+        self.min_pool_factor = min_pool_factor
+        # cache key -> (pool length it was built against, index); rebuilt when the pool changed elsewhere
+        self._indexes: "OrderedDict[str, Tuple[int, DuplicateIndex]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.duplicates_dropped = 0
+        self.near_duplicates_dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        """Call a backend method, from the threadpool when the backend can block (SQLite)."""
+        if self.backend.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    def min_pool_size(self, num_questions: int) -> int:
+        return max(num_questions, math.ceil(num_questions * self.min_pool_factor))
+
+    async def get(self, config: TestConfig) -> Optional[List[Question]]:
+        """Return a freshly shuffled sample, or None if the pool is too small."""
+        if not self.enabled:
+            return None
+        pool = await self._run(self.backend.get, cache_key(config))
+        if not pool or len(pool) < self.min_pool_size(config.num_questions):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return shuffle_questions(pool, config.num_questions)
+
+    async def pool_size(self, config: TestConfig) -> int:
+        if not self.enabled:
+            return 0
+        return len(await self._run(self.backend.get, cache_key(config)) or [])
+
+    async def put(self, config: TestConfig, questions: List[Question]):
+        """Merge newly generated questions into the pool for this config."""
+        if not self.enabled or not questions:
+            return
+        key = cache_key(config)
+        pool = list(await self._run(self.backend.get, key) or [])
+        index = self._index_for(key, pool)
+        fresh, dropped = index.filter(questions)
+        self.duplicates_dropped += dropped["exact"]
+        self.near_duplicates_dropped += dropped["near"]
+        QUESTIONS_DISCARDED.inc(dropped["exact"], rule="cache_duplicate")
+        QUESTIONS_DISCARDED.inc(dropped["near"], rule="cache_near_duplicate")
+        if not fresh:
+            return
+        pool = (pool + fresh)[-self.max_pool_size:]
+        await self._run(self.backend.put, key, pool)
+        self._indexes[key] = (len(pool), index)
+    
+    def _index_for(self, key: str, pool: List[Question]) -> DuplicateIndex:
+        """Reuse the incremental index for this pool; rebuild (O(pool)) only if it went stale.
+        
+        Questions trimmed off the pool stay in the index until the next rebuild,
+        so they keep blocking reworded repeats for a while.
+        """
+        entry = self._indexes.get(key)
+        if entry is not None and entry[0] == len(pool) and len(entry[1]) <= 2 * self.max_pool_size:
+            self._indexes.move_to_end(key)
+            return entry[1]
+        index = build_index(pool)
+        self._indexes[key] = (len(pool), index)
+        while len(self._indexes) > Config.QUESTION_CACHE_MAX_ENTRIES:
+            self._indexes.popitem(last=False)
+        return index
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "pools": len(self.backend) if self.enabled else 0,
+            "duplicates_dropped": self.duplicates_dropped,
+            "near_duplicates_dropped": self.near_duplicates_dropped,
+        }
+
+
+def shuffle_questions(questions: List[Question], count: Optional[int] = None) -> List[Question]:
+    """Random sample (default: all) in random order, each with shuffled options."""
+    if count is None:
+        count = len(questions)
+    return [shuffle_options(q) for q in random.sample(questions, count)]
+
+
+def shuffle_options(question: Question) -> Question:
+    options = list(question.options)
+    random.shuffle(options)
+    return Question(question=question.question, options=options, correct_answer=question.correct_answer)
+
+
+def build_question_cache() -> QuestionCache:
+    backend_name = Config.QUESTION_CACHE_BACKEND
+    if backend_name == "memory":
+        backend = InMemoryQuestionCache(Config.QUESTION_CACHE_MAX_ENTRIES, Config.QUESTION_CACHE_TTL_SECONDS)
+    elif backend_name == "sqlite":
+        backend = SQLiteQuestionCache(
+            Config.QUESTION_CACHE_PATH, Config.QUESTION_CACHE_MAX_ENTRIES, Config.QUESTION_CACHE_TTL_SECONDS
+        )
+    else:
+        if backend_name != "none":
+            logger.warning(f"Unknown QUESTION_CACHE_BACKEND '{backend_name}', question cache disabled")
+        backend = None
+    logger.info(f"Question cache backend: {backend_name if backend else 'disabled'}")
+    return QuestionCache(
+        backend,
+        max_pool_size=Config.QUESTION_CACHE_MAX_POOL_SIZE,
+        min_pool_factor=Config.QUESTION_CACHE_MIN_POOL_FACTOR
+    )
+
+
+# Global question cache instance
+question_cache = build_question_cache()
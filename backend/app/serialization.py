@@ -0,0 +1,67 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional, Union
+
+from fastapi.responses import JSONResponse, Response
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+    logger.info("orjson not installed; using the standard json module for responses")
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Union[bytes, memoryview]) -> Any:
+    """Parse JSON bytes; orjson reads memoryviews (e.g. mmap slices) without copying."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson.
+
+    Endpoints return it directly with plain dicts/lists, which also skips
+    FastAPI's jsonable_encoder pass over the return value.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Already-serialized JSON bytes."""
+
+    media_type = "application/json"
+
+
+def etag_for(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header (possibly a list of tags) names this ETag."""
+    return bool(if_none_match) and etag in (tag.strip() for tag in if_none_match.split(","))
+
+
+class CachedJSON:
+    """A static JSON payload serialized once, served with an ETag and 304 revalidation."""
+
+    def __init__(self, content: Any, cache_control: str = "public, max-age=300"):
+        self.body = dumps(content)
+        self.headers: Dict[str, str] = {"ETag": etag_for(self.body), "Cache-Control": cache_control}
+
+    def response(self, if_none_match: Optional[str] = None) -> Response:
+        if etag_matches(if_none_match, self.headers["ETag"]):
+            return Response(status_code=304, headers=self.headers)
+        return RawJSONResponse(self.body, headers=self.headers)
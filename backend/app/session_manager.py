@@ -1,59 +1,219 @@
 import uuid
 import time
-from typing import Dict, Optional, List
-from datetime import datetime, timedelta
-from app.models import TestSession, TestConfig, Question
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional, List, Tuple, TypeVar
+from starlette.concurrency import run_in_threadpool
+from app.config import Config
+from app.models import TestConfig, Question
+from app.compact_session import CompactSession, QuestionRecord
+from app.session_store import SessionStore, InMemorySessionStore, build_session_store
+from app.metrics import SESSION_CLEANUP_SECONDS, SESSIONS_EXPIRED, timed
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 class SessionManager:
-    def __init__(self, expire_minutes: int = 30):
-        self.sessions: Dict[str, TestSession] = {}
+    # Opportunistic cleanup on reads runs at most this often; the background loop does the rest
+    CLEANUP_MIN_INTERVAL_SECONDS = 1.0
+    # Polling interval for streamed questions produced by another worker process
+    REMOTE_POLL_SECONDS = 0.25
+    
+    def __init__(
+        self,
+        expire_minutes: int = 30,
+        max_sessions: int = 0,
+        store: Optional[SessionStore] = None,
+        store_factory: Callable[[], SessionStore] = InMemorySessionStore,
+    ):
+        # Without an explicit store, store_factory runs on first use (normally the app lifespan)
+        self._store = store
+        self._store_factory = store_factory
         self.expire_minutes = expire_minutes
+        self.ttl_seconds = expire_minutes * 60
+        # 0 disables the cap; otherwise the oldest sessions are evicted first
+        self.max_sessions = max_sessions
+        # Signalled whenever a streaming session receives more questions
+        self._arrivals: Dict[str, asyncio.Event] = {}
+        self._next_cleanup = 0.0
+        # Last count seen by count(), for synchronous readers such as the metrics gauge
+        self.active = 0
+    
+    @property
+    def store(self) -> SessionStore:
+        if self._store is None:
+            self._store = self._store_factory()
+        return self._store
     
-    def create_session(self, config: TestConfig, questions: List[Question]) -> str:
+    def open(self):
+        """Open the session store now rather than on the first request."""
+        return self.store
+    
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        """Call a store method, from the threadpool when the store can block (SQLite).
+        
+        Events and other event-loop state are only touched by the callers, never in fn.
+        """
+        if self.store.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+    
+    async def create_session(self, config: TestConfig, questions: List[Question], generating: bool = False) -> str:
         session_id = str(uuid.uuid4())
-        self.sessions[session_id] = TestSession(
-            session_id=session_id,
-            config=config,
-            questions=questions,
-            user_answers=[None] * len(questions),
-            created_at=datetime.now(),
-            submitted=False
-        )
-        self._cleanup_old_sessions()
+        await self._run(self.store.put, CompactSession.create(session_id, config, questions, generating=generating))
+        if generating:
+            self._arrivals[session_id] = asyncio.Event()
+        await self._cleanup_old_sessions(force=True)
         return session_id
     
-    def get_session(self, session_id: str) -> Optional[TestSession]:
-        self._cleanup_old_sessions()
-        return self.sessions.get(session_id)
+    async def create_shared_session(
+        self, config_values: Tuple[Any, ...], questions: Tuple[QuestionRecord, ...], room_code: str
+    ) -> str:
+        """Session over a classroom's question set; in memory it holds a reference, not a copy."""
+        session_id = str(uuid.uuid4())
+        await self._run(self.store.put, CompactSession.shared(session_id, config_values, questions, room_code))
+        await self._cleanup_old_sessions(force=True)
+        return session_id
+    
+    async def append_questions(self, session_id: str, questions: List[Question]) -> bool:
+        """Add streamed questions to a session; False once nobody can use them anymore."""
+        def append(session: CompactSession) -> bool:
+            if session.submitted or not session.generating:
+                return False
+            session.add_questions(questions)
+            return True
+        
+        appended = bool(await self._run(self.store.update, session_id, append))
+        if appended:
+            self._notify(session_id)
+        return appended
+    
+    async def finish_generation(self, session_id: str):
+        def finish(session: CompactSession):
+            session.generating = False
+        
+        await self._run(self.store.update, session_id, finish)
+        self._notify(session_id)
+        self._arrivals.pop(session_id, None)
+    
+    async def wait_for_question(self, session_id: str, question_index: int, timeout: float) -> Optional[CompactSession]:
+        """Return the session once question_index exists or generation has finished."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            session = await self.get_session(session_id)
+            if not session or question_index < len(session.questions) or not session.generating:
+                return session
+            event = self._arrivals.get(session_id)
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return session
+            if event is None:
+                # Generated by another worker: poll the shared store
+                await asyncio.sleep(min(remaining, self.REMOTE_POLL_SECONDS))
+                continue
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return session
+    
+    def _notify(self, session_id: str):
+        # Wake current waiters, then arm a fresh event for the next arrival
+        event = self._arrivals.get(session_id)
+        if event is not None:
+            event.set()
+            self._arrivals[session_id] = asyncio.Event()
     
-    def update_answer(self, session_id: str, question_index: int, answer: str) -> bool:
-        session = self.get_session(session_id)
-        if not session or session.submitted:
+    async def get_session(self, session_id: str) -> Optional[CompactSession]:
+        await self._cleanup_old_sessions()
+        session = await self._run(self.store.get, session_id)
+        if session and time.time() - session.created_at > self.ttl_seconds:
+            await self._remove(session_id)
+            return None
+        return session
+    
+    async def update_answer(self, session_id: str, question_index: int, answer: str) -> bool:
+        if not await self.get_session(session_id):
+            return False
+        
+        def apply(session: CompactSession) -> bool:
+            if session.submitted:
+                return False
+            if 0 <= question_index < len(session.questions):
+                return session.set_answer(question_index, answer)
             return False
         
-        if 0 <= question_index < len(session.questions):
-            if answer in session.questions[question_index].options:
-                session.user_answers[question_index] = answer
-                return True
-        return False
+        return bool(await self._run(self.store.update, session_id, apply))
     
-    def submit_test(self, session_id: str) -> Optional[TestSession]:
-        session = self.get_session(session_id)
-        if session and not session.submitted:
-            session.submitted = True
-            return session
-        return None
+    async def update_answers(self, session_id: str, answers: Dict[int, str]) -> bool:
+        """Apply a batch of answers atomically; raises ValueError if any answer is invalid."""
+        if not await self.get_session(session_id):
+            return False
+        
+        def apply(session: CompactSession) -> bool:
+            if session.submitted:
+                return False
+            session.set_answers(answers)
+            return True
+        
+        return bool(await self._run(self.store.update, session_id, apply))
     
-    def _cleanup_old_sessions(self):
-        current_time = datetime.now()
-        expired_sessions = []
+    async def submit_test(self, session_id: str, answers: Optional[Dict[int, str]] = None) -> Optional[CompactSession]:
+        """Submit, optionally recording the final answers in the same atomic update.
         
-        for session_id, session in self.sessions.items():
-            if current_time - session.created_at > timedelta(minutes=self.expire_minutes):
-                expired_sessions.append(session_id)
+        Raises ValueError (and leaves the session untouched) if any answer is invalid.
+        """
+        if not await self.get_session(session_id):
+            return None
         
-        for session_id in expired_sessions:
-            del self.sessions[session_id]
+        def submit(session: CompactSession) -> Optional[CompactSession]:
+            if session.submitted:
+                return None
+            if answers:
+                session.set_answers(answers)
+            session.submitted = True
+            return session
+        
+        return await self._run(self.store.update, session_id, submit)
+    
+    async def count(self) -> int:
+        # SQLite COUNT(*) scans the table, so it goes through the threadpool like every other query
+        self.active = await self._run(self.store.count)
+        return self.active
+    
+    async def _cleanup_old_sessions(self, force: bool = False) -> int:
+        """Drop expired sessions (and the oldest beyond max_sessions)."""
+        now = time.monotonic()
+        if not force and now < self._next_cleanup:
+            return 0
+        self._next_cleanup = now + self.CLEANUP_MIN_INTERVAL_SECONDS
+        try:
+            with timed(SESSION_CLEANUP_SECONDS):
+                removed = await self._run(self.store.expire, time.time() - self.ttl_seconds, self.max_sessions)
+        except Exception as e:
+            # Best effort (e.g. another worker holds the SQLite write lock); the next sweep retries
+            logger.warning(f"Session cleanup skipped: {type(e).__name__}: {e}")
+            return 0
+        if removed:
+            SESSIONS_EXPIRED.inc(removed)
+        return removed
+    
+    async def _remove(self, session_id: str):
+        await self._run(self.store.delete, session_id)
+        self._arrivals.pop(session_id, None)
+    
+    async def run_cleanup_loop(self, interval_seconds: float):
+        """Background sweep so idle periods still release expired sessions."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            removed = await self._cleanup_old_sessions(force=True)
+            if removed:
+                logger.info(f"Expired {removed} sessions, {await self.count()} active")
 
 # Global session manager instance
-session_manager = SessionManager()
\ No newline at end of file
+session_manager = SessionManager(
+    expire_minutes=Config.SESSION_EXPIRE_MINUTES,
+    max_sessions=Config.SESSION_MAX_SESSIONS,
+    store_factory=build_session_store
+)
\ No newline at end of file
@@ -0,0 +1,170 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, TypeVar
+import logging
+
+from app.config import Config
+from app.compact_session import CompactSession
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SessionStore:
+    """Storage behind SessionManager.
+
+    Kept to key/value operations plus an atomic read-modify-write so that a
+    networked backend (e.g. Redis with WATCH/MULTI) can implement it later.
+    """
+    
+    # Stores whose calls can wait on I/O or locks are called from a worker thread
+    blocking = False
+
+    def get(self, session_id: str) -> Optional[CompactSession]:
+        raise NotImplementedError
+
+    def put(self, session: CompactSession):
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def update(self, session_id: str, mutate: Callable[[CompactSession], T]) -> Optional[T]:
+        """Apply mutate to the stored session atomically and persist it.
+
+        Returns mutate's result, or None if the session does not exist.
+        """
+        raise NotImplementedError
+
+    def expire(self, cutoff: float, max_sessions: int = 0) -> int:
+        """Drop sessions created before the cutoff timestamp (and the oldest beyond max_sessions)."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    """Single-process store; sessions are mutated in place."""
+
+    def __init__(self):
+        # Insertion order == creation order == expiry order (fixed TTL), so the
+        # oldest session is always at the front and expiry only pops expired heads
+        self.sessions: "OrderedDict[str, CompactSession]" = OrderedDict()
+
+    def get(self, session_id: str) -> Optional[CompactSession]:
+        return self.sessions.get(session_id)
+
+    def put(self, session: CompactSession):
+        self.sessions[session.session_id] = session
+
+    def delete(self, session_id: str):
+        self.sessions.pop(session_id, None)
+
+    def update(self, session_id: str, mutate: Callable[[CompactSession], T]) -> Optional[T]:
+        # Runs on the event loop thread without awaiting, so it is already atomic
+        session = self.sessions.get(session_id)
+        if session is None:
+            return None
+        return mutate(session)
+
+    def expire(self, cutoff: float, max_sessions: int = 0) -> int:
+        removed = 0
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session.created_at >= cutoff and (not max_sessions or len(self.sessions) <= max_sessions):
+                break
+            del self.sessions[session_id]
+            removed += 1
+        return removed
+
+    def count(self) -> int:
+        return len(self.sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a WAL-mode SQLite file, shared by every worker process on the host.
+
+    Writes can wait up to busy_timeout for another worker's write lock, so
+    SessionManager calls this store from the threadpool. Reads use their own
+    connection and, under WAL, never wait behind a writer.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=busy_timeout)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, created_at REAL NOT NULL, data TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_created_at ON sessions (created_at)")
+        self._read_lock = threading.Lock()
+        self._reader = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=busy_timeout)
+
+    def get(self, session_id: str) -> Optional[CompactSession]:
+        with self._read_lock:
+            row = self._reader.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return CompactSession.from_dict(json.loads(row[0])) if row else None
+
+    def put(self, session: CompactSession):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, created_at, data) VALUES (?, ?, ?)",
+                (session.session_id, session.created_at, json.dumps(session.to_dict())),
+            )
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def update(self, session_id: str, mutate: Callable[[CompactSession], T]) -> Optional[T]:
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so concurrent workers serialize here
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+                if row is None:
+                    self._conn.execute("ROLLBACK")
+                    return None
+                session = CompactSession.from_dict(json.loads(row[0]))
+                result = mutate(session)
+                self._conn.execute(
+                    "UPDATE sessions SET data = ? WHERE session_id = ?", (json.dumps(session.to_dict()), session_id)
+                )
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def expire(self, cutoff: float, max_sessions: int = 0) -> int:
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM sessions WHERE created_at < ?", (cutoff,)).rowcount
+            if max_sessions:
+                removed += self._conn.execute(
+                    "DELETE FROM sessions WHERE session_id IN ("
+                    "SELECT session_id FROM sessions ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (max_sessions,),
+                ).rowcount
+        return removed
+
+    def count(self) -> int:
+        with self._read_lock:
+            return self._reader.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def build_session_store() -> SessionStore:
+    if Config.SESSION_STORE == "sqlite":
+        logger.info(f"Using SQLite session store at {Config.SESSION_STORE_PATH}")
+        return SQLiteSessionStore(Config.SESSION_STORE_PATH, Config.SESSION_STORE_BUSY_TIMEOUT_SECONDS)
+    if Config.SESSION_STORE != "memory":
+        logger.warning(f"Unknown SESSION_STORE '{Config.SESSION_STORE}', using in-memory sessions")
+    return InMemorySessionStore()
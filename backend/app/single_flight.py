@@ -0,0 +1,119 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Broadcast:
+    """Items of one in-flight stream, replayed to subscribers that join late."""
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        # Wake everyone waiting on the current event; later waits use a fresh one
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def publish(self, item: Any):
+        self.items.append(item)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None):
+        if self.done:
+            return
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        index = 0
+        while True:
+            if index < len(self.items):
+                index += 1
+                yield self.items[index - 1]
+            elif self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            else:
+                await self._changed.wait()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one shared in-flight task."""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+        # Keeps pump tasks referenced until they finish
+        self._pumps: Set[asyncio.Task] = set()
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            self.started += 1
+            # Run detached from the caller so one disconnecting client does not cancel the others
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.coalesced += 1
+            logger.info(f"Joining in-flight generation for {key}")
+        return await asyncio.shield(task)
+
+    def stream(self, key: str, fn: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """Like do() for async iterators: every caller sees all items, from the first, as they arrive."""
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            self.started += 1
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            # Detached like do(): the stream is drained even if every subscriber goes away
+            task = asyncio.ensure_future(self._pump(key, broadcast, fn()))
+            self._pumps.add(task)
+            task.add_done_callback(self._pumps.discard)
+        else:
+            self.coalesced += 1
+            logger.info(f"Joining in-flight generation stream for {key}")
+        return broadcast.subscribe()
+
+    async def _pump(self, key: str, broadcast: _Broadcast, iterator: AsyncIterator[Any]):
+        try:
+            async for item in iterator:
+                broadcast.publish(item)
+        except asyncio.CancelledError:
+            # Shutdown: subscribers see a generation failure rather than waiting forever
+            broadcast.finish(ValueError("Generation was cancelled"))
+            raise
+        except Exception as e:
+            broadcast.finish(e)
+        else:
+            broadcast.finish()
+        finally:
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+            await iterator.aclose()
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    async def cancel_all(self):
+        """Cancel every in-flight call and stream pump and wait for them to unwind (shutdown)."""
+        tasks = [*self._calls.values(), *self._pumps]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
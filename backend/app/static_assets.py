@@ -0,0 +1,157 @@
+import hashlib
+import os
+import posixpath
+import re
+from typing import Dict, Optional
+import logging
+
+from fastapi.responses import Response
+
+from app.compression import accepted_encodings, compressed_variants
+from app.serialization import etag_for, etag_matches
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".json": "application/json",
+    ".svg": "image/svg+xml",
+    ".txt": "text/plain; charset=utf-8",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".ico": "image/x-icon",
+    ".webp": "image/webp",
+    ".woff2": "font/woff2",
+}
+# Already-compressed formats gain nothing from gzip/br
+_PRECOMPRESSED_TYPES = (".png", ".jpg", ".ico", ".webp", ".woff2")
+
+# Fingerprinted URLs never change content, so browsers may keep them for a year
+IMMUTABLE = "public, max-age=31536000, immutable"
+# HTML and unfingerprinted URLs are revalidated (cheaply, via ETag) on every use
+REVALIDATE = "no-cache"
+
+_REFERENCE_RE = re.compile(r'(\b(?:href|src)=")([^"#?:]+)(")')
+# Tells the frontend to call the API on its own origin instead of the hosted default
+API_BASE_META = '<meta name="studmaster-api" content="">'
+
+
+class Asset:
+    """One static file held in memory with its ETag and precompressed encodings."""
+
+    __slots__ = ("body", "media_type", "cache_control", "etag", "variants")
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str, compress: bool = True):
+        self.body = body
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.etag = etag_for(body)
+        self.variants = compressed_variants(body) if compress else {}
+
+    def response(self, accept_encoding: str = "", if_none_match: Optional[str] = None) -> Response:
+        accepted = accepted_encodings(accept_encoding)
+        coding = next((c for c in ("br", "gzip") if c in self.variants and c in accepted), None)
+        # Each encoding is a different representation, so it needs its own strong ETag
+        etag = self.etag if coding is None else f'{self.etag[:-1]}-{coding}"'
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if self.variants:
+            headers["Vary"] = "Accept-Encoding"
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        # Passed as a header: Starlette would append a second charset to text/* media types
+        headers["Content-Type"] = self.media_type
+        if coding is None:
+            return Response(self.body, headers=headers)
+        headers["Content-Encoding"] = coding
+        return Response(self.variants[coding], headers=headers)
+
+
+def fingerprinted_name(path: str, body: bytes) -> str:
+    """"style.css" -> "style.<content hash>.css"."""
+    stem, ext = posixpath.splitext(path)
+    return f"{stem}.{hashlib.blake2b(body, digest_size=5).hexdigest()}{ext}"
+
+
+class StaticBundle:
+    """The docs/ frontend, fingerprinted and compressed once at startup.
+
+    CSS, JS and other assets are served under content-hashed names with an
+    immutable Cache-Control (and under their plain names, revalidated); HTML
+    pages are rewritten to reference the hashed names and always revalidated,
+    so a deploy reaches browsers on the next page load.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._assets: Dict[str, Asset] = {}
+        # Plain path -> fingerprinted path
+        self.fingerprints: Dict[str, str] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._assets)
+
+    def _files(self) -> Dict[str, bytes]:
+        files = {}
+        for directory, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for filename in filenames:
+                if filename.startswith(".") or posixpath.splitext(filename)[1].lower() not in MEDIA_TYPES:
+                    continue
+                full_path = os.path.join(directory, filename)
+                relative = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    files[relative] = f.read()
+        return files
+
+    def load(self) -> int:
+        """(Re)build every asset from disk; returns the number of files served."""
+        assets: Dict[str, Asset] = {}
+        fingerprints: Dict[str, str] = {}
+        files = self._files()
+        for path, body in files.items():
+            ext = posixpath.splitext(path)[1].lower()
+            if ext == ".html":
+                continue
+            compress = ext not in _PRECOMPRESSED_TYPES
+            fingerprints[path] = fingerprinted_name(path, body)
+            assets[path] = Asset(body, MEDIA_TYPES[ext], REVALIDATE, compress)
+            assets[fingerprints[path]] = Asset(body, MEDIA_TYPES[ext], IMMUTABLE, compress)
+        for path, body in files.items():
+            if path.endswith(".html"):
+                html = self._rewrite_html(path, body.decode("utf-8"), fingerprints)
+                assets[path] = Asset(html.encode("utf-8"), MEDIA_TYPES[".html"], REVALIDATE)
+        if "index.html" in assets:
+            assets[""] = assets["index.html"]
+        self._assets = assets
+        self.fingerprints = fingerprints
+        logger.info(f"Serving frontend from {self.root}: {len(files)} files, {len(fingerprints)} fingerprinted")
+        return len(files)
+
+    def _rewrite_html(self, path: str, html: str, fingerprints: Dict[str, str]) -> str:
+        base = posixpath.dirname(path)
+
+        def replace(match: re.Match) -> str:
+            reference = match.group(2)
+            target = posixpath.normpath(posixpath.join(base, reference))
+            if target not in fingerprints:
+                return match.group(0)
+            hashed = posixpath.relpath(fingerprints[target], base or ".")
+            return f"{match.group(1)}{hashed}{match.group(3)}"
+
+        html = _REFERENCE_RE.sub(replace, html)
+        return html.replace("<head>", f"<head>\n    {API_BASE_META}", 1)
+
+    def get(self, path: str) -> Optional[Asset]:
+        return self._assets.get(path.lstrip("/"))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "files": len(self._assets),
+            "bytes": sum(len(asset.body) for asset in self._assets.values()),
+            "compressed_bytes": sum(
+                min([len(asset.body)] + [len(v) for v in asset.variants.values()]) for asset in self._assets.values()
+            ),
+        }
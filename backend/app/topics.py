@@ -0,0 +1,262 @@
+import math
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, Optional, Set, Tuple
+import logging
+
+from app.config import Config
+from app.dedup import normalize_text
+from app.models import TestConfig
+from app.question_cache import split_cache_key, topic_scope
+
+logger = logging.getLogger(__name__)
+
+# Filler that does not change what a topic is about ("Basics of Thermodynamics")
+_TOPIC_STOPWORDS = frozenset(
+    "a an and basic concept for from fundamental in introduction its of on overview the to with".split()
+)
+
+
+def stem(word: str) -> str:
+    """Light suffix stripping: enough to fold plurals ("laws", "theories") onto their singular."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("sses", "shes", "ches", "xes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def topic_tokens(topic: str) -> Tuple[str, ...]:
+    """Sorted, de-duplicated content stems, so word order and filler do not matter."""
+    words = [stem(word) for word in normalize_text(topic).split()]
+    # Single letters are mostly possessive leftovers ("newton's" -> "newton s")
+    content = {word for word in words if len(word) > 1 and word not in _TOPIC_STOPWORDS}
+    return tuple(sorted(content or set(words)))
+
+
+def trigrams(tokens: Iterable[str]) -> Set[str]:
+    grams = set()
+    for token in tokens:
+        padded = f" {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _one_edit_apart(first: str, second: str) -> bool:
+    """True for a single insertion, deletion or substitution (a typo)."""
+    if abs(len(first) - len(second)) > 1:
+        return False
+    if len(first) > len(second):
+        first, second = second, first
+    i = 0
+    while i < len(first) and first[i] == second[i]:
+        i += 1
+    if len(first) == len(second):
+        return first[i + 1:] == second[i + 1:]
+    return first[i:] == second[i + 1:]
+
+
+def _tokens_match(first: str, second: str) -> bool:
+    # Typos are only tolerated in longer words; "cell"/"call" stay distinct
+    return first == second or (min(len(first), len(second)) >= 5 and _one_edit_apart(first, second))
+
+
+def _covered(tokens: Tuple[str, ...], other: Tuple[str, ...]) -> bool:
+    return all(any(_tokens_match(token, candidate) for candidate in other) for token in tokens)
+
+
+def _same_words(tokens: Tuple[str, ...], other: Tuple[str, ...]) -> bool:
+    """Both topics have the same content words, allowing typos.
+
+    Guards against trigram look-alikes with different meanings, e.g.
+    "organic chemistry" / "inorganic chemistry". A subset is not enough:
+    "Acids and Bases" is a narrower chapter than "Acids, Bases and Salts".
+    """
+    return _covered(tokens, other) and _covered(other, tokens)
+
+
+class _Topic:
+    __slots__ = ("topic", "scope", "tokens", "grams", "generations", "pinned")
+
+    def __init__(self, topic: str, scope: str, tokens: Tuple[str, ...], grams: Set[str], pinned: bool):
+        self.topic = topic
+        self.scope = scope
+        self.tokens = tokens
+        self.grams = frozenset(grams)
+        # Successful generations for this topic; typo matches only land on proven (or pinned) topics
+        self.generations = 0
+        self.pinned = pinned
+
+
+class _TopicScope:
+    """Known topics of one subject/course/exam with a trigram inverted index."""
+
+    def __init__(self):
+        # Exact token form -> topic
+        self.forms: Dict[Tuple[str, ...], _Topic] = {}
+        # Trigram -> topics containing it
+        self.postings: Dict[str, Set[_Topic]] = defaultdict(set)
+
+    def add(self, entry: _Topic):
+        self.forms[entry.tokens] = entry
+        for gram in entry.grams:
+            self.postings[gram].add(entry)
+
+    def remove(self, entry: _Topic):
+        del self.forms[entry.tokens]
+        for gram in entry.grams:
+            posting = self.postings[gram]
+            posting.discard(entry)
+            if not posting:
+                del self.postings[gram]
+
+    def best_match(
+        self, tokens: Tuple[str, ...], grams: Set[str], threshold: float, min_generations: int
+    ) -> Optional[_Topic]:
+        # Prefix filter: a topic with Jaccard >= threshold shares at least ceil(threshold * n)
+        # of our n trigrams, so it must contain one of the n - ceil(threshold * n) + 1 rarest.
+        # Common trigrams ("ion", "on ") with long posting lists are never scanned.
+        ordered = sorted(grams, key=lambda gram: len(self.postings.get(gram, ())))
+        prefix = len(ordered) - math.ceil(threshold * len(ordered)) + 1
+        candidates = set()
+        for gram in ordered[:prefix]:
+            candidates.update(self.postings.get(gram, ()))
+        
+        best, best_score = None, threshold
+        low, high = threshold * len(grams), len(grams) / threshold if threshold > 0 else math.inf
+        for entry in candidates:
+            if not entry.pinned and entry.generations < min_generations:
+                continue
+            other = entry.grams
+            if not low <= len(other) <= high:
+                continue
+            overlap = len(grams & other)
+            score = overlap / (len(grams) + len(other) - overlap)
+            if (score > best_score or best is None and score >= best_score) and _same_words(tokens, entry.tokens):
+                best, best_score = entry, score
+        return best
+
+
+class TopicIndex:
+    """Maps free-text topics onto canonical ones so variants share cache keys.
+
+    "newtons law of motion" and "Laws of Motion (Newton)" are compared by their
+    stemmed content words: identical word sets match directly, misspellings
+    ("Thermodynamcs") through character-trigram Jaccard similarity over the
+    known topics of the same subject, course or exam.
+
+    Only differences in case, punctuation, possessives, plurals, word order,
+    filler words and typos are folded. A topic with fewer content words stays
+    its own topic, so "Newton's laws" does not merge with "Newton's laws of
+    motion": telling a synonym from a narrower chapter needs subject knowledge
+    the index does not have.
+
+    Topics are learned only once a generation for them succeeded, and a typo
+    is only corrected towards a topic that has been generated for at least
+    min_generations times (or was seeded from the question bank), so one
+    student's misspelling does not become everyone's canonical spelling.
+    Learned topics are capped at max_topics in total, least recently used
+    first out; seeded topics are never evicted.
+    """
+
+    def __init__(self, threshold: float, max_topics: int, min_generations: int = 1):
+        self.threshold = threshold
+        self.max_topics = max_topics
+        self.min_generations = min_generations
+        self._scopes: Dict[str, _TopicScope] = {}
+        # Learned (evictable) topics, least recently used first
+        self._lru: "OrderedDict[_Topic, None]" = OrderedDict()
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def match(self, scope: str, topic: str) -> str:
+        """The canonical topic for this one (the topic itself when none is known)."""
+        entry = self._find(scope, topic_tokens(topic))
+        if entry is None:
+            self.misses += 1
+            return topic
+        if not entry.pinned:
+            self._lru.move_to_end(entry)
+        return entry.topic
+
+    def _find(self, scope: str, tokens: Tuple[str, ...]) -> Optional[_Topic]:
+        entries = self._scopes.get(scope)
+        if entries is None:
+            return None
+        entry = entries.forms.get(tokens)
+        if entry is not None:
+            self.exact_hits += 1
+            return entry
+        entry = entries.best_match(tokens, trigrams(tokens), self.threshold, self.min_generations)
+        if entry is not None:
+            self.fuzzy_hits += 1
+        return entry
+
+    def canonicalize(self, config: TestConfig) -> TestConfig:
+        """The config with its topic replaced by the canonical one (the same object if unchanged)."""
+        canonical = self.match(topic_scope(config), config.topic)
+        if canonical == config.topic:
+            return config
+        return config.model_copy(update={"topic": canonical})
+
+    def learn(self, config: TestConfig):
+        """Record a successful generation for config's (already canonicalized) topic."""
+        self.add(topic_scope(config), config.topic)
+
+    def add(self, scope: str, topic: str, pinned: bool = False):
+        """Count a generation for topic, learning it if new; pinned topics (the bank) are trusted and kept."""
+        if not pinned and self.max_topics <= 0:
+            return
+        tokens = topic_tokens(topic)
+        entries = self._scopes.get(scope)
+        if entries is None:
+            entries = self._scopes[scope] = _TopicScope()
+        entry = entries.forms.get(tokens)
+        if entry is None:
+            entry = _Topic(topic, scope, tokens, trigrams(tokens), pinned)
+            entries.add(entry)
+        elif pinned and not entry.pinned:
+            entry.pinned = True
+            self._lru.pop(entry, None)
+        if not entry.pinned:
+            entry.generations += 1
+            self._lru[entry] = None
+            self._lru.move_to_end(entry)
+            while len(self._lru) > self.max_topics:
+                self._evict()
+
+    def _evict(self):
+        entry, _ = self._lru.popitem(last=False)
+        entries = self._scopes[entry.scope]
+        entries.remove(entry)
+        if not entries.forms:
+            del self._scopes[entry.scope]
+        self.evicted += 1
+
+    def seed(self, keys: Iterable[str]) -> int:
+        """Register the topics of existing cache keys (e.g. the question bank) as canonical."""
+        before = self.stats()["topics"]
+        for key in keys:
+            scope, topic = split_cache_key(key)
+            self.add(scope, topic, pinned=True)
+        return self.stats()["topics"] - before
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "topics": sum(len(entries.forms) for entries in self._scopes.values()),
+            "learned_topics": len(self._lru),
+            "scopes": len(self._scopes),
+            "exact_hits": self.exact_hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+        }
+
+
+# Global topic index
+topic_index = TopicIndex(
+    Config.TOPIC_MATCH_THRESHOLD, Config.TOPIC_INDEX_MAX_TOPICS, Config.TOPIC_MIN_GENERATIONS
+)
@@ -0,0 +1,248 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+import logging
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying (rate limited / transient provider errors)
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class UpstreamError(ValueError):
+    """The upstream call failed for good: not retryable, retries exhausted or no model available."""
+
+
+class UpstreamTimeout(UpstreamError):
+    """The call's overall deadline passed."""
+
+
+class RetryableUpstreamError(Exception):
+    """A failed attempt that may succeed if retried (429/5xx, timeout, network error)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Stops sending traffic to a model after consecutive failures, then probes again after a cooldown.
+
+    Once the cooldown has passed (half-open) a single call at a time is let
+    through as the probe; its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self.probing)
+
+    def acquire(self) -> bool:
+        """Claim a call; while half-open only one probe may be in flight. Pair with release()."""
+        if not self.allow():
+            return False
+        if self.opened_at is not None:
+            self.probing = True
+        return True
+
+    def release(self):
+        self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        # A failed half-open probe re-opens immediately
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            if self.opened_at is None:
+                logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Recent successful attempt latencies, for percentile-based hedge delays."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int = 20) -> Optional[float]:
+        if len(self._samples) < min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class UpstreamPolicy:
+    """Retries, hedging, circuit breaking and model fallback around one upstream call.
+
+    `attempt(model)` performs a single request against `model`. It raises
+    RetryableUpstreamError for transient failures and anything else (e.g.
+    UpstreamError for a 401) for failures that retrying would not fix.
+
+    Every attempt, hedge and backoff of one call fits in a single deadline
+    (a loop.time() value, by default UPSTREAM_TOTAL_TIMEOUT_SECONDS away).
+    """
+
+    def __init__(self, models: List[str]):
+        self.models = models
+        self.breakers: Dict[str, CircuitBreaker] = {
+            model: CircuitBreaker(Config.CIRCUIT_BREAKER_FAILURES, Config.CIRCUIT_BREAKER_COOLDOWN_SECONDS)
+            for model in models
+        }
+        self.latency: Dict[str, LatencyTracker] = {model: LatencyTracker() for model in models}
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def available_models(self) -> List[str]:
+        return [model for model in self.models if self.breakers[model].allow()]
+
+    def pick_model(self) -> str:
+        """First model whose circuit is not open (the primary if everything is open)."""
+        available = self.available_models()
+        return available[0] if available else self.models[0]
+
+    async def execute(self, attempt: Callable[[str], Awaitable[T]], deadline: Optional[float] = None) -> T:
+        loop = asyncio.get_running_loop()
+        if deadline is None:
+            deadline = self.deadline()
+        last_error: Optional[RetryableUpstreamError] = None
+        for round_index in range(Config.UPSTREAM_MAX_RETRIES + 1):
+            if deadline - loop.time() <= 0:
+                raise self._timed_out(last_error)
+            candidates = self.available_models()
+            if not candidates:
+                raise UpstreamError("AI service unavailable: all models are temporarily disabled after repeated failures")
+            # Fall back down the ordered model list on each retry
+            offset = round_index % len(candidates)
+            candidates = candidates[offset:] + candidates[:offset]
+            try:
+                return await self._hedged(candidates, attempt, deadline)
+            except RetryableUpstreamError as e:
+                last_error = e
+                if round_index < Config.UPSTREAM_MAX_RETRIES:
+                    delay = self._backoff(round_index, e.retry_after)
+                    if delay >= deadline - loop.time():
+                        raise self._timed_out(last_error)
+                    logger.warning(f"Upstream attempt failed ({e}); retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+        raise UpstreamError(f"AI service error after {Config.UPSTREAM_MAX_RETRIES + 1} attempts: {last_error}")
+
+    @staticmethod
+    def _timed_out(last_error: Optional[BaseException] = None) -> UpstreamTimeout:
+        detail = f": {last_error}" if last_error is not None else ""
+        return UpstreamTimeout(f"AI service timed out after {Config.UPSTREAM_TOTAL_TIMEOUT_SECONDS}s{detail}")
+
+    @staticmethod
+    def deadline() -> float:
+        """A fresh overall deadline, to share between the calls (e.g. shards) of one generation."""
+        return asyncio.get_running_loop().time() + Config.UPSTREAM_TOTAL_TIMEOUT_SECONDS
+
+    async def _hedged(self, candidates: List[str], attempt: Callable[[str], Awaitable[T]], deadline: float) -> T:
+        loop = asyncio.get_running_loop()
+        primary = asyncio.ensure_future(self._attempt(candidates[0], attempt, deadline))
+        if not Config.UPSTREAM_HEDGE_ENABLED:
+            return await primary
+        # Without a fallback model the hedge is a second request to the same one
+        hedge_model = candidates[1] if len(candidates) > 1 else candidates[0]
+
+        tasks = [primary]
+        try:
+            hedge_delay = self._hedge_delay(candidates[0])
+            done, _ = await asyncio.wait(tasks, timeout=min(hedge_delay, max(0.0, deadline - loop.time())))
+            # No hedge once the deadline has passed: it could not finish in time anyway
+            if not done and deadline - loop.time() > 0:
+                self.hedges_fired += 1
+                logger.info(f"Hedging slow request to {candidates[0]} with {hedge_model}")
+                tasks.append(asyncio.ensure_future(self._attempt(hedge_model, attempt, deadline)))
+
+            last_error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedges_won += 1
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _attempt(self, model: str, attempt: Callable[[str], Awaitable[T]], deadline: float) -> T:
+        breaker = self.breakers[model]
+        if not breaker.acquire():
+            # Another caller is probing the half-open circuit (or it re-opened meanwhile)
+            raise RetryableUpstreamError(f"{model} circuit is not accepting requests")
+        started = time.monotonic()
+        remaining = deadline - asyncio.get_running_loop().time()
+        timeout = min(Config.UPSTREAM_ATTEMPT_TIMEOUT_SECONDS, max(0.0, remaining))
+        try:
+            result = await asyncio.wait_for(attempt(model), timeout)
+        except asyncio.TimeoutError:
+            if timeout < Config.UPSTREAM_ATTEMPT_TIMEOUT_SECONDS:
+                # Cut short by the caller's deadline, not proof that the model is down
+                raise self._timed_out()
+            breaker.record_failure()
+            raise RetryableUpstreamError(f"{model} timed out after {Config.UPSTREAM_ATTEMPT_TIMEOUT_SECONDS}s")
+        except RetryableUpstreamError:
+            breaker.record_failure()
+            raise
+        finally:
+            breaker.release()
+        breaker.record_success()
+        self.latency[model].observe(time.monotonic() - started)
+        return result
+
+    def _hedge_delay(self, model: str) -> float:
+        p95 = self.latency[model].percentile(Config.UPSTREAM_HEDGE_PERCENTILE)
+        return p95 if p95 is not None else Config.UPSTREAM_HEDGE_DELAY_SECONDS
+
+    def _backoff(self, round_index: int, retry_after: Optional[float]) -> float:
+        # Full jitter exponential backoff, but never sooner than the provider's Retry-After
+        ceiling = min(Config.UPSTREAM_BACKOFF_MAX_SECONDS, Config.UPSTREAM_BACKOFF_BASE_SECONDS * (2 ** round_index))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, Config.UPSTREAM_BACKOFF_MAX_SECONDS))
+        return delay
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "breakers": {model: breaker.state for model, breaker in self.breakers.items()},
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
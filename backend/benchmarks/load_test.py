@@ -0,0 +1,196 @@
+"""Replays student flows (generate -> fetch questions -> answer -> submit) at a target concurrency.
+
+Run from the backend directory. By default the app and the mock OpenRouter
+both run in-process, so no ports or API keys are needed:
+
+    python -m benchmarks.load_test --flows 500 --concurrency 50 --json load.json
+
+Against a deployed app (configured with OPENROUTER_BASE_URL pointing at
+benchmarks.mock_openrouter):
+
+    python -m benchmarks.load_test --target http://127.0.0.1:8000 --flows 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+import httpx
+
+from benchmarks import mock_openrouter
+from benchmarks.report import peak_rss_mb, print_table, summarize, write_json
+
+MOCK_BASE_URL = "http://mock-openrouter/api/v1"
+
+TOPICS = [
+    ("competitive", {"exam": "NEET"}, "Human Physiology"),
+    ("competitive", {"exam": "JEE Main"}, "Thermodynamics"),
+    ("college", {"course": "Computer Science", "semester": 3}, "Data Structures"),
+    ("college", {"course": "Electrical Engineering", "semester": 2}, "Circuit Analysis"),
+    ("school", {"class_level": 10, "subject": "Mathematics"}, "Quadratic Equations"),
+    ("school", {"class_level": 8, "subject": "Science"}, "Photosynthesis"),
+]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Counter = Counter()
+        self.failed_flows = 0
+
+    @asynccontextmanager
+    async def step(self, name: str):
+        started = time.perf_counter()
+        yield
+        self.latencies[name].append(time.perf_counter() - started)
+
+
+class FlowFailed(Exception):
+    pass
+
+
+def _check(recorder: Recorder, step: str, response: httpx.Response):
+    recorder.statuses[f"{step}:{response.status_code}"] += 1
+    if response.status_code >= 400:
+        raise FlowFailed(f"{step} -> {response.status_code}")
+
+
+async def run_flow(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, args, headers: Dict[str, str]):
+    domain, fields, topic = rng.choice(TOPICS[:args.topics])
+    config = {"domain": domain, "topic": topic, "num_questions": args.questions, **fields}
+    flow_started = time.perf_counter()
+
+    async with recorder.step("generate"):
+        response = await client.post("/generate-test", params={"stream": str(args.stream).lower()}, json=config, headers=headers)
+    _check(recorder, "generate", response)
+    session_id = response.json()["session_id"]
+
+    async with recorder.step("fetch_questions"):
+        response = await client.get(f"/questions/{session_id}", headers=headers)
+        _check(recorder, "fetch_questions", response)
+        payload = response.json()
+        questions = payload["questions"]
+        # Streaming sessions: wait for the rest the way the frontend does
+        while payload["generating"] and len(questions) < payload["total_questions"]:
+            response = await client.get(f"/question/{session_id}/{len(questions)}", headers=headers)
+            if response.status_code == 400:
+                break
+            _check(recorder, "fetch_questions", response)
+            questions.append(response.json())
+            payload = {"generating": True, "total_questions": response.json()["total_questions"]}
+
+    answers = [rng.choice(q["options"]) for q in questions]
+    if args.per_question_answers:
+        for i, answer in enumerate(answers):
+            async with recorder.step("answer"):
+                response = await client.post(f"/answer/{session_id}/{i}", json={"answer": answer}, headers=headers)
+            _check(recorder, "answer", response)
+    else:
+        async with recorder.step("answers_batch"):
+            response = await client.post(f"/answers/{session_id}", json={"answers": answers}, headers=headers)
+        _check(recorder, "answers_batch", response)
+
+    async with recorder.step("submit"):
+        response = await client.post(f"/submit/{session_id}", json={"answers": answers}, headers=headers)
+    _check(recorder, "submit", response)
+    recorder.latencies["flow"].append(time.perf_counter() - flow_started)
+
+
+async def drive(client: httpx.AsyncClient, args) -> Dict[str, object]:
+    recorder = Recorder()
+    remaining = iter(range(args.flows))
+    deadline = time.monotonic() + args.duration if args.duration else None
+
+    async def user(user_index: int):
+        rng = random.Random(args.seed * 10_000 + user_index)
+        # Distinct client identity per virtual student, as admission control sees real users
+        headers = {"X-Forwarded-For": f"10.{user_index // 65536 % 256}.{user_index // 256 % 256}.{user_index % 256}"}
+        for _ in remaining:
+            if deadline and time.monotonic() > deadline:
+                return
+            try:
+                await run_flow(client, recorder, rng, args, headers)
+            except FlowFailed:
+                recorder.failed_flows += 1
+            except httpx.HTTPError as e:
+                recorder.failed_flows += 1
+                recorder.statuses[f"error:{type(e).__name__}"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    steps = {name: summarize(samples, elapsed) for name, samples in recorder.latencies.items()}
+    all_requests = [s for name, samples in recorder.latencies.items() if name != "flow" for s in samples]
+    steps["all_requests"] = summarize(all_requests, elapsed)
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "completed_flows": len(recorder.latencies["flow"]),
+        "failed_flows": recorder.failed_flows,
+        "statuses": dict(recorder.statuses),
+        "steps": steps,
+    }
+
+
+@asynccontextmanager
+async def in_process_client(args):
+    # Must be configured before the app modules read Config
+    os.environ.setdefault("OPENROUTER_API_KEY", "mock-key-for-local-benchmarks-000000")
+    os.environ["OPENROUTER_BASE_URL"] = MOCK_BASE_URL
+    from app.ai_generator import ai_generator
+    from app.main import app
+
+    mock_app = mock_openrouter.create_app(mock_openrouter.settings_from_args(args))
+    ai_generator._build_client = lambda: httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=mock_app), timeout=httpx.Timeout(60.0)
+    )
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://studmaster", timeout=120.0) as client:
+            yield client, mock_app.state.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", help="base URL of a running app (default: run everything in-process)")
+    parser.add_argument("--flows", type=int, default=200, help="total student flows to run")
+    parser.add_argument("--duration", type=float, default=0, help="stop starting new flows after this many seconds")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent virtual students")
+    parser.add_argument("--questions", type=int, default=10, help="questions per test")
+    parser.add_argument("--topics", type=int, default=len(TOPICS), help="distinct configs in the mix (fewer = more cache hits)")
+    parser.add_argument("--stream", action="store_true", help="use streamed generation")
+    parser.add_argument("--per-question-answers", action="store_true", help="save answers one request at a time")
+    parser.add_argument("--json", dest="json_path", help="write results as JSON to this path")
+    mock_openrouter.add_arguments(parser)
+    args = parser.parse_args()
+    args.topics = max(1, min(args.topics, len(TOPICS)))
+
+    async def run():
+        if args.target:
+            async with httpx.AsyncClient(base_url=args.target, timeout=120.0) as client:
+                return await drive(client, args)
+        async with in_process_client(args) as (client, mock_stats):
+            results = await drive(client, args)
+            results["upstream_calls"] = dict(mock_stats)
+            return results
+
+    results = asyncio.run(run())
+    results["peak_rss_mb"] = peak_rss_mb()
+    print(
+        f"{results['completed_flows']} flows in {results['elapsed_seconds']}s "
+        f"({results['failed_flows']} failed), peak RSS {results['peak_rss_mb']} MB"
+    )
+    print_table(results["steps"])
+    if results["failed_flows"]:
+        print("Statuses:", results["statuses"])
+    if args.json_path:
+        parameters = {k: v for k, v in vars(args).items() if k != "json_path"}
+        write_json(args.json_path, "load_test", results, parameters)
+
+
+if __name__ == "__main__":
+    main()
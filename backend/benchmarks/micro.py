@@ -0,0 +1,231 @@
+"""Microbenchmarks for SessionManager operations and AI response parsing.
+
+Run from the backend directory:
+
+    python -m benchmarks.micro [--sessions 10000] [--rounds 2000] [--json micro.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from app.ai_generator import AIGenerator, QuestionStreamParser
+from app.classroom import RoomManager
+from app.models import Question, TestConfig
+from app.question_bank import QuestionBank, write_bank
+from app.question_cache import InMemoryQuestionCache, QuestionCache, SQLiteQuestionCache, cache_key
+from app.session_manager import SessionManager
+from app.topics import TopicIndex
+from app.session_store import InMemorySessionStore
+from benchmarks.mock_openrouter import build_questions, render_content
+from benchmarks.report import summarize, write_json
+
+CONFIG = TestConfig(domain="competitive", exam="NEET", topic="Human Physiology", num_questions=20)
+
+
+def run_inline(coro):
+    """Result of a coroutine that never suspends (in-memory session calls), without event-loop overhead."""
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    coro.close()
+    raise RuntimeError("coroutine suspended; it needs an event loop")
+
+
+def bench(fn: Callable[[], object], rounds: int) -> Dict[str, float]:
+    """Per-call latency percentiles and calls per second of fn."""
+    samples: List[float] = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        call_started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    # Sub-millisecond operations read better in microseconds
+    return summarize(samples, elapsed, unit="us")
+
+
+def session_benchmarks(session_count: int, rounds: int) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(0)
+    questions = [Question(**q) for q in build_questions(f"Generate 20 multiple choice\nTopic: {CONFIG.topic}", rng)]
+    manager = SessionManager(expire_minutes=30, store=InMemorySessionStore())
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    session_ids = [run_inline(manager.create_session(CONFIG, questions)) for _ in range(session_count)]
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    answers = {i: questions[i].options[0] for i in range(len(questions))}
+    results = {
+        "create_session": bench(lambda: run_inline(manager.create_session(CONFIG, questions)), rounds),
+        "get_session": bench(lambda: run_inline(manager.get_session(rng.choice(session_ids))), rounds),
+        "update_answer": bench(
+            lambda: run_inline(manager.update_answer(rng.choice(session_ids), 3, questions[3].options[1])), rounds
+        ),
+        "update_answers_batch": bench(
+            lambda: run_inline(manager.update_answers(rng.choice(session_ids), answers)), rounds
+        ),
+        "grade": bench(lambda: run_inline(manager.get_session(rng.choice(session_ids))).grade(), rounds),
+        "cleanup_scan": bench(lambda: run_inline(manager._cleanup_old_sessions(force=True)), rounds),
+    }
+    submit_ids = iter(session_ids)
+    results["submit"] = bench(
+        lambda: run_inline(manager.submit_test(next(submit_ids), answers)), min(rounds, session_count)
+    )
+    results["memory"] = {"sessions": session_count, "bytes_per_session": round(memory / session_count)}
+    return results
+
+
+def parsing_benchmarks(rounds: int) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(1)
+    generator = AIGenerator()
+    prompt = f"Generate 20 multiple choice\nTopic: {CONFIG.topic}"
+    clean = render_content(build_questions(prompt, rng), malformed=False)
+    dirty = render_content(build_questions(prompt, rng), malformed=True)
+
+    def parse(content: str):
+        parser = QuestionStreamParser()
+        return parser.feed(content) + parser.close()
+
+    def parse_streamed(content: str, chunk: int = 16):
+        parser = QuestionStreamParser()
+        objects = []
+        for start in range(0, len(content), chunk):
+            objects.extend(parser.feed(content[start:start + chunk]))
+        return objects + parser.close()
+
+    parsed = parse(clean)
+    return {
+        "parse_clean": bench(lambda: parse(clean), rounds),
+        "parse_malformed": bench(lambda: parse(dirty), rounds),
+        "parse_streamed_chunks": bench(lambda: parse_streamed(clean), rounds),
+        "validate_20": bench(lambda: [generator._validate_question(i, q) for i, q in enumerate(parsed)], rounds),
+        "json_loads_baseline": bench(lambda: json.loads(clean.strip("`json\n")), rounds),
+    }
+
+
+def bank_benchmarks(rounds: int, pool_size: int = 200) -> Dict[str, Dict[str, float]]:
+    """Sampling a test from the memory-mapped bank vs the question cache backends."""
+    rng = random.Random(2)
+    pool = []
+    while len(pool) < pool_size:
+        pool.extend(Question(**q) for q in build_questions(f"Generate 20 multiple choice\nTopic: {CONFIG.topic}", rng))
+    pool = pool[:pool_size]
+    with tempfile.TemporaryDirectory() as tmp:
+        bank_path = os.path.join(tmp, "bank.smqb")
+        write_bank(bank_path, {cache_key(CONFIG): pool})
+        bank = QuestionBank(bank_path)
+        bank.open()
+        memory = InMemoryQuestionCache(10, 3600)
+        memory.put(cache_key(CONFIG), pool)
+        sqlite = SQLiteQuestionCache(os.path.join(tmp, "cache.sqlite3"), 10, 3600)
+        sqlite.put(cache_key(CONFIG), pool)
+        # SQLite reads go through the threadpool, so they need a running loop
+        loop = asyncio.new_event_loop()
+        try:
+            return {
+                "bank_sample_20": bench(lambda: bank.sample(CONFIG), rounds),
+                "memory_cache_get_20": bench(lambda: run_inline(QuestionCache(memory).get(CONFIG)), rounds),
+                "sqlite_cache_get_20": bench(
+                    lambda: loop.run_until_complete(QuestionCache(sqlite).get(CONFIG)), rounds
+                ),
+            }
+        finally:
+            loop.close()
+            bank.close()
+            sqlite._conn.close()
+
+
+def topic_benchmarks(rounds: int, topic_count: int = 5_000) -> Dict[str, Dict[str, float]]:
+    """Canonical-topic lookups against one subject with topic_count known topics."""
+    rng = random.Random(3)
+    vocabulary = [
+        "motion", "energy", "wave", "optics", "thermal", "electric", "magnetic", "nuclear", "fluid", "quantum",
+        "circuit", "gravitation", "kinematics", "dynamics", "oscillation", "semiconductor", "current", "field",
+        "potential", "capacitor", "friction", "momentum", "rotation", "elasticity", "sound", "light", "heat",
+    ]
+    index = TopicIndex(threshold=0.6, max_topics=topic_count)
+    known = []
+    while len(known) < topic_count:
+        topic = " ".join(rng.sample(vocabulary, rng.randint(1, 4))) + f" {len(known)}"
+        index.add("school|physics", topic)
+        known.append(topic)
+    variants = [topic.title() + "s" for topic in rng.sample(known, 200)]
+    unknown = [f"{rng.choice(vocabulary)} {rng.choice(vocabulary)} extra" for _ in range(200)]
+    return {
+        "topic_exact": bench(lambda: index.match("school|physics", rng.choice(known)), rounds),
+        "topic_variant": bench(lambda: index.match("school|physics", rng.choice(variants)), rounds),
+        "topic_unknown": bench(lambda: index.match("school|physics", rng.choice(unknown)), rounds),
+    }
+
+
+def classroom_benchmarks(student_count: int, rounds: int) -> Dict[str, Dict[str, float]]:
+    """Joining a room of student_count students, submitting, and reading the leaderboard."""
+    rng = random.Random(4)
+    questions = [Question(**q) for q in build_questions(f"Generate 20 multiple choice\nTopic: {CONFIG.topic}", rng)]
+    manager = SessionManager(expire_minutes=30, store=InMemorySessionStore())
+    rooms = RoomManager(ttl_seconds=3600, max_rooms=10, max_students=student_count + rounds)
+    room = rooms.create(CONFIG, questions)
+
+    def join(name: str) -> str:
+        rooms.reserve(room, name)
+        session_id = run_inline(manager.create_shared_session(room.config_values, room.questions, room.code))
+        rooms.add_student(room, session_id, name)
+        return session_id
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    session_ids = [join(f"student {i}") for i in range(student_count)]
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    names = iter(range(student_count, student_count + rounds))
+    submit_ids = iter(session_ids)
+    return {
+        "join": bench(lambda: join(f"student {next(names)}"), rounds),
+        "record_result": bench(
+            lambda: rooms.record_result(room.code, next(submit_ids), rng.randint(0, len(questions))),
+            min(rounds, student_count),
+        ),
+        "leaderboard_top10": bench(lambda: rooms.leaderboard(room, 10, session_ids[0]), rounds),
+        "memory": {"students": student_count, "bytes_per_student": round(memory / student_count)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10_000, help="sessions preloaded into the manager")
+    parser.add_argument("--rounds", type=int, default=2_000, help="calls per benchmark")
+    parser.add_argument("--json", dest="json_path", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = {
+        "session_manager": session_benchmarks(args.sessions, args.rounds),
+        "parsing": parsing_benchmarks(args.rounds),
+        "question_bank": bank_benchmarks(args.rounds),
+        "topics": topic_benchmarks(args.rounds),
+        "classroom": classroom_benchmarks(args.sessions, args.rounds),
+    }
+    for group, rows in results.items():
+        print(f"\n{group}")
+        columns = ["count", "rps", "p50_us", "p95_us", "p99_us"]
+        print(f"{'':<24}" + "".join(f"{c:>10}" for c in columns))
+        for name, summary in rows.items():
+            if name == "memory":
+                unit, value = next((key, value) for key, value in summary.items() if key.startswith("bytes_per_"))
+                print(f"{unit.replace('bytes_per_', 'bytes/'):<24}{value:>10}")
+                continue
+            print(f"{name:<24}" + "".join(f"{summary.get(c, ''):>10}" for c in columns))
+    if args.json_path:
+        write_json(args.json_path, "micro", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Local stand-in for the OpenRouter chat completions API.
+
+Run from the backend directory and point the app at it:
+
+    python -m benchmarks.mock_openrouter --port 9000 --latency 0.8 --error-rate 0.02
+    OPENROUTER_BASE_URL=http://127.0.0.1:9000/api/v1 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_COUNT_PATTERN = re.compile(r"Generate (\d+) multiple choice")
+_TOPIC_PATTERN = re.compile(r"Topic: (.+)")
+
+
+@dataclass
+class MockSettings:
+    latency: float = 0.5  # seconds before the response (or first streamed token)
+    jitter: float = 0.2  # +/- uniform jitter on latency
+    token_delay: float = 0.002  # seconds per streamed chunk
+    chunk_chars: int = 16  # characters of content per streamed chunk
+    error_rate: float = 0.0  # fraction of calls answered with a 429/503
+    malformed_rate: float = 0.0  # fraction of calls with a broken question and a truncated tail
+    seed: int = 0
+
+
+def build_questions(prompt: str, rng: random.Random):
+    count_match = _COUNT_PATTERN.search(prompt)
+    topic_match = _TOPIC_PATTERN.search(prompt)
+    count = int(count_match.group(1)) if count_match else 10
+    topic = topic_match.group(1).strip() if topic_match else "general knowledge"
+    salt = rng.randrange(1_000_000)
+    questions = []
+    for i in range(count):
+        options = [f"Option {c} for {topic} question {salt}-{i}" for c in "ABCD"]
+        questions.append({
+            "question": f"Mock question {salt}-{i} about {topic}: which statement is correct?",
+            "options": options,
+            "correct_answer": options[rng.randrange(4)],
+        })
+    return questions
+
+
+def render_content(questions, malformed: bool) -> str:
+    content = json.dumps(questions, indent=2)
+    if malformed and len(questions) > 2:
+        # One object with a missing quote, and the tail cut off mid-object
+        content = content.replace('"question": "Mock', '"question": Mock', 1)
+        content = content[: int(len(content) * 0.9)]
+    return "```json\n" + content + "\n```"
+
+
+def create_app(settings: MockSettings) -> FastAPI:
+    app = FastAPI(title="Mock OpenRouter")
+    rng = random.Random(settings.seed)
+    stats = {"requests": 0, "errors": 0, "malformed": 0, "streams": 0}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/api/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        await asyncio.sleep(max(0.0, settings.latency + rng.uniform(-settings.jitter, settings.jitter)))
+
+        if rng.random() < settings.error_rate:
+            stats["errors"] += 1
+            status = rng.choice([429, 503])
+            return JSONResponse({"error": {"message": "mock upstream error"}}, status_code=status, headers={"Retry-After": "1"})
+
+        prompt = body["messages"][-1]["content"]
+        malformed = rng.random() < settings.malformed_rate
+        stats["malformed"] += malformed
+        content = render_content(build_questions(prompt, rng), malformed)
+        completion_tokens = len(content) // 4
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": completion_tokens,
+            "total_tokens": len(prompt) // 4 + completion_tokens,
+        }
+
+        if not body.get("stream"):
+            return {
+                "id": f"mock-{stats['requests']}",
+                "model": body.get("model"),
+                "choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        stats["streams"] += 1
+
+        async def events():
+            for start in range(0, len(content), settings.chunk_chars):
+                chunk = {"choices": [{"delta": {"content": content[start:start + settings.chunk_chars]}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                if settings.token_delay:
+                    await asyncio.sleep(settings.token_delay)
+            yield f"data: {json.dumps({'choices': [{'delta': {}, 'finish_reason': 'stop'}], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    app.state.settings = settings
+    app.state.stats = stats
+    app.state.started = time.time()
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    defaults = MockSettings()
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--token-delay", type=float, default=defaults.token_delay)
+    parser.add_argument("--chunk-chars", type=int, default=defaults.chunk_chars)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--malformed-rate", type=float, default=defaults.malformed_rate)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def settings_from_args(args: argparse.Namespace) -> MockSettings:
+    return MockSettings(
+        latency=args.latency,
+        jitter=args.jitter,
+        token_delay=args.token_delay,
+        chunk_chars=args.chunk_chars,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(settings_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Shared result helpers: latency percentiles, memory and JSON output for CI comparison."""
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+_UNITS = {"ms": 1e3, "us": 1e6}
+
+
+def summarize(samples: List[float], elapsed: Optional[float] = None, unit: str = "ms") -> Dict[str, float]:
+    """Count, throughput and latency percentiles (in `unit`) for a list of durations in seconds."""
+    scale = _UNITS[unit]
+    summary = {
+        "count": len(samples),
+        f"mean_{unit}": round(sum(samples) / len(samples) * scale, 3) if samples else 0.0,
+        f"p50_{unit}": round(percentile(samples, 50) * scale, 3),
+        f"p95_{unit}": round(percentile(samples, 95) * scale, 3),
+        f"p99_{unit}": round(percentile(samples, 99) * scale, 3),
+        f"max_{unit}": round(max(samples) * scale, 3) if samples else 0.0,
+    }
+    if elapsed:
+        summary["rps"] = round(len(samples) / elapsed, 2)
+    return summary
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_json(path: str, benchmark: str, results: Any, parameters: Optional[Dict[str, Any]] = None):
+    document = {
+        "benchmark": benchmark,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": parameters or {},
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+
+
+def print_table(rows: Dict[str, Dict[str, float]]):
+    columns = ["count", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+    print(f"{'':<24}" + "".join(f"{c:>10}" for c in columns))
+    for name, summary in rows.items():
+        print(f"{name:<24}" + "".join(f"{summary.get(c, ''):>10}" for c in columns))
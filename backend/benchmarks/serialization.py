@@ -0,0 +1,148 @@
+"""Per-request CPU of the old dict + jsonable_encoder + json path vs the orjson/precomputed path.
+
+Run from the backend directory:
+
+    python -m benchmarks.serialization [--rounds 5000] [--json serialization.json]
+"""
+import argparse
+import random
+import time
+import warnings
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.compact_session import CompactSession
+from app.config import Config
+from app.main import _config_options
+from app.models import Question, TestConfig
+from app.serialization import FastJSONResponse, RawJSONResponse
+from benchmarks.mock_openrouter import build_questions
+from benchmarks.report import summarize, write_json
+
+CONFIG_BODY = {"domain": "competitive", "exam": "NEET", "topic": "Human Physiology", "num_questions": 20}
+
+
+def legacy_response(content: Any) -> bytes:
+    # What FastAPI did for a returned dict: jsonable_encoder, then json.dumps in JSONResponse
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def legacy_question(session: CompactSession, i: int) -> bytes:
+    question = session.questions[i]
+    return legacy_response({
+        "question_index": i,
+        "total_questions": len(session.questions),
+        "question": question.question,
+        "options": list(question.options),
+        "user_answer": session.answer_text(i),
+        "correct_answer": question.correct_answer,
+    })
+
+
+def legacy_generate(body: Dict[str, Any]) -> bytes:
+    # Dict[str, Any] body, validated again into TestConfig, then .dict()
+    config = TestConfig(**dict(body))
+    return legacy_response({"session_id": "x", "num_questions": 20, "streaming": False, "config": config.dict()})
+
+
+def fast_generate(body: Dict[str, Any]) -> bytes:
+    # FastAPI validates the body into TestConfig once
+    config = TestConfig.model_validate(body)
+    return FastJSONResponse(
+        {"session_id": "x", "num_questions": 20, "streaming": False, "config": config.model_dump()}
+    ).body
+
+
+def legacy_submit(session: CompactSession) -> bytes:
+    score, results = session.grade()
+    return legacy_response({
+        "session_id": session.session_id, "score": score, "total": len(session.questions),
+        "percentage": round(score / len(session.questions) * 100, 2), "results": results,
+        "config": session.config.dict(),
+    })
+
+
+def fast_submit(session: CompactSession) -> bytes:
+    score, results = session.grade()
+    return FastJSONResponse({
+        "session_id": session.session_id, "score": score, "total": len(session.questions),
+        "percentage": round(score / len(session.questions) * 100, 2), "results": results,
+        "config": session.config_dict(),
+    }).body
+
+
+def legacy_summary(session: CompactSession) -> bytes:
+    return legacy_response({
+        "session_id": session.session_id, "num_questions": len(session.questions),
+        "num_answered": session.num_answered(), "submitted": session.submitted,
+        "generating": session.generating, "config": session.config.dict(),
+    })
+
+
+def fast_summary(session: CompactSession) -> bytes:
+    return FastJSONResponse({
+        "session_id": session.session_id, "num_questions": len(session.questions),
+        "num_answered": session.num_answered(), "submitted": session.submitted,
+        "generating": session.generating, "config": session.config_dict(),
+    }).body
+
+
+def legacy_options() -> bytes:
+    return legacy_response({
+        "school_subjects": Config.SCHOOL_SUBJECTS,
+        "college_courses": Config.COLLEGE_COURSES,
+        "competitive_exams": Config.COMPETITIVE_EXAMS,
+        "max_questions": Config.MAX_QUESTIONS,
+    })
+
+
+def time_us(fn: Callable[[], object], rounds: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples, unit="us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5_000)
+    parser.add_argument("--json", dest="json_path", help="write results as JSON to this path")
+    args = parser.parse_args()
+    # The legacy path deliberately uses the deprecated .dict()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    rng = random.Random(0)
+    questions = [Question(**q) for q in build_questions("Generate 20 multiple choice\nTopic: Physiology", rng)]
+    session = CompactSession.create("bench", TestConfig(**CONFIG_BODY), questions)
+    for i in range(0, len(questions), 2):
+        session.set_answer(i, questions[i].options[1])
+
+    cases = {
+        "get_question": (
+            lambda: legacy_question(session, 3),
+            lambda: RawJSONResponse(session.question_json(3, len(session.questions))).body,
+        ),
+        "generate_test_validation": (lambda: legacy_generate(CONFIG_BODY), lambda: fast_generate(CONFIG_BODY)),
+        "submit_test": (lambda: legacy_submit(session), lambda: fast_submit(session)),
+        "test_summary": (lambda: legacy_summary(session), lambda: fast_summary(session)),
+        "config_options": (legacy_options, lambda: _config_options.response().body),
+    }
+
+    results = {}
+    print(f"{'':<26}{'legacy p50 us':>14}{'fast p50 us':>14}{'speedup':>10}")
+    for name, (legacy, fast) in cases.items():
+        legacy_stats, fast_stats = time_us(legacy, args.rounds), time_us(fast, args.rounds)
+        speedup = round(legacy_stats["p50_us"] / fast_stats["p50_us"], 2) if fast_stats["p50_us"] else None
+        results[name] = {"legacy": legacy_stats, "fast": fast_stats, "p50_speedup": speedup}
+        print(f"{name:<26}{legacy_stats['p50_us']:>14}{fast_stats['p50_us']:>14}{speedup:>10}")
+
+    if args.json_path:
+        write_json(args.json_path, "serialization", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
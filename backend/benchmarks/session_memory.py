@@ -0,0 +1,100 @@
+"""Bytes per session for the pydantic vs compact session representation.
+
+Run from the backend directory:
+
+    python -m benchmarks.session_memory [--sizes 10000 100000] [--json out.json]
+"""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from app.compact_session import CompactSession
+from app.models import Question, TestConfig, TestSession
+from app.question_cache import shuffle_questions
+
+QUESTIONS_PER_TEST = 20
+POOL_SIZE = 200
+
+
+def build_pool():
+    # Stand-in for a cached/generated pool that many sessions are sampled from
+    return [
+        Question(
+            question=f"Sample question {i} about human physiology with a realistic amount of text?",
+            options=[f"Option {c} for question {i}, moderately long answer text" for c in "ABCD"],
+            correct_answer=f"Option A for question {i}, moderately long answer text",
+        )
+        for i in range(POOL_SIZE)
+    ]
+
+
+def pydantic_session(config, questions):
+    return TestSession(
+        session_id=str(uuid.uuid4()),
+        config=config,
+        questions=questions,
+        user_answers=[None] * len(questions),
+        created_at=datetime.now(),
+    )
+
+
+def compact_session(config, questions):
+    return CompactSession.create(str(uuid.uuid4()), config, questions)
+
+
+def measure(factory, count, pool):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = []
+    for _ in range(count):
+        # Each request parses its own config and gets a shuffled sample, as /generate-test does
+        config = TestConfig(
+            domain="competitive", exam="NEET", topic="Human Physiology", num_questions=QUESTIONS_PER_TEST
+        )
+        sessions.append(factory(config, shuffle_questions(pool, QUESTIONS_PER_TEST)))
+    # Simulate answering half the questions
+    for session in sessions:
+        for i in range(0, QUESTIONS_PER_TEST, 2):
+            if isinstance(session, CompactSession):
+                session.set_answer(i, session.questions[i].options[0])
+            else:
+                session.user_answers[i] = session.questions[i].options[0]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del sessions
+    return (after - before) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--json", dest="json_path", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    random.seed(0)
+    pool = build_pool()
+    results = []
+    for size in args.sizes:
+        row = {"sessions": size}
+        for name, factory in (("pydantic", pydantic_session), ("compact", compact_session)):
+            row[f"{name}_bytes_per_session"] = round(measure(factory, size, pool))
+        row["ratio"] = round(row["pydantic_bytes_per_session"] / row["compact_bytes_per_session"], 2)
+        results.append(row)
+        print(
+            f"{size:>8} sessions: pydantic {row['pydantic_bytes_per_session']:>7} B/session, "
+            f"compact {row['compact_bytes_per_session']:>6} B/session ({row['ratio']}x smaller)"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"benchmark": "session_memory", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
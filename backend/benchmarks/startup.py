@@ -0,0 +1,126 @@
+"""Cold-start cost: `import app.main` in a fresh interpreter, and time to the first served request.
+
+Run from the backend directory:
+
+    python -m benchmarks.startup [--runs 5] [--json startup.json]
+
+Each run starts a new process, so the numbers include interpreter startup and
+module imports but not bytecode compilation (run once beforehand to warm
+__pycache__). "first_request" spawns uvicorn and polls /healthz and /readyz
+until each answers 200.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional
+
+from benchmarks.report import summarize, write_json
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - started)"
+)
+# Modules that should stay out of the import path; they are loaded on first use
+DEFERRED_MODULES = ("httpx",)
+
+
+def _child_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.getcwd() + os.pathsep + env.get("PYTHONPATH", "")
+    # Keep the boot path self-contained: no upstream traffic, no prefill
+    env.setdefault("OPENROUTER_API_KEY", "sk-or-startup-benchmark-placeholder")
+    env["UPSTREAM_PREWARM"] = "false"
+    env["PREFILL_ENABLED"] = "false"
+    return env
+
+
+def measure_import(env: Dict[str, str]) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def deferred_imports_loaded(env: Dict[str, str]) -> List[str]:
+    snippet = f"import sys, app.main; print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", snippet], env=env, capture_output=True, text=True, check=True)
+    return [m for m in output.stdout.strip().split(",") if m]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url: str, deadline: float) -> Optional[float]:
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.005)
+    return None
+
+
+def measure_first_request(env: Dict[str, str], timeout: float) -> Dict[str, float]:
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + timeout
+        healthy = _wait_for(f"http://127.0.0.1:{port}/healthz", deadline)
+        ready = _wait_for(f"http://127.0.0.1:{port}/readyz", deadline)
+        if healthy is None or ready is None:
+            raise RuntimeError(f"server did not become ready within {timeout}s")
+        return {"healthz": healthy - started, "readyz": ready - started}
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for each server to be ready")
+    parser.add_argument("--json", dest="json_path", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    env = _child_env()
+    # Warm-up run so every measured run finds compiled bytecode
+    measure_import(env)
+
+    imports = [measure_import(env) for _ in range(args.runs)]
+    first_requests = [measure_first_request(env, args.timeout) for _ in range(args.runs)]
+    results = {
+        "import_app_main": summarize(imports),
+        "first_healthz": summarize([run["healthz"] for run in first_requests]),
+        "first_readyz": summarize([run["readyz"] for run in first_requests]),
+        "deferred_modules_loaded": deferred_imports_loaded(env),
+    }
+
+    print(f"{'':<20}{'p50_ms':>10}{'p95_ms':>10}{'max_ms':>10}")
+    for name in ("import_app_main", "first_healthz", "first_readyz"):
+        summary = results[name]
+        print(f"{name:<20}{summary['p50_ms']:>10}{summary['p95_ms']:>10}{summary['max_ms']:>10}")
+    if results["deferred_modules_loaded"]:
+        print(f"warning: imported eagerly by app.main: {', '.join(results['deferred_modules_loaded'])}")
+
+    if args.json_path:
+        write_json(args.json_path, "startup", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
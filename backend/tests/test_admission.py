@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+from app.admission import AdmissionController, AdmissionRejected
+
+
+def controller(**overrides) -> AdmissionController:
+    settings = dict(
+        max_concurrent=4, max_queue=10, per_client_queue=5, rate_per_second=0, burst=1, max_wait_seconds=3.0
+    )
+    settings.update(overrides)
+    return AdmissionController(**settings)
+
+
+def test_queued_caller_admitted_when_token_refills():
+    # Slots are free but the bucket is empty: the refill, not a release, must admit the caller
+    admission = controller(rate_per_second=5, burst=2)
+
+    async def scenario() -> float:
+        for _ in range(2):
+            await admission.acquire("client")
+            admission.release()
+        started = time.monotonic()
+        await admission.acquire("client")
+        waited = time.monotonic() - started
+        admission.release()
+        return waited
+
+    waited = asyncio.run(scenario())
+    assert waited < 1.0
+    assert admission.stats()["timed_out"] == 0
+    assert admission.in_flight == 0
+
+
+def test_release_hands_slot_to_waiter():
+    admission = controller(max_concurrent=1)
+
+    async def scenario():
+        await admission.acquire("a")
+        waiter = asyncio.create_task(admission.acquire("b"))
+        await asyncio.sleep(0)
+        assert admission.queued == 1 and not waiter.done()
+        admission.release()
+        await asyncio.wait_for(waiter, 1.0)
+        assert admission.in_flight == 1 and admission.queued == 0
+        admission.release()
+
+    asyncio.run(scenario())
+
+
+def test_waiters_served_round_robin_across_clients():
+    admission = controller(max_concurrent=1)
+    order = []
+
+    async def request(client_id: str):
+        await admission.acquire(client_id)
+        order.append(client_id)
+        await asyncio.sleep(0)
+        admission.release()
+
+    async def scenario():
+        await admission.acquire("holder")
+        tasks = [asyncio.create_task(request(c)) for c in ("noisy", "noisy", "noisy", "quiet")]
+        await asyncio.sleep(0)
+        admission.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order == ["noisy", "quiet", "noisy", "noisy"]
+
+
+def test_full_queue_rejects_immediately():
+    admission = controller(max_concurrent=1, max_queue=1)
+
+    async def scenario():
+        await admission.acquire("a")
+        queued = asyncio.create_task(admission.acquire("b"))
+        await asyncio.sleep(0)
+        started = time.monotonic()
+        with pytest.raises(AdmissionRejected):
+            await admission.acquire("c")
+        assert time.monotonic() - started < 0.5
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert admission.queued == 0
+
+    asyncio.run(scenario())
+    assert admission.rejected == 1
+
+
+def test_wait_times_out_with_retry_after():
+    admission = controller(max_concurrent=1, max_wait_seconds=0.05)
+
+    async def scenario():
+        await admission.acquire("a")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("b")
+        assert rejected.value.retry_after >= 1.0
+        assert admission.queued == 0
+
+    asyncio.run(scenario())
+    assert admission.timed_out == 1
@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+import httpx
+
+from app import models
+from app.ai_generator import AIGenerator, _split_shards
+from app.config import Config
+from app.metrics import UPSTREAM_TOKENS
+from app.upstream_policy import UpstreamTimeout
+
+
+def config(num_questions: int) -> models.TestConfig:
+    return models.TestConfig(
+        domain="school", class_level=10, subject="Physics", topic="Optics", num_questions=num_questions
+    )
+
+
+def question(i: int) -> dict:
+    return {
+        "question": f"What is property number {i} of light {'x' * i}?",
+        "options": [f"Answer {i}", f"Wrong {i}a", f"Wrong {i}b", f"Wrong {i}c"],
+        "correct_answer": f"Answer {i}",
+    }
+
+
+def completion(questions) -> dict:
+    return {
+        "choices": [{"message": {"content": json.dumps(questions)}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150},
+    }
+
+
+def generator(monkeypatch, respond) -> AIGenerator:
+    """An AIGenerator whose completions come from respond(call_number, num_questions)."""
+    ai = AIGenerator()
+    ai.api_key = "k" * 32
+    calls = []
+
+    async def post_completion(headers, data, deadline=None):
+        calls.append(data)
+        num_questions = int(data["messages"][-1]["content"].split("Generate ")[1].split()[0])
+        return await respond(len(calls), num_questions)
+
+    monkeypatch.setattr(ai, "_post_completion", post_completion)
+    ai.calls = calls
+    return ai
+
+
+def test_no_top_up_after_upstream_timeout(monkeypatch):
+    monkeypatch.setattr(Config, "GENERATION_SHARD_RETRIES", 3)
+
+    async def respond(call: int, num_questions: int):
+        if call == 1:
+            return completion([question(i) for i in range(6)])
+        raise UpstreamTimeout("AI service timed out")
+
+    ai = generator(monkeypatch, respond)
+    questions = asyncio.run(ai._generate_sharded(config(10), shard_size=5))
+    # The short shard's output is kept, and the timed-out shard is not retried
+    assert len(questions) == 5
+    assert len(ai.calls) == 2
+
+
+def test_split_shards_near_equal():
+    assert _split_shards(20, 5) == [5, 5, 5, 5]
+    assert _split_shards(12, 5) == [4, 4, 4]
+    assert _split_shards(3, 5) == [3]
+
+
+def test_short_shard_topped_up_and_duplicates_across_shards_dropped(monkeypatch):
+    requested = []
+
+    async def respond(call: int, num_questions: int):
+        requested.append(num_questions)
+        if call == 1:
+            return completion([question(i) for i in range(5)])
+        if call == 2:
+            # Repeats two of shard 1's questions (one reworded only in case), then three new ones
+            repeated = dict(question(1), question=question(1)["question"].upper())
+            return completion([question(0), repeated] + [question(i) for i in range(5, 8)])
+        return completion([question(i) for i in range(8, 8 + num_questions)])
+
+    ai = generator(monkeypatch, respond)
+    questions = asyncio.run(ai._generate_sharded(config(10), shard_size=5))
+    stems = [q.question for q in questions]
+    assert len(questions) == 10 and len(set(stems)) == 10
+    # Only the shortfall is requested again
+    assert requested == [5, 5, 2]
+
+
+def test_failed_shard_topped_up(monkeypatch):
+    async def respond(call: int, num_questions: int):
+        if call == 2:
+            return {"choices": []}
+        offset = 0 if call == 1 else 100
+        return completion([question(offset + i) for i in range(num_questions)])
+
+    ai = generator(monkeypatch, respond)
+    questions = asyncio.run(ai._generate_sharded(config(10), shard_size=5))
+    assert len(questions) == 10
+    assert len(ai.calls) == 3
+
+
+def sse(chunks) -> bytes:
+    return "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks).encode() + b"data: [DONE]\n\n"
+
+
+def test_streamed_completion_records_token_usage():
+    content = json.dumps([question(i) for i in range(6)])
+    body = sse(
+        [{"choices": [{"delta": {"content": content[i:i + 40]}}]} for i in range(0, len(content), 40)]
+        + [{"choices": [{"delta": {}, "finish_reason": "stop"}]}]
+        + [{"choices": [], "usage": {"prompt_tokens": 120, "completion_tokens": 480, "total_tokens": 600}}]
+    )
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+    ai = AIGenerator()
+    ai.api_key = "k" * 32
+    ai._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    before = {kind: UPSTREAM_TOKENS.value(kind=kind) for kind in ("prompt", "completion", "max_requested")}
+
+    async def scenario():
+        # More than the output holds, so the stream is read to its final usage chunk
+        questions = [q async for q in ai.stream_questions(config(8))]
+        await ai.shutdown()
+        return questions
+
+    assert len(asyncio.run(scenario())) == 6
+    assert sent[0]["stream_options"] == {"include_usage": True}
+    assert ai.tokens_used == 600
+    assert UPSTREAM_TOKENS.value(kind="prompt") - before["prompt"] == 120
+    assert UPSTREAM_TOKENS.value(kind="completion") - before["completion"] == 480
+    assert UPSTREAM_TOKENS.value(kind="max_requested") - before["max_requested"] == sent[0]["max_tokens"]
@@ -0,0 +1,78 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import models
+from app.compact_session import UNANSWERED, CompactSession
+from app.main import app
+from app.models import Question
+from app.session_manager import session_manager
+
+CONFIG = models.TestConfig(domain="school", class_level=10, subject="Physics", topic="Optics", num_questions=5)
+
+
+def question(i: int) -> Question:
+    options = [f"Answer {i}", "Wrong A", "Wrong B", "Wrong C"]
+    return Question(question=f"Question {i}?", options=options, correct_answer=options[0])
+
+
+QUESTIONS = [question(i) for i in range(4)]
+
+
+def post_all(*requests):
+    """Create a fresh session, then POST each (path, body) to it in order."""
+
+    async def scenario():
+        session_id = await session_manager.create_session(CONFIG, QUESTIONS)
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            responses = [await client.post(f"{path}/{session_id}", json=body) for path, body in requests]
+        return responses, await session_manager.get_session(session_id)
+
+    return asyncio.run(scenario())
+
+
+def test_set_answers_rejects_whole_batch():
+    session = CompactSession.create("s", CONFIG, QUESTIONS)
+    session.set_answers({0: "Answer 0", 2: "Wrong B"})
+    with pytest.raises(ValueError, match=r"\[1, 7\]"):
+        session.set_answers({1: "Not an option", 3: "Answer 3", 7: "Answer 0"})
+    assert list(session.answers) == [0, UNANSWERED, 2, UNANSWERED]
+
+
+def test_answer_batch_saved():
+    (response,), session = post_all(("/answers", {"answers": {"0": "Answer 0", "3": "Wrong A"}}))
+    assert response.status_code == 200
+    assert list(session.answers) == [0, UNANSWERED, UNANSWERED, 1]
+
+
+@pytest.mark.parametrize("answers", [
+    {"0": "Answer 0", "1": "Not an option"},
+    {"0": "Answer 0", "9": "Answer 0"},
+    ["Answer 0", "Answer 1", "Answer 2", "Answer 3", "Answer 0"],
+])
+def test_invalid_answer_batch_leaves_session_unchanged(answers):
+    (saved, rejected), session = post_all(
+        ("/answers", {"answers": {"2": "Answer 2"}}), ("/answers", {"answers": answers})
+    )
+    assert saved.status_code == 200
+    assert rejected.status_code == 400
+    assert list(session.answers) == [UNANSWERED, UNANSWERED, 0, UNANSWERED]
+
+
+def test_submit_grades_answer_vector():
+    (response,), session = post_all(("/submit", {"answers": ["Answer 0", None, "Wrong A", "Answer 3"]}))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["score"] == 2 and body["total"] == 4 and body["percentage"] == 50.0
+    assert [r["is_correct"] for r in body["results"]] == [True, False, False, True]
+    assert session.submitted
+
+
+def test_submit_with_invalid_vector_is_not_submitted():
+    (rejected, retried), session = post_all(
+        ("/submit", {"answers": ["Answer 0", "Not an option"]}), ("/submit", {"answers": ["Answer 0"]})
+    )
+    assert rejected.status_code == 400
+    assert retried.status_code == 200 and retried.json()["score"] == 1
+    assert list(session.answers) == [0, UNANSWERED, UNANSWERED, UNANSWERED]
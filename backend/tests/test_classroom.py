@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+
+from app import main, models
+from app.classroom import RoomManager
+from app.models import Question
+from app.session_manager import SessionManager
+from app.session_store import SQLiteSessionStore
+
+CONFIG = models.TestConfig(domain="school", class_level=10, subject="Physics", topic="Optics", num_questions=5)
+
+
+def questions():
+    return [
+        Question(question=f"Question {i}?", options=[f"Answer {i}", "B", "C", "D"], correct_answer=f"Answer {i}")
+        for i in range(5)
+    ]
+
+
+def join_concurrently(monkeypatch, tmp_path, names, max_students=10):
+    # SQLite runs session writes in the threadpool, so concurrent joins interleave at the await
+    manager = SessionManager(expire_minutes=30, store=SQLiteSessionStore(str(tmp_path / "sessions.sqlite3")))
+    rooms = RoomManager(ttl_seconds=3600, max_rooms=10, max_students=max_students)
+    monkeypatch.setattr(main, "session_manager", manager)
+    monkeypatch.setattr(main, "room_manager", rooms)
+    room = rooms.create(CONFIG, questions())
+
+    async def scenario():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            return await asyncio.gather(
+                *(client.post(f"/rooms/{room.code}/join", json={"name": name}) for name in names)
+            )
+
+    responses = asyncio.run(scenario())
+    return sorted(response.status_code for response in responses), room, manager
+
+
+def test_concurrent_joins_with_same_name(monkeypatch, tmp_path):
+    statuses, room, manager = join_concurrently(monkeypatch, tmp_path, ["Asha", "asha", "ASHA", "Asha"])
+    assert statuses == [200, 409, 409, 409]
+    assert len(room.students) == 1 and room.joining == 0
+    assert manager.store.count() == 1
+
+
+def test_concurrent_joins_for_last_seat(monkeypatch, tmp_path):
+    statuses, room, manager = join_concurrently(monkeypatch, tmp_path, ["A", "B", "C", "D"], max_students=2)
+    assert statuses == [200, 200, 409, 409]
+    assert len(room.students) == 2 and room.joining == 0
+    assert manager.store.count() == 2
+
+
+def test_failed_join_releases_reservation():
+    rooms = RoomManager(ttl_seconds=3600, max_rooms=10, max_students=1)
+    room = rooms.create(CONFIG, questions())
+    rooms.reserve(room, "Asha")
+    rooms.release(room, "Asha")
+    rooms.reserve(room, "asha")
+    rooms.add_student(room, "session", "asha")
+    assert room.students == {"session": "asha"} and room.joining == 0
@@ -0,0 +1,48 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from app.compression import GzipJSONMiddleware
+from app.metrics import Histogram, RequestLatencyMiddleware
+from app.serialization import etag_matches
+
+ETAG = '"v1"'
+
+
+def gzip_app(histogram: Histogram) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str, request: Request):
+        if etag_matches(request.headers.get("if-none-match"), ETAG):
+            return Response(status_code=304, headers={"ETag": ETAG})
+        return JSONResponse({"id": item_id, "padding": "x" * 2000}, headers={"ETag": ETAG})
+
+    app.add_middleware(GzipJSONMiddleware, minimum_size=100)
+    app.add_middleware(RequestLatencyMiddleware, histogram=histogram)
+    return app
+
+
+def test_gzip_responses_and_revalidation_keep_route_label():
+    histogram = Histogram("test_gzip_seconds", "test", ["method", "route", "status"])
+    app = gzip_app(histogram)
+
+    async def scenario():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            full = await client.get("/items/1", headers={"Accept-Encoding": "gzip"})
+            revalidated = await client.get(
+                "/items/1", headers={"Accept-Encoding": "gzip", "If-None-Match": full.headers["etag"]}
+            )
+            return full, revalidated
+
+    full, revalidated = asyncio.run(scenario())
+    assert full.headers["content-encoding"] == "gzip"
+    assert full.headers["etag"] == '"v1-gzip"'
+    assert full.json()["id"] == "1"
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == '"v1-gzip"'
+    assert histogram.count(method="GET", route="/items/{item_id}", status="200") == 1
+    assert histogram.count(method="GET", route="/items/{item_id}", status="304") == 1
+    assert histogram.count(method="GET", route="unmatched", status="304") == 0
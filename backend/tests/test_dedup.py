@@ -0,0 +1,34 @@
+from app.dedup import DuplicateIndex
+from app.models import Question
+
+
+def question(stem: str, options) -> Question:
+    return Question(question=stem, options=list(options), correct_answer=options[0])
+
+
+def test_generic_stem_with_different_options_is_kept():
+    index = DuplicateIndex(threshold=0.7)
+    stem = "Which of the following statements is correct?"
+    biology = ["Mitochondria make ATP", "Ribosomes store DNA", "Nuclei digest food", "Golgi emit light"]
+    physics = ["Force is mass times acceleration", "Velocity is scalar", "Work has no unit", "Heat is a vector"]
+    assert index.add(question(stem, biology)) is None
+    assert index.add(question(stem, physics)) is None
+
+
+def test_exact_duplicate_ignores_case_punctuation_and_option_order():
+    index = DuplicateIndex(threshold=0.7)
+    index.add(question("What is the SI unit of force?", ["Newton", "Joule", "Watt", "Pascal"]))
+    assert index.add(question("what is the SI unit of FORCE", ["Pascal", "Watt", "Joule", "Newton"])) == "exact"
+
+
+def test_same_options_different_question_is_kept():
+    index = DuplicateIndex(threshold=0.7)
+    index.add(question("What is the SI unit of force?", ["Newton", "Joule", "Watt", "Pascal"]))
+    assert index.add(question("What is the SI unit of energy?", ["Newton", "Joule", "Watt", "Pascal"])) is None
+
+
+def test_reworded_question_is_near_duplicate():
+    index = DuplicateIndex(threshold=0.7)
+    options = ["Mitochondria", "Ribosome", "Golgi body", "Lysosome"]
+    index.add(question("Which organelle is known as the powerhouse of the cell?", options))
+    assert index.add(question("Which organelle is called the powerhouse of a cell?", options)) == "near"
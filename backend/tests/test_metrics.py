@@ -0,0 +1,56 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from app.metrics import Histogram, RequestLatencyMiddleware
+
+
+def streaming_app(histogram: Histogram) -> FastAPI:
+    app = FastAPI()
+
+    async def chunks():
+        for _ in range(3):
+            await asyncio.sleep(0.05)
+            yield b"chunk\n"
+
+    @app.get("/stream/{session_id}")
+    async def stream(session_id: str):
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/fail")
+    async def fail():
+        raise RuntimeError("boom")
+
+    app.add_middleware(RequestLatencyMiddleware, histogram=histogram)
+    return app
+
+
+def test_streamed_response_timed_until_last_chunk_by_route():
+    histogram = Histogram("test_latency_seconds", "test", ["method", "route", "status"], buckets=(0.1, 1.0))
+    app = streaming_app(histogram)
+
+    async def scenario():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/stream/abc")
+            assert response.text == "chunk\n" * 3
+
+    asyncio.run(scenario())
+    assert histogram.count(method="GET", route="/stream/{session_id}", status="200") == 1
+    total = next(line for line in histogram.samples() if line.startswith("test_latency_seconds_sum"))
+    # Three 50ms chunks: the body, not just the headers, is inside the timing
+    assert float(total.split()[-1]) >= 0.15
+
+
+def test_unhandled_error_recorded_as_500():
+    histogram = Histogram("test_errors_seconds", "test", ["method", "route", "status"])
+    app = streaming_app(histogram)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/fail")
+
+    assert asyncio.run(scenario()).status_code == 500
+    assert histogram.count(method="GET", route="/fail", status="500") == 1
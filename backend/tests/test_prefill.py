@@ -0,0 +1,93 @@
+import asyncio
+
+from app import models
+from app.admission import AdmissionController
+from app.config import Config
+from app.prompt_compiler import PromptCompiler
+from app.prefill import PrefillWorker
+
+
+def config(topic: str) -> models.TestConfig:
+    return models.TestConfig(domain="school", class_level=10, subject="Physics", topic=topic, num_questions=10)
+
+
+def test_demand_not_recorded_unless_running():
+    worker = PrefillWorker(generator=None, cache=None, admission=None)
+    for i in range(20):
+        worker.record_request(config(f"Topic {i}"))
+    assert worker.stats()["tracked_configs"] == 0
+
+
+def test_tracked_configs_are_capped(monkeypatch):
+    monkeypatch.setattr(Config, "PREFILL_MAX_TRACKED_CONFIGS", 3)
+    worker = PrefillWorker(generator=None, cache=None, admission=None)
+    worker.running = True
+    for _ in range(5):
+        worker.record_request(config("Optics"))
+    for i in range(200):
+        worker.record_request(config(f"Topic {i}"))
+    assert worker.stats()["tracked_configs"] == 3
+    # The popular config survives the churn of one-off topics
+    assert worker.top_configs()[0].topic == "Optics"
+
+
+class FakeGenerator:
+    """Charges 1000 tokens per prefill call, while client traffic adds to the shared total meanwhile."""
+
+    def __init__(self):
+        self.tokens_used = 0
+        self.calls = 0
+        self.prompts = PromptCompiler()
+
+    async def generate_questions(self, config, usage=None):
+        self.calls += 1
+        self.tokens_used += 50_000
+        usage.add({"total_tokens": 1000})
+        self.tokens_used += 1000
+        return []
+
+
+class FakeCache:
+    async def pool_size(self, config) -> int:
+        return 0
+
+    async def put(self, config, questions):
+        pass
+
+
+def admission(max_concurrent: int = 2) -> AdmissionController:
+    return AdmissionController(
+        max_concurrent=max_concurrent, max_queue=10, per_client_queue=5, rate_per_second=0, burst=1,
+        max_wait_seconds=1.0
+    )
+
+
+def test_budget_counts_only_prefill_tokens(monkeypatch):
+    monkeypatch.setattr(Config, "PREFILL_TOKEN_BUDGET_PER_HOUR", 10_000)
+    monkeypatch.setattr(Config, "PREFILL_MAX_CALLS_PER_MINUTE", 100)
+    generator = FakeGenerator()
+    worker = PrefillWorker(generator, FakeCache(), admission())
+    worker.running = True
+    for i in range(5):
+        worker.record_request(config(f"Topic {i}"))
+    assert asyncio.run(worker.refill_once()) == 5
+    assert generator.calls == 5 and worker.admission.in_flight == 0
+
+
+def test_prefill_yields_to_client_requests():
+    generator = FakeGenerator()
+    limiter = admission(max_concurrent=2)
+    worker = PrefillWorker(generator, FakeCache(), limiter)
+    worker.running = True
+    worker.record_request(config("Optics"))
+
+    async def scenario() -> int:
+        await limiter.acquire("student")
+        try:
+            return await worker.refill_once()
+        finally:
+            limiter.release()
+
+    # One of two slots is busy: the other stays free for clients
+    assert asyncio.run(scenario()) == 0
+    assert generator.calls == 0
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from app import models
+from app.models import Question
+from app.question_bank import HEADER, QuestionBank, write_bank
+from app.question_cache import cache_key
+
+CONFIG = models.TestConfig(domain="school", class_level=10, subject="Physics", topic="Optics", num_questions=5)
+OTHER = models.TestConfig(domain="school", class_level=9, subject="Science", topic="Sound", num_questions=5)
+
+
+def question(i: int, topic: str = "Optics") -> Question:
+    options = [f"{topic} answer {i}", "Wrong A", "Wrong B", "Wrong C"]
+    return Question(question=f"{topic} question {i}?", options=options, correct_answer=options[0])
+
+
+def opened(path) -> QuestionBank:
+    bank = QuestionBank(str(path))
+    assert bank.open()
+    return bank
+
+
+def test_write_open_sample_round_trip(tmp_path):
+    path = tmp_path / "bank.smqb"
+    pool = [question(i) for i in range(8)]
+    write_bank(str(path), {cache_key(CONFIG): pool, cache_key(OTHER): [question(0, "Sound")] * 3})
+    bank = opened(path)
+
+    assert bank.stats()["topics"] == 2 and bank.question_count == 11
+    assert bank.coverage(CONFIG) == 8
+    sample = bank.sample(CONFIG)
+    assert len(sample) == 5 and len({q.question for q in sample}) == 5
+    by_stem = {q.question: q for q in pool}
+    for q in sample:
+        original = by_stem[q.question]
+        assert sorted(q.options) == sorted(original.options) and q.correct_answer == original.correct_answer
+    # A pool smaller than the test is not served
+    assert bank.sample(OTHER) is None
+    assert dict(bank.pools())[cache_key(CONFIG)] == pool
+    bank.close()
+
+
+def test_rewrite_replaces_file_atomically(tmp_path):
+    path = tmp_path / "bank.smqb"
+    write_bank(str(path), {cache_key(CONFIG): [question(i) for i in range(5)]})
+    old = opened(path)
+
+    write_bank(str(path), {cache_key(OTHER): [question(i, "Sound") for i in range(6)]})
+    assert os.listdir(tmp_path) == ["bank.smqb"]
+    # The existing mapping keeps reading the file it opened; a reopen sees the new one
+    assert {q.question for q in old.sample(CONFIG)} == {f"Optics question {i}?" for i in range(5)}
+    new = opened(path)
+    assert new.coverage(CONFIG) == 0 and new.coverage(OTHER) == 6
+    old.close()
+    new.close()
+
+
+def corrupt(data: bytes, how: str) -> bytes:
+    if how == "truncated":
+        return data[:-7]
+    if how == "header only":
+        return data[:HEADER.size - 1]
+    if how == "bad magic":
+        return b"XXXX" + data[4:]
+    # Key directory claims more questions than the index holds
+    magic, version, keys, questions, keys_offset, index_offset = HEADER.unpack_from(data)
+    return HEADER.pack(magic, version, keys, questions + 100, keys_offset, index_offset) + data[HEADER.size:]
+
+
+@pytest.mark.parametrize("how", ["truncated", "header only", "bad magic", "question count"])
+def test_corrupt_bank_rejected(tmp_path, how):
+    path = tmp_path / "bank.smqb"
+    write_bank(str(path), {cache_key(CONFIG): [question(i) for i in range(5)]})
+    path.write_bytes(corrupt(path.read_bytes(), how))
+
+    bank = QuestionBank(str(path))
+    assert bank.open() is False
+    assert not bank.enabled and bank.sample(CONFIG) is None
+
+
+def test_missing_bank_disabled(tmp_path):
+    bank = QuestionBank(str(tmp_path / "absent.smqb"))
+    assert bank.open() is False and bank.coverage(CONFIG) == 0
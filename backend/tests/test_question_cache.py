@@ -0,0 +1,61 @@
+import asyncio
+
+from app import models
+from app.models import Question
+from app.question_cache import InMemoryQuestionCache, QuestionCache, SQLiteQuestionCache, cache_key
+
+
+def config(topic: str = "Optics", num_questions: int = 5) -> models.TestConfig:
+    return models.TestConfig(
+        domain="school", class_level=10, subject="Physics", topic=topic, num_questions=num_questions
+    )
+
+
+def questions(count: int, topic: str = "optics"):
+    return [
+        Question(
+            question=f"{topic} question {i}: which value {'ab' * i} is right?",
+            options=[f"Answer {i}", f"Wrong {i}a", f"Wrong {i}b", f"Wrong {i}c"],
+            correct_answer=f"Answer {i}",
+        )
+        for i in range(count)
+    ]
+
+
+def test_pool_needs_headroom_before_it_is_served():
+    cache = QuestionCache(InMemoryQuestionCache(10, 3600), min_pool_factor=2.0)
+
+    async def scenario():
+        await cache.put(config(), questions(5))
+        exact = await cache.get(config())
+        await cache.put(config(), questions(10)[5:])
+        with_headroom = await cache.get(config())
+        return exact, with_headroom
+
+    exact, with_headroom = asyncio.run(scenario())
+    # Exactly num_questions would serve the same test to everyone, only reordered
+    assert exact is None
+    assert len(with_headroom) == 5
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1
+
+
+def test_sqlite_reads_do_not_write_and_hits_still_count_for_eviction(tmp_path):
+    backend = SQLiteQuestionCache(str(tmp_path / "cache.sqlite3"), max_entries=2, ttl_seconds=3600)
+    cache = QuestionCache(backend, min_pool_factor=1.0)
+
+    def accessed_at(key: str) -> float:
+        return backend._conn.execute("SELECT accessed_at FROM question_pools WHERE key = ?", (key,)).fetchone()[0]
+
+    async def scenario():
+        await cache.put(config("Optics"), questions(5, "optics"))
+        await cache.put(config("Waves"), questions(5, "waves"))
+        stored = accessed_at(cache_key(config("Optics")))
+        assert await cache.get(config("Optics")) is not None
+        assert accessed_at(cache_key(config("Optics"))) == stored
+        # The next write flushes the hit, so the least recently used pool (Waves) is evicted
+        await cache.put(config("Magnetism"), questions(5, "magnetism"))
+        return await cache.get(config("Optics")), await cache.get(config("Waves"))
+
+    optics, waves = asyncio.run(scenario())
+    assert optics is not None and waves is None
+    assert len(backend) == 2
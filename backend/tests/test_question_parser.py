@@ -0,0 +1,56 @@
+import json
+
+from app.ai_generator import QuestionStreamParser
+
+
+def question(stem: str) -> dict:
+    return {"question": stem, "options": ["A", "B", "C", "D"], "correct_answer": "A"}
+
+
+def parse_in_chunks(text: str, size: int):
+    parser = QuestionStreamParser()
+    parsed = []
+    for i in range(0, len(text), size):
+        parsed += parser.feed(text[i:i + size])
+    return parsed + parser.close(), parser
+
+
+def test_truncated_output_keeps_complete_questions():
+    text = json.dumps([question("Q1?"), question("Q2?"), question("Q3?")])
+    parser = QuestionStreamParser()
+    parsed = parser.feed(text[:-30])
+    assert [q["question"] for q in parsed] == ["Q1?", "Q2?"]
+    assert parser.close() == []
+    assert parser.malformed == 1
+
+
+def test_chunk_boundaries_do_not_lose_questions():
+    text = json.dumps([question(f"Q{i}?") for i in range(5)])
+    for size in (1, 3, 7, 64):
+        parsed, parser = parse_in_chunks(text, size)
+        assert [q["question"] for q in parsed] == [f"Q{i}?" for i in range(5)]
+        assert parser.malformed == 0
+
+
+def test_malformed_object_mid_array_is_skipped_without_waiting_for_close():
+    broken = '{"question": "Q2?", "options": ["A" "B"], "correct_answer": "A"}'
+    text = f"[{json.dumps(question('Q1?'))}, {broken}, {json.dumps(question('Q3?'))}]"
+    parser = QuestionStreamParser()
+    assert [q["question"] for q in parser.feed(text)] == ["Q1?", "Q3?"]
+    assert parser.malformed == 1
+
+
+def test_code_fences_and_wrapper_object():
+    text = "Here you go:\n```json\n" + json.dumps({"questions": [question("Q1?"), question("Q2?")]}) + "\n```"
+    parsed, parser = parse_in_chunks(text, 10)
+    assert [q["question"] for q in parsed] == ["Q1?", "Q2?"]
+    assert parser.objects == 2
+
+
+def test_quotes_and_braces_inside_strings():
+    stems = ['What does print(f"{x}") output?', 'Which is valid: "}{" or "{}"?']
+    text = json.dumps([question(stem) for stem in stems])
+    for size in (1, 4, 1000):
+        parsed, parser = parse_in_chunks(text, size)
+        assert [q["question"] for q in parsed] == stems
+        assert parser.malformed == 0
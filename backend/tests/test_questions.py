@@ -0,0 +1,128 @@
+import asyncio
+
+import httpx
+
+from app.config import Config
+from app.main import app
+from app import models
+from app.models import Question
+from app.session_manager import session_manager
+
+CONFIG = models.TestConfig(domain="school", class_level=10, subject="Physics", topic="Optics", num_questions=10)
+
+
+def question(i: int) -> Question:
+    options = [f"Answer {i}", "Wrong A", "Wrong B", "Wrong C"]
+    return Question(question=f"Question {i}?", options=options, correct_answer=options[0])
+
+
+async def get(path: str) -> httpx.Response:
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        return await client.get(path)
+
+
+def test_open_range_waits_for_streaming_questions(monkeypatch):
+    monkeypatch.setattr(Config, "STREAM_QUESTION_WAIT_SECONDS", 2.0)
+
+    async def scenario() -> httpx.Response:
+        session_id = await session_manager.create_session(CONFIG, [question(0)], generating=True)
+
+        async def stream_more():
+            await asyncio.sleep(0.05)
+            await session_manager.append_questions(session_id, [question(1), question(2)])
+
+        producer = asyncio.create_task(stream_more())
+        response = await get(f"/questions/{session_id}?range=1-")
+        await producer
+        return response
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    body = response.json()
+    assert body["generating"] is True
+    assert body["total_questions"] == 10
+    assert [q["question_index"] for q in body["questions"]] == [1, 2]
+
+
+def test_open_range_past_short_stream_reports_total(monkeypatch):
+    monkeypatch.setattr(Config, "STREAM_QUESTION_WAIT_SECONDS", 0.05)
+
+    async def scenario():
+        session_id = await session_manager.create_session(CONFIG, [question(0)], generating=True)
+        still_generating = await get(f"/questions/{session_id}?range=1-")
+        await session_manager.append_questions(session_id, [question(i) for i in range(1, 8)])
+        await session_manager.finish_generation(session_id)
+        finished = await get(f"/questions/{session_id}?range=8-")
+        invalid = await get(f"/questions/{session_id}?range=3-1")
+        return still_generating, finished, invalid
+
+    still_generating, finished, invalid = asyncio.run(scenario())
+    assert still_generating.status_code == 200
+    assert still_generating.json()["questions"] == []
+    assert still_generating.json()["generating"] is True
+    assert finished.status_code == 200
+    assert finished.json() == {
+        "session_id": finished.json()["session_id"], "total_questions": 8, "generating": False, "questions": []
+    }
+    assert invalid.status_code == 400
+
+
+def test_streamed_generation_fills_session_in_background(monkeypatch):
+    from app import main
+
+    async def fake_stream(config):
+        for i in range(6):
+            await asyncio.sleep(0.01)
+            yield question(i)
+
+    monkeypatch.setattr(main.ai_generator, "stream_questions", fake_stream)
+    monkeypatch.setattr(main.question_cache, "backend", None)
+    monkeypatch.setattr(Config, "STREAM_QUESTION_WAIT_SECONDS", 2.0)
+
+    async def scenario():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            started = await client.post("/generate-test?stream=true", json=CONFIG.model_dump())
+            session_id = started.json()["session_id"]
+            last = await client.get(f"/question/{session_id}/5")
+            await asyncio.gather(*main._background_tasks)
+            summary = await client.get(f"/test-summary/{session_id}")
+        return started, last, summary
+
+    started, last, summary = asyncio.run(scenario())
+    assert started.status_code == 200 and started.json()["streaming"] is True
+    assert last.status_code == 200 and last.json()["question_index"] == 5
+    assert summary.json()["generating"] is False
+    assert summary.json()["num_questions"] == 6
+
+
+def test_short_stream_topped_up_to_requested_count(monkeypatch):
+    from app import main
+
+    async def short_stream(config):
+        for i in range(6):
+            yield question(i)
+
+    top_ups = []
+
+    async def generate_questions(config, usage=None):
+        top_ups.append(config.num_questions)
+        # One repeat of a streamed question is dropped, the rest fill the gap
+        return [question(3)] + [question(i) for i in range(100, 100 + config.num_questions)]
+
+    monkeypatch.setattr(main.ai_generator, "stream_questions", short_stream)
+    monkeypatch.setattr(main.ai_generator, "generate_questions", generate_questions)
+    monkeypatch.setattr(main.question_cache, "backend", None)
+    config = models.TestConfig(domain="school", class_level=9, subject="Science", topic="Sound", num_questions=10)
+
+    async def scenario():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            started = await client.post("/generate-test?stream=true", json=config.model_dump())
+            session_id = started.json()["session_id"]
+            await asyncio.gather(*main._background_tasks)
+            return await client.get(f"/questions/{session_id}")
+
+    body = asyncio.run(scenario()).json()
+    assert top_ups == [5]
+    assert body["generating"] is False and body["total_questions"] == 10
+    stems = [q["question"] for q in body["questions"]]
+    assert len(set(stems)) == 10
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+
+from app import models, session_manager as session_manager_module
+from app.models import Question
+from app.session_manager import SessionManager
+from app.session_store import InMemorySessionStore, SQLiteSessionStore
+
+CONFIG = models.TestConfig(domain="school", class_level=10, subject="Physics", topic="Optics", num_questions=5)
+QUESTIONS = [
+    Question(question=f"Question {i}?", options=[f"Answer {i}", "B", "C", "D"], correct_answer=f"Answer {i}")
+    for i in range(5)
+]
+
+
+class Clock:
+    """Stands in for the time module in session_manager, advanced by hand."""
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def time(self) -> float:
+        return time.time() + self.offset
+
+    def monotonic(self) -> float:
+        return time.monotonic() + self.offset
+
+
+def manager(monkeypatch, **overrides) -> SessionManager:
+    clock = Clock()
+    monkeypatch.setattr(session_manager_module, "time", clock)
+    settings = dict(expire_minutes=30, store=InMemorySessionStore())
+    settings.update(overrides)
+    sessions = SessionManager(**settings)
+    sessions.clock = clock
+    return sessions
+
+
+def test_sessions_expire_after_ttl(monkeypatch):
+    sessions = manager(monkeypatch)
+
+    async def scenario():
+        old = await sessions.create_session(CONFIG, QUESTIONS)
+        young = await sessions.create_session(CONFIG, QUESTIONS)
+        sessions.store.sessions[old].created_at -= 20 * 60
+        sessions.clock.offset = 11 * 60
+        assert await sessions.get_session(old) is None
+        assert await sessions.get_session(young) is not None
+        # The background sweep drops expired sessions nobody asks for
+        assert sessions.store.count() == 1
+        sessions.clock.offset = 31 * 60
+        return await sessions._cleanup_old_sessions(force=True)
+
+    assert asyncio.run(scenario()) == 1
+    assert sessions.store.count() == 0
+
+
+def test_oldest_sessions_evicted_past_cap(monkeypatch):
+    sessions = manager(monkeypatch, max_sessions=3)
+
+    async def scenario():
+        return [await sessions.create_session(CONFIG, QUESTIONS) for _ in range(5)]
+
+    created = asyncio.run(scenario())
+    assert sessions.store.count() == 3
+    assert list(sessions.store.sessions) == created[2:]
+
+
+def test_count_refreshes_gauge_from_threadpool(monkeypatch, tmp_path):
+    sessions = manager(monkeypatch, store=SQLiteSessionStore(str(tmp_path / "sessions.db")))
+    threads = []
+    count = sessions.store.count
+    monkeypatch.setattr(sessions.store, "count", lambda: threads.append(threading.current_thread()) or count())
+
+    async def scenario():
+        await sessions.create_session(CONFIG, QUESTIONS)
+        return await sessions.count()
+
+    assert asyncio.run(scenario()) == 1
+    assert sessions.active == 1
+    assert threads and threading.main_thread() not in threads
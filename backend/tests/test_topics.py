@@ -0,0 +1,97 @@
+from app.topics import TopicIndex
+
+SCOPE = "school|physics"
+
+
+def index(**overrides) -> TopicIndex:
+    settings = dict(threshold=0.6, max_topics=100, min_generations=1)
+    settings.update(overrides)
+    return TopicIndex(**settings)
+
+
+def test_word_order_plurals_and_filler_match():
+    topics = index()
+    assert topics.match(SCOPE, "Laws of Motion (Newton)") == "Laws of Motion (Newton)"
+    topics.add(SCOPE, "Laws of Motion (Newton)")
+    assert topics.match(SCOPE, "newtons law of motion") == "Laws of Motion (Newton)"
+
+
+def test_same_words_match_after_one_generation():
+    # Exact word-set matches skip the min_generations bar that typo matches face
+    topics = index(min_generations=3)
+    topics.add(SCOPE, "Laws of Motion (Newton)")
+    assert topics.match(SCOPE, "Newton's Laws of Motion") == "Laws of Motion (Newton)"
+    assert topics.match(SCOPE, "newtons law of motion") == "Laws of Motion (Newton)"
+    topics.add(SCOPE, "Newton's laws")
+    assert topics.match(SCOPE, "Newtons Law") == "Newton's laws"
+
+
+def test_shorter_topic_stays_separate():
+    # "Newton's laws" has no "motion": only known word sets are merged, never a subset
+    topics = index()
+    topics.add(SCOPE, "Laws of Motion (Newton)")
+    assert topics.match(SCOPE, "Newton's laws") == "Newton's laws"
+
+
+def test_misspelling_matches():
+    topics = index()
+    topics.add(SCOPE, "Thermodynamics")
+    assert topics.match(SCOPE, "Thermodynamcs") == "Thermodynamics"
+
+
+def test_lookups_do_not_learn():
+    topics = index()
+    topics.match(SCOPE, "Thermodynamics")
+    assert topics.stats()["topics"] == 0
+    assert topics.match(SCOPE, "Thermodynamcs") == "Thermodynamcs"
+
+
+def test_learned_typo_does_not_replace_correct_spelling():
+    topics = index(min_generations=3)
+    topics.add(SCOPE, "Thermodynamcs")
+    assert topics.match(SCOPE, "Thermodynamics") == "Thermodynamics"
+    # Once the correct spelling is known it is used as typed, and becomes the typo target when proven
+    for _ in range(3):
+        topics.add(SCOPE, "Thermodynamics")
+    assert topics.match(SCOPE, "Thermodynamics") == "Thermodynamics"
+    assert topics.match(SCOPE, "Thermodynmics") == "Thermodynamics"
+
+
+def test_seeded_topics_are_trusted_and_kept():
+    topics = index(max_topics=1, min_generations=3)
+    topics.seed(["school|10|physics|thermodynamics"])
+    topics.add(SCOPE, "Optics")
+    topics.add(SCOPE, "Magnetism")
+    assert topics.match(SCOPE, "Thermodynamcs") == "thermodynamics"
+    assert topics.stats()["topics"] == 2
+
+
+def test_narrower_or_broader_chapters_stay_distinct():
+    topics = index()
+    for broad, narrow in [
+        ("Acids, Bases and Salts", "Acids and Bases"),
+        ("Work, Energy and Power", "Work and Energy"),
+        ("Electric Charges and Fields", "Electric Charges"),
+    ]:
+        topics.add(SCOPE, narrow)
+        assert topics.match(SCOPE, broad) == broad
+        topics.add(SCOPE, broad)
+        assert topics.match(SCOPE, narrow) == narrow
+
+
+def test_look_alike_topics_stay_distinct():
+    topics = index()
+    topics.add("school|chemistry", "Organic Chemistry")
+    assert topics.match("school|chemistry", "Inorganic Chemistry") == "Inorganic Chemistry"
+
+
+def test_learned_topics_are_capped_least_recently_used_first():
+    topics = index(max_topics=2)
+    topics.add("school|subject 0", "Optics")
+    topics.add("school|subject 1", "Optics")
+    # A lookup keeps subject 0's topic fresh, so subject 1's is evicted (with its scope)
+    assert topics.match("school|subject 0", "optics") == "Optics"
+    topics.add("school|subject 2", "Optics")
+    assert topics.stats()["topics"] == 2 and topics.stats()["scopes"] == 2
+    assert topics.match("school|subject 1", "optics") == "optics"
+    assert topics.match("school|subject 0", "optics") == "Optics"
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+
+from app.config import Config
+from app.upstream_policy import CircuitBreaker, RetryableUpstreamError, UpstreamPolicy, UpstreamTimeout
+
+
+def test_half_open_breaker_admits_a_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    assert breaker.acquire()
+    assert not breaker.acquire() and not breaker.allow()
+    breaker.record_success()
+    breaker.release()
+    assert breaker.state == "closed"
+    assert breaker.acquire() and breaker.acquire()
+
+
+def test_concurrent_callers_after_cooldown_send_one_probe(monkeypatch):
+    monkeypatch.setattr(Config, "UPSTREAM_MAX_RETRIES", 0)
+    monkeypatch.setattr(Config, "UPSTREAM_HEDGE_ENABLED", False)
+    policy = UpstreamPolicy(["model"])
+    policy.breakers["model"] = CircuitBreaker(failure_threshold=1, cooldown_seconds=0)
+    policy.breakers["model"].record_failure()
+    sent = []
+
+    async def attempt(model: str) -> str:
+        sent.append(model)
+        await asyncio.sleep(0.01)
+        raise RetryableUpstreamError("503")
+
+    async def scenario():
+        return await asyncio.gather(*(policy.execute(attempt) for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert len(sent) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_hedges_to_same_model_without_fallbacks(monkeypatch):
+    monkeypatch.setattr(Config, "UPSTREAM_HEDGE_ENABLED", True)
+    monkeypatch.setattr(Config, "UPSTREAM_HEDGE_DELAY_SECONDS", 0.01)
+    policy = UpstreamPolicy(["model"])
+    calls = []
+
+    async def attempt(model: str) -> int:
+        calls.append(model)
+        # The first request stalls; the hedge answers quickly
+        await asyncio.sleep(1.0 if len(calls) == 1 else 0)
+        return len(calls)
+
+    assert asyncio.run(policy.execute(attempt)) == 2
+    assert calls == ["model", "model"]
+    assert policy.hedges_fired == 1 and policy.hedges_won == 1
+
+
+def test_hanging_upstream_fails_at_total_deadline(monkeypatch):
+    monkeypatch.setattr(Config, "UPSTREAM_TOTAL_TIMEOUT_SECONDS", 0.3)
+    monkeypatch.setattr(Config, "UPSTREAM_ATTEMPT_TIMEOUT_SECONDS", 0.2)
+    monkeypatch.setattr(Config, "UPSTREAM_HEDGE_DELAY_SECONDS", 0.05)
+    monkeypatch.setattr(Config, "UPSTREAM_BACKOFF_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(Config, "UPSTREAM_MAX_RETRIES", 5)
+    policy = UpstreamPolicy(["model"])
+    calls = []
+
+    async def attempt(model: str):
+        calls.append(model)
+        await asyncio.sleep(10)
+
+    async def scenario() -> float:
+        started = time.monotonic()
+        with pytest.raises(UpstreamTimeout):
+            await policy.execute(attempt)
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 0.45
+    # Attempts cut short by the deadline do not count against the breaker
+    assert policy.breakers["model"].failures <= len(calls) <= 4
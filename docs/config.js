@@ -16,8 +16,9 @@ document.addEventListener('DOMContentLoaded', function() {
     const loadingDiv = document.getElementById('loading');
     const errorDiv = document.getElementById('error');
     
-    // Backend API URL
-    const API_BASE_URL = 'https://studmaster.onrender.com';
+    // Backend API URL (same origin when the page is served by the backend itself)
+    const apiMeta = document.querySelector('meta[name="studmaster-api"]');
+    const API_BASE_URL = apiMeta ? apiMeta.content : 'https://studmaster.onrender.com';
     
     // Update question count display
     numQuestionsSlider.addEventListener('input', function() {
@@ -61,7 +62,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         try {
             // Send request to backend
-            const response = await fetch(`${API_BASE_URL}/generate-test`, {
+            const response = await fetch(`${API_BASE_URL}/generate-test?stream=true`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -72,7 +73,7 @@ document.addEventListener('DOMContentLoaded', function() {
             const data = await response.json();
             
             if (!response.ok) {
-                throw new Error(data.detail || 'Failed to generate test');
+                throw new Error(formatErrorDetail(data.detail) || 'Failed to generate test');
             }
             
             // Store session ID and redirect to test page
@@ -106,7 +107,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         try {
             // Send request to backend
-            const response = await fetch(`${API_BASE_URL}/generate-test`, {
+            const response = await fetch(`${API_BASE_URL}/generate-test?stream=true`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -117,7 +118,7 @@ document.addEventListener('DOMContentLoaded', function() {
             const data = await response.json();
             
             if (!response.ok) {
-                throw new Error(data.detail || 'Failed to generate test');
+                throw new Error(formatErrorDetail(data.detail) || 'Failed to generate test');
             }
             
             // Store session ID and redirect to test page
@@ -207,6 +208,11 @@ document.addEventListener('DOMContentLoaded', function() {
                 examSelect.appendChild(option);
             });
             
+            // Question cap is configurable on the backend
+            if (data.max_questions) {
+                numQuestionsSlider.max = data.max_questions;
+            }
+            
         } catch (error) {
             console.error('Failed to load config options:', error);
         }
@@ -264,8 +270,9 @@ document.addEventListener('DOMContentLoaded', function() {
             return false;
         }
         
-        if (formData.num_questions < 5 || formData.num_questions > 20) {
-            showError('Number of questions must be between 5 and 20');
+        const maxQuestions = parseInt(numQuestionsSlider.max) || 20;
+        if (formData.num_questions < 5 || formData.num_questions > maxQuestions) {
+            showError(`Number of questions must be between 5 and ${maxQuestions}`);
             return false;
         }
         
@@ -273,6 +280,14 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     // Function to show error message
+    // Validation errors arrive as a list of {loc, msg}; other errors as a string
+    function formatErrorDetail(detail) {
+        if (Array.isArray(detail)) {
+            return detail.map(err => err.msg).join('; ');
+        }
+        return detail;
+    }
+    
     function showError(message) {
         errorDiv.textContent = message;
         errorDiv.style.display = 'block';
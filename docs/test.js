@@ -35,8 +35,9 @@ document.addEventListener('DOMContentLoaded', function() {
         timerInterval: null
     };
     
-    // Backend API URL
-    const API_BASE_URL = 'https://studmaster.onrender.com';
+    // Backend API URL (same origin when the page is served by the backend itself)
+    const apiMeta = document.querySelector('meta[name="studmaster-api"]');
+    const API_BASE_URL = apiMeta ? apiMeta.content : 'https://studmaster.onrender.com';
     
     // Initialize test
     initTest();
@@ -96,13 +97,10 @@ document.addEventListener('DOMContentLoaded', function() {
             testState.totalQuestions = summary.num_questions;
             testState.userAnswers = new Array(summary.num_questions).fill(null);
             
-            // FIX: Pre-load all questions to ensure we have access to all option texts
-            await preloadAllQuestions();
-            
             // Display test info
             displayTestInfo();
             
-            // Load first question
+            // Load first question (the rest may still be streaming in on the server)
             await loadQuestion(0);
             
             // Start timer
@@ -111,6 +109,9 @@ document.addEventListener('DOMContentLoaded', function() {
             // Create question indicators
             createQuestionIndicators();
             
+            // FIX: Pre-load remaining questions in the background to have access to all option texts
+            preloadAllQuestions();
+            
         } catch (error) {
             console.error('Error in initTest:', error);
             alert(`Error: ${error.message}`);
@@ -118,41 +119,96 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
-    // FIX: New function to pre-load all questions at startup
+    // FIX: New function to pre-load all questions at startup (one bulk request instead of one per question)
     async function preloadAllQuestions() {
         console.log('Pre-loading all questions...');
         
-        for (let i = 0; i < testState.totalQuestions; i++) {
-            try {
+        try {
+            while (true) {
+                const firstMissing = findFirstMissingQuestion();
+                if (firstMissing === -1) {
+                    break;
+                }
+                
                 const response = await fetch(
-                    `${API_BASE_URL}/question/${testState.sessionId}/${i}`
+                    `${API_BASE_URL}/questions/${testState.sessionId}?range=${firstMissing}-`
                 );
+                if (!response.ok) {
+                    break;
+                }
+                
+                const data = await response.json();
+                data.questions.forEach(storeQuestion);
+                updateTotalQuestions(data.total_questions);
+                
+                if (!data.generating) {
+                    break;
+                }
                 
-                if (response.ok) {
-                    const data = await response.json();
-                    testState.questions[i] = {
-                        question: data.question,
-                        options: data.options,
-                        correct_answer: data.correct_answer
-                    };
-                    
-                    // Convert user answer from backend to letter format for state management
-                    if (data.user_answer) {
-                        const optionIndex = data.options.indexOf(data.user_answer);
-                        if (optionIndex !== -1) {
-                            testState.userAnswers[i] = ['A', 'B', 'C', 'D'][optionIndex];
-                        }
+                // Still streaming in: wait on the next missing question, then fetch the rest in bulk
+                const next = findFirstMissingQuestion();
+                if (next !== -1) {
+                    const waitResponse = await fetch(`${API_BASE_URL}/question/${testState.sessionId}/${next}`);
+                    if (waitResponse.ok) {
+                        const question = await waitResponse.json();
+                        storeQuestion(question);
+                        updateTotalQuestions(question.total_questions);
+                    } else if (waitResponse.status === 400) {
+                        // Generation finished short of the requested count; the next bulk fetch reports the total
+                        continue;
+                    } else {
+                        break;
                     }
                 }
-            } catch (error) {
-                console.error(`Error pre-loading question ${i}:`, error);
             }
+        } catch (error) {
+            console.error('Error pre-loading questions:', error);
         }
         
         console.log('Pre-loaded questions:', testState.questions.length);
         console.log('Pre-loaded answers:', testState.userAnswers);
     }
     
+    function findFirstMissingQuestion() {
+        for (let i = 0; i < testState.totalQuestions; i++) {
+            if (!testState.questions[i]) {
+                return i;
+            }
+        }
+        return -1;
+    }
+    
+    function storeQuestion(data) {
+        const i = data.question_index;
+        testState.questions[i] = {
+            question: data.question,
+            options: data.options,
+            correct_answer: data.correct_answer
+        };
+        
+        // Convert user answer from backend to letter format for state management
+        if (data.user_answer) {
+            const optionIndex = data.options.indexOf(data.user_answer);
+            if (optionIndex !== -1) {
+                testState.userAnswers[i] = ['A', 'B', 'C', 'D'][optionIndex];
+            }
+        }
+    }
+    
+    // A streamed test can end up with fewer questions than requested
+    function updateTotalQuestions(total) {
+        if (!total || total >= testState.totalQuestions) {
+            return;
+        }
+        
+        testState.totalQuestions = total;
+        testState.userAnswers = testState.userAnswers.slice(0, total);
+        totalQuestionsSpan.textContent = total;
+        createQuestionIndicators();
+        updateQuestionIndicators();
+        updateNavigationButtons();
+    }
+    
     function displayTestInfo() {
         const config = testState.config;
         let infoText = '';
@@ -470,12 +526,16 @@ document.addEventListener('DOMContentLoaded', function() {
         }
         
         try {
-            // Ensure all answers are saved to backend before submission
-            await saveAllAnswersToBackend();
-            
+            // Send the full answer vector with the submit so nothing is lost and no per-answer requests are needed
             const response = await fetch(
                 `${API_BASE_URL}/submit/${testState.sessionId}`,
-                { method: 'POST' }
+                {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                    },
+                    body: JSON.stringify({ answers: buildAnswerVector() })
+                }
             );
             
             if (!response.ok) {
@@ -496,41 +556,23 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
-    // FIX: New function to save all answers to backend before submission
-    async function saveAllAnswersToBackend() {
-        console.log('Saving all answers to backend before submission...');
+    // Answer texts aligned with question indices (null = not answered)
+    function buildAnswerVector() {
+        const answers = [];
         
         for (let i = 0; i < testState.totalQuestions; i++) {
             const answerLetter = testState.userAnswers[i];
+            const question = testState.questions[i];
+            const optionIndex = ['A', 'B', 'C', 'D'].indexOf(answerLetter);
             
-            if (answerLetter && testState.questions[i]) {
-                const question = testState.questions[i];
-                const optionIndex = ['A', 'B', 'C', 'D'].indexOf(answerLetter);
-                
-                if (optionIndex !== -1 && question.options[optionIndex]) {
-                    const answerText = question.options[optionIndex];
-                    
-                    try {
-                        const response = await fetch(
-                            `${API_BASE_URL}/answer/${testState.sessionId}/${i}`,
-                            {
-                                method: 'POST',
-                                headers: {
-                                    'Content-Type': 'application/json',
-                                },
-                                body: JSON.stringify({ answer: answerText })
-                            }
-                        );
-                        
-                        if (response.ok) {
-                            console.log(`Saved answer for question ${i}:`, answerText);
-                        }
-                    } catch (error) {
-                        console.error(`Error saving answer for question ${i}:`, error);
-                    }
-                }
+            if (question && optionIndex !== -1 && question.options[optionIndex]) {
+                answers.push(question.options[optionIndex]);
+            } else {
+                answers.push(null);
             }
         }
+        
+        return answers;
     }
     
     function showResults(results) {